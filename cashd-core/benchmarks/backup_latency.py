@@ -0,0 +1,146 @@
+"""Compares the write latency while the database is backed up by copying the file, like
+`cashd_core.backup.run` used to do, and by SQLite's online backup API, used by
+`cashd_core.backup.backup_database`.
+
+Usage: `python benchmarks/backup_latency.py [size_mb] [pages_per_step] [step_sleep_ms]`
+"""
+
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+from random import randint
+from statistics import median, quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from cashd_core import backup
+from cashd_core.data import (
+    dec_base,
+    tbl_clientes,
+    tbl_transacoes,
+    backup_counter,
+    create_sqlite_engine,
+)
+
+
+SIZE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+PAGES_PER_STEP = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+STEP_SLEEP_MS = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+N_CUSTOMERS = 1_000
+N_TRANSACTIONS = 100_000
+
+
+def populate(engine):
+    customers = [
+        {
+            "PrimeiroNome": "Ana",
+            "Sobrenome": "Silva",
+            "Telefone": "(11) 90000-0000",
+            "Cidade": "Curitiba",
+            "Estado": "PR",
+        }
+        for _ in range(N_CUSTOMERS)
+    ]
+    with Session(engine) as ses:
+        ses.execute(insert(tbl_clientes), customers)
+        ses.execute(
+            text(
+                "INSERT INTO transacoes (IdCliente, CarimboTempo, DataTransac, Valor) "
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n "
+                "WHERE i < :n_transactions) "
+                "SELECT i % :n_customers + 1, '2024-01-01 00:00:00', "
+                "date('2020-01-01', '+' || (i % 1800) || ' days'), i % 30000 - 10000 "
+                "FROM n"
+            ),
+            {"n_transactions": N_TRANSACTIONS, "n_customers": N_CUSTOMERS},
+        )
+        # pads the file up to `SIZE_MB`, backups copy pages regardless of their content
+        ses.execute(text("CREATE TABLE padding (value BLOB)"))
+        ses.execute(
+            text(
+                "INSERT INTO padding WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL "
+                "SELECT i + 1 FROM n WHERE i < :n_blobs) SELECT randomblob(65536) "
+                "FROM n"
+            ),
+            {"n_blobs": SIZE_MB * 16},
+        )
+        # writes should not start backups
+        ses.execute(update(backup_counter).values(Ativo=0))
+        ses.commit()
+
+
+def write_one(engine):
+    transac = tbl_transacoes(
+        IdCliente=randint(1, N_CUSTOMERS), DataTransac=date.today(), Valor=1234
+    )
+    # skips the change notifications of `tbl_transacoes.write`
+    dec_base.write(transac, engine=engine)
+
+
+def copy_file_backup(db_file: Path, target_dir: str):
+    backup.checkpoint(db_file)
+    backup.copy_file(str(db_file), target_dir)
+
+
+def online_backup(db_file: Path, target_dir: str):
+    backup.backup_database(
+        db_file,
+        target_dir,
+        pages_per_step=PAGES_PER_STEP,
+        step_sleep_ms=STEP_SLEEP_MS,
+    )
+
+
+def bench(label: str, take_backup):
+    with TemporaryDirectory() as tmpdir:
+        db_file = Path(tmpdir, "bench.db")
+        engine = create_sqlite_engine(db_file, profile="tuned")
+        dec_base.metadata.create_all(engine)
+        populate(engine)
+
+        # writes while the backup runs in another thread
+        writes, locked = [], 0
+        done = threading.Event()
+
+        def run_backup():
+            try:
+                take_backup(db_file, tmpdir)
+            finally:
+                done.set()
+
+        start = perf_counter()
+        backup_thread = threading.Thread(target=run_backup)
+        backup_thread.start()
+        while not done.is_set():
+            write_start = perf_counter()
+            try:
+                write_one(engine)
+            except OperationalError:
+                locked = locked + 1
+                continue
+            writes.append(perf_counter() - write_start)
+            sleep(0.002)
+        backup_thread.join()
+        duration = perf_counter() - start
+        engine.dispose()
+
+    print(label)
+    print(f"  backup                       {duration:8.2f}s")
+    if len(writes) > 1:
+        p95 = quantiles(writes, n=20, method="inclusive")[-1]
+        print(
+            f"  write during backup          p50={median(writes) * 1000:8.2f}ms  "
+            f"p95={p95 * 1000:8.2f}ms  max={max(writes) * 1000:8.2f}ms"
+        )
+    print(f"  writes completed: {len(writes)}, failed with a locked database: {locked}")
+
+
+if __name__ == "__main__":
+    print(f"{SIZE_MB}MB database, {PAGES_PER_STEP=}, {STEP_SLEEP_MS=}")
+    bench("file copy (checkpoint + shutil.copyfile)", copy_file_backup)
+    bench("online backup (sqlite3.Connection.backup)", online_backup)
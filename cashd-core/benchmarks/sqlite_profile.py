@@ -0,0 +1,126 @@
+"""Compares write and read latencies of the SQLite connection profiles available in
+`cashd_core.data.sqlite_profile`.
+
+Usage: `python benchmarks/sqlite_profile.py [n_customers] [n_transactions]`
+"""
+
+import sys
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from random import choice, randint, seed
+from statistics import median, quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from cashd_core.data import (
+    dec_base,
+    tbl_clientes,
+    tbl_transacoes,
+    backup_counter,
+    create_sqlite_engine,
+    LastTransactionsSource,
+    HighestAmountsSource,
+)
+
+
+N_CUSTOMERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+N_TRANSACTIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+N_WRITES = 300
+N_READS = 100
+
+
+def populate(engine):
+    seed(0)
+    customers = [
+        {
+            "PrimeiroNome": choice(["Ana", "José", "Maria", "Pedro"]),
+            "Sobrenome": choice(["Silva", "Santos", "Souza"]),
+            "Telefone": "(11) 90000-0000",
+            "Cidade": "Curitiba",
+            "Estado": "PR",
+        }
+        for _ in range(N_CUSTOMERS)
+    ]
+    first_day = date(2020, 1, 1)
+    transactions = [
+        {
+            "IdCliente": randint(1, N_CUSTOMERS),
+            "DataTransac": first_day + timedelta(days=randint(0, 1800)),
+            "Valor": randint(-10_000, 20_000) or 1,
+        }
+        for _ in range(N_TRANSACTIONS)
+    ]
+    with Session(engine) as ses:
+        ses.execute(insert(tbl_clientes), customers)
+        ses.execute(insert(tbl_transacoes), transactions)
+        # writes should not start backups
+        ses.execute(update(backup_counter).values(Ativo=0))
+        ses.commit()
+
+
+def write_one(engine):
+    transac = tbl_transacoes(
+        IdCliente=randint(1, N_CUSTOMERS), DataTransac=date.today(), Valor=1234
+    )
+    # skips the change notifications of `tbl_transacoes.write`
+    dec_base.write(transac, engine=engine)
+
+
+def fmt_latencies(label: str, samples: list[float]) -> str:
+    p95 = quantiles(samples, n=20)[-1]
+    return f"  {label:<28} p50={median(samples) * 1000:8.2f}ms  p95={p95 * 1000:8.2f}ms"
+
+
+def bench(profile: str):
+    with TemporaryDirectory() as tmpdir:
+        engine = create_sqlite_engine(Path(tmpdir, "bench.db"), profile=profile)
+        dec_base.metadata.create_all(engine)
+        populate(engine)
+
+        writes = []
+        for _ in range(N_WRITES):
+            start = perf_counter()
+            write_one(engine)
+            writes.append(perf_counter() - start)
+
+        # reads while another thread keeps writing
+        stop = threading.Event()
+
+        def writer():
+            while not stop.is_set():
+                write_one(engine)
+                sleep(0.002)
+
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        reads, locked = [], 0
+        try:
+            for _ in range(N_READS):
+                start = perf_counter()
+                try:
+                    HighestAmountsSource(engine=engine).current_data
+                    LastTransactionsSource(engine=engine).current_data
+                except OperationalError:
+                    locked = locked + 1
+                    continue
+                reads.append(perf_counter() - start)
+        finally:
+            stop.set()
+            writer_thread.join()
+        engine.dispose()
+
+    print(f"profile={profile!r}")
+    print(fmt_latencies("write (insert + commit)", writes))
+    print(fmt_latencies("read (2 stats pages, busy)", reads))
+    print(f"  reads failed with a locked database: {locked}/{N_READS}")
+
+
+if __name__ == "__main__":
+    print(f"{N_CUSTOMERS} customers, {N_TRANSACTIONS} transactions")
+    for profile in ["default", "tuned"]:
+        bench(profile)
@@ -0,0 +1,85 @@
+"""Measures the Python overhead of building and compiling the statements of the data
+sources, with and without `cashd_core.data.cached_statement`.
+
+Usage: `python benchmarks/statement_cache.py [n_calls]`
+"""
+
+import sys
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from cashd_core import data
+from cashd_core.data import (
+    dec_base,
+    tbl_clientes,
+    create_sqlite_engine,
+    CustomerListSource,
+    TransactionBalanceSource,
+)
+
+
+N_CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+SEARCHES = ["ana", "ana silva", "josé", "maria santos", "pedro souza curitiba"]
+
+
+def populate(engine):
+    customers = [
+        {
+            "PrimeiroNome": name,
+            "Sobrenome": "Silva",
+            "Telefone": "(11) 90000-0000",
+            "Cidade": "Curitiba",
+            "Estado": "PR",
+        }
+        for name in ["Ana", "José", "Maria", "Pedro"]
+    ]
+    with Session(engine) as ses:
+        ses.execute(insert(tbl_clientes), customers)
+        ses.commit()
+
+
+def run_calls(engine) -> dict[str, list[float]]:
+    """Timings of the calls made by the server pages, in seconds."""
+    timings = {"search (LIKE)": [], "page (keyset)": [], "date format": []}
+    customers = CustomerListSource(engine=engine)
+    # forces the LIKE search, the FTS5 one builds the same kind of statement
+    customers.SEARCH_INDEX = None
+    pages = CustomerListSource(engine=engine, pagination_mode="keyset")
+    balance = TransactionBalanceSource(engine=engine)
+    for i in range(N_CALLS):
+        start = perf_counter()
+        customers._count_rows(SEARCHES[i % len(SEARCHES)] + f" {i}")
+        timings["search (LIKE)"].append(perf_counter() - start)
+
+        start = perf_counter()
+        pages.current_data
+        timings["page (keyset)"].append(perf_counter() - start)
+
+        start = perf_counter()
+        balance.update_date_format(["m", "w", "d"][i % 3])
+        timings["date format"].append(perf_counter() - start)
+    return timings
+
+
+def bench(cache_size: int):
+    data.STATEMENT_CACHE_SIZE = cache_size
+    with TemporaryDirectory() as tmpdir:
+        engine = create_sqlite_engine(Path(tmpdir, "bench.db"))
+        dec_base.metadata.create_all(engine)
+        populate(engine)
+        timings = run_calls(engine)
+        engine.dispose()
+    print(f"STATEMENT_CACHE_SIZE={cache_size}")
+    for label, samples in timings.items():
+        print(f"  {label:<16} p50={median(samples) * 1_000_000:8.1f}us")
+
+
+if __name__ == "__main__":
+    print(f"{N_CALLS} calls of each kind")
+    for cache_size in [0, data.STATEMENT_CACHE_SIZE]:
+        bench(cache_size)
@@ -1 +1,10 @@
-from . import data, prefs, const
+from importlib import import_module
+
+from . import prefs, const
+
+
+def __getattr__(name: str):
+    # `data` pulls SQLAlchemy in, only import it when needed
+    if name == "data":
+        return import_module(f"{__name__}.data")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
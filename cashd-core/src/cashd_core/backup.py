@@ -1,13 +1,14 @@
-from os import path, rename, makedirs
+from os import path, rename, makedirs, remove
 from sys import platform
 from pathlib import Path
 from datetime import datetime
+from time import sleep
 import configparser
 import sqlite3
 import logging
 import shutil
 
-from cashd_core.prefs import BackupPrefsHandler
+from cashd_core.prefs import BackupPrefsHandler, BackupPagesPerStep, BackupStepSleep
 
 ####################
 # GLOBAL VARS
@@ -27,6 +28,10 @@ LOG_FILE = path.join(LOG_PATH, "backup.log")
 DB_DIR = Path(CASHD_FILES_PATH, "data")
 DB_FILE = Path(DB_DIR, "database.db")
 BACKUP_PATH = path.join(CASHD_FILES_PATH, "data", "backup")
+MAX_BACKUP_RESTARTS = 3
+"""Times a step-wise backup of a database out of WAL mode may start over, because
+of commits between its steps, before it is done again in a single step.
+"""
 
 for dirpath in [CASHD_FILES_PATH, CONFIG_PATH, LOG_PATH, BACKUP_PATH]:
     makedirs(dirpath, exist_ok=True)
@@ -61,6 +66,29 @@ class BackupPlacesSource:
         return settings.read_backup_places()
 
 
+def checkpoint(file: str | Path = DB_FILE, _raise: bool = False):
+    """Moves the content of the write-ahead log of the SQLite database `file` into the
+    database file itself, so it can be safely copied or moved. Does nothing if the
+    database is not in WAL mode.
+
+    :param file: Path to the database file.
+    :param _raise: Boolean indicating if errors should also be raised, if false, errors
+      will only be silently logged to a log file.
+    """
+    logger.debug("function call: checkpoint")
+    if not path.exists(f"{file}-wal"):
+        return
+    con = sqlite3.connect(file, timeout=30)
+    try:
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    except sqlite3.Error as err:
+        logger.error(f"Erro no checkpoint de '{file}': {err}", exc_info=True)
+        if _raise:
+            raise err
+    finally:
+        con.close()
+
+
 def copy_file(source_path: str, target_dir: str, _raise: bool = False):
     """Copies a file to `target_dir`.
 
@@ -89,6 +117,126 @@ def copy_file(source_path: str, target_dir: str, _raise: bool = False):
             raise xpt
 
 
+class _BackupRestarted(Exception):
+    """Raised when a step-wise backup starts over more than `MAX_BACKUP_RESTARTS`."""
+
+
+def _copy_database(
+    source: sqlite3.Connection,
+    target_path: str,
+    pages_per_step: int,
+    step_sleep_ms: int,
+    max_restarts: int | None = None,
+):
+    """Copies `source` to `target_path` with the online backup API, pausing
+    `step_sleep_ms` after each step.
+
+    :raises _BackupRestarted: If the copy starts over more than `max_restarts` times.
+    """
+    restarts, last_remaining = 0, None
+
+    def after_step(status: int, remaining: int, total: int):
+        nonlocal restarts, last_remaining
+        # a commit of another connection makes the next step start over, copying the
+        # first pages again
+        copied = (status == sqlite3.SQLITE_OK) and (last_remaining is not None)
+        if copied and (remaining >= last_remaining):
+            restarts = restarts + 1
+            if (max_restarts is not None) and (restarts > max_restarts):
+                raise _BackupRestarted(f"{restarts} restarts")
+        last_remaining = remaining
+        if remaining > 0:
+            sleep(step_sleep_ms / 1000)
+
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(
+            target,
+            pages=pages_per_step,
+            progress=after_step,
+            sleep=step_sleep_ms / 1000,
+        )
+    finally:
+        target.close()
+
+
+def backup_database(
+    source_path: str | Path,
+    target_dir: str,
+    pages_per_step: int | None = None,
+    step_sleep_ms: int | None = None,
+    _raise: bool = False,
+) -> str | None:
+    """Copies the SQLite database `source_path` to `target_dir` with SQLite's online
+    backup API. The copy is consistent even while the database is written, and includes
+    what was committed to the write-ahead log.
+
+    The database is copied `pages_per_step` pages at a time, pausing `step_sleep_ms`
+    after each step. In WAL mode all steps read a single snapshot, and writers are
+    never held back. Other journal modes let writers commit during the pauses, but
+    each commit makes the copy start over. After `MAX_BACKUP_RESTARTS` restarts, the
+    database is copied in a single step, that holds writers back until it is done.
+
+    :param source_path: Full path to the database to be copied.
+    :param target_dir: Directory where the copy will be created.
+    :param pages_per_step: Pages copied at each step, uses `BackupPagesPerStep` if
+      `None`. Use -1 to copy the whole database at once.
+    :param step_sleep_ms: Time (ms) paused after each step, and before retrying a step
+      that found the database locked, uses `BackupStepSleep` if `None`.
+    :param _raise: Boolean indicating if errors should also be raised, if false, errors
+      will only be silently logged to a log file.
+
+    :returns: Full path to the copy, or `None` if it could not be created.
+    :raises NotADirectoryError: If `target_dir` is not a valid directory and `_raise=True`.
+    :raises sqlite3.Error: If the database cannot be copied and `_raise=True`.
+    """
+    logger.debug("function call: backup_database")
+    if not path.isdir(target_dir):
+        err_msg = f"'{target_dir}' does not exist."
+        logger.error(err_msg)
+        if _raise:
+            raise NotADirectoryError(err_msg)
+        return None
+    if pages_per_step is None:
+        pages_per_step = BackupPagesPerStep.get()
+    if step_sleep_ms is None:
+        step_sleep_ms = BackupStepSleep.get()
+    now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")
+    target_path = path.join(target_dir, f"backup_{now}.db")
+    # only gets the final name when complete, so a failed backup never looks valid
+    partial_path = f"{target_path}.part"
+    try:
+        source = sqlite3.connect(source_path, timeout=30)
+        try:
+            max_restarts = MAX_BACKUP_RESTARTS
+            if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                # a read transaction keeps the same snapshot between the steps, so
+                # commits of other connections don't restart the copy, and in WAL
+                # mode it doesn't hold writers back
+                source.execute("BEGIN")
+                source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                max_restarts = None
+            try:
+                _copy_database(
+                    source, partial_path, pages_per_step, step_sleep_ms, max_restarts
+                )
+            except _BackupRestarted as xpt:
+                logger.warning(f"Backup reiniciado ({xpt}), copiando de uma vez.")
+                _copy_database(source, partial_path, -1, step_sleep_ms)
+        finally:
+            source.close()
+        rename(partial_path, target_path)
+    except (sqlite3.Error, OSError) as xpt:
+        logger.error(f"Erro realizando backup: {xpt}.", exc_info=True)
+        if path.exists(partial_path):
+            remove(partial_path)
+        if _raise:
+            raise xpt
+        return None
+    logger.info(f"Backup de '{source_path}' criado em '{target_dir}'")
+    return target_path
+
+
 def rename_on_db_folder(current: str, new: str, _raise: bool = False):
     """Renames a file in the same folder where `DB_FILE` is located. If the renaming
     operation fails because the file is in use, it makes a copy with the new name instead
@@ -265,6 +413,7 @@ def load(file: str, _raise: bool = False) -> None:
     now = datetime.now()
     stashfilename = f"stashed{now}.db".replace(":", "-")
 
+    checkpoint(DB_FILE, _raise=_raise)
     if file == str(DB_FILE):
         # Just create stash file if user loaded current DB
         shutil.copy(DB_FILE, DB_DIR / stashfilename)
@@ -279,8 +428,9 @@ def load(file: str, _raise: bool = False) -> None:
 def run(
     force: bool = False, settings: BackupPrefsHandler = settings, _raise: bool = False
 ) -> None:
-    """Copies the database file to the local backup folder and to the folders listed in
-    the 'backup_places' option in `backup.ini`.
+    """Backs up the database to the local backup folder, see `backup_database`, and
+    copies that backup to the folders listed in the 'backup_places' option in
+    `backup.ini`.
 
     :param force: Using `force=False` will only make a copy if the file has increased in
       size, compared to what's recorded in 'file_sizes'. Otherwise, will copy anyway.
@@ -300,10 +450,14 @@ def run(
     settings.write_dbsize(current_size)
 
     try:
-        backup_places = [i for i in [BACKUP_PATH] + backup_places if i != ""]
+        # the database is only read once, the other places get copies of the backup
+        local_backup = backup_database(DB_FILE, BACKUP_PATH, _raise=_raise)
+        if local_backup is None:
+            return
+        backup_places = [i for i in backup_places if i != ""]
         for place in backup_places:
             try:
-                copy_file(DB_FILE, place, _raise=_raise)
+                copy_file(local_backup, place, _raise=_raise)
             except Exception as err:
                 logger.error(
                     f"Nao foi possivel salvar em '{place}': {err}", exc_info=True
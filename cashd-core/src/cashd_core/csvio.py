@@ -0,0 +1,363 @@
+import codecs
+import csv
+import io
+import unicodedata
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from os import path
+from typing import Any, Callable, Dict, Iterator, List, Type
+
+from sqlalchemy import Date, DateTime, Engine, Integer, Select, select
+from sqlalchemy.orm import Session
+
+from cashd_core.data import (
+    CurrencyAmount,
+    _DataSource,
+    dec_base,
+    get_engine,
+    query_currency,
+    stream_rows,
+    tbl_transacoes,
+)
+from cashd_core.fmt import format_cents_columns
+
+
+####################
+# GLOBAL VARS
+####################
+
+DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y"]
+DATETIME_FORMATS = [
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+]
+DELIMITERS = ";,\t|"
+ROWS_PER_BATCH = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+####################
+# PARSING
+####################
+
+
+def _normalize_name(name: str) -> str:
+    """Lowercase ASCII letters of `name`, used to match CSV headers to columns."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore")
+    return "".join(c for c in ascii_name.decode().lower() if c.isalnum())
+
+
+def header_map(table: Type[dec_base], header: List[str]) -> Dict[int, str]:
+    """Maps the position of each CSV column in `header` to the name of the
+    corresponding column in `table`. Headers may be the column names, or their
+    display names, ignoring case, accents, spaces and symbols. Unknown headers are
+    left out.
+    """
+    known = {}
+    for name in table.__table__.c.keys():
+        if name in ("Id", *table.DERIVED_COLUMNS):
+            continue
+        known[_normalize_name(name)] = name
+        known[_normalize_name(table._display_name(name))] = name
+    return {
+        i: known[_normalize_name(title)]
+        for i, title in enumerate(header)
+        if _normalize_name(title) in known
+    }
+
+
+def parse_currency(inp: str) -> Decimal:
+    """Parses an amount of money typed in a spreadsheet, like "1.234,56", "1234.56"
+    or "-10".
+
+    :raises ValueError: If `inp` is not a number.
+    """
+    inp = inp.replace("R$", "").replace(" ", "")
+    if "," in inp:
+        inp = inp.replace(".", "").replace(",", ".")
+    try:
+        return Decimal(inp)
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: '{inp}'")
+
+
+def _parse_datetime(inp: str, formats: List[str]) -> datetime:
+    for fmt in formats:
+        try:
+            return datetime.strptime(inp, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: '{inp}'")
+
+
+def parse_value(column, inp: str) -> Any:
+    """Converts the text `inp` of a CSV cell to the type expected by `column`.
+    Empty cells become `None`, so the validation of `column` applies.
+
+    :raises ValueError: If `inp` cannot be converted.
+    """
+    inp = inp.strip()
+    if inp == "":
+        return None
+    match column.type:
+        case CurrencyAmount():
+            return parse_currency(inp)
+        case DateTime():
+            return _parse_datetime(inp, DATETIME_FORMATS + DATE_FORMATS)
+        case Date():
+            return _parse_datetime(inp, DATE_FORMATS).date()
+        case Integer():
+            try:
+                return int(inp)
+            except ValueError:
+                raise ValueError(f"Número inválido: '{inp}'")
+        case _:
+            return inp
+
+
+####################
+# IMPORT
+####################
+
+
+class ImportReport:
+    def __init__(self, file_size: int):
+        """Progress and results of a CSV import, updated while the file is read."""
+        self.file_size = file_size
+        self.bytes_read = 0
+        self.n_lines = 0
+        self.n_written = 0
+        self.n_errors = 0
+        self.errors: List[tuple[int, str]] = []
+        """Line number and reason of the first `MAX_REPORTED_ERRORS` bad lines."""
+
+    @property
+    def progress(self) -> float:
+        """Approximate fraction of the file already processed, from 0 to 1."""
+        if self.file_size == 0:
+            return 1.0
+        return min(self.bytes_read / self.file_size, 1.0)
+
+    def add_error(self, line: int, reason: str):
+        self.n_errors = self.n_errors + 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, reason))
+
+    def __repr__(self):
+        n_lines, n_written, n_errors = self.n_lines, self.n_written, self.n_errors
+        return f"<cashd import report {n_lines=}, {n_written=}, {n_errors=}>"
+
+
+def _missing_references(
+    table: Type[dec_base], batch: List[tuple[int, Dict[str, Any]]], engine: Engine
+) -> Dict[int, str]:
+    """Finds rows in `batch` pointing to foreign keys that do not exist, returning
+    the reason for each of their line numbers.
+    """
+    missing = {}
+    if len(batch) == 0:
+        return missing
+    for col in table.__table__.columns:
+        for fk in col.foreign_keys:
+            ref_col = fk.column
+            values = {row[col.name] for _, row in batch if row[col.name] is not None}
+            with Session(engine) as ses:
+                stmt = select(ref_col).where(ref_col.in_(values))
+                found = set(ses.execute(stmt).scalars())
+            for line, row in batch:
+                if row[col.name] is not None and row[col.name] not in found:
+                    missing[line] = f"{col.name}: {row[col.name]} não encontrado"
+    return missing
+
+
+def _iter_lines(file, encoding: str, report: ImportReport) -> Iterator[str]:
+    """Decodes the lines of the binary `file`, counting the bytes read."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for raw_line in file:
+        report.bytes_read = report.bytes_read + len(raw_line)
+        yield decoder.decode(raw_line)
+
+
+def import_csv(
+    file: str,
+    table: Type[dec_base],
+    engine: Engine | None = None,
+    encoding: str = "utf-8-sig",
+    rows_per_batch: int = ROWS_PER_BATCH,
+    on_progress: Callable[[ImportReport], Any] | None = None,
+) -> ImportReport:
+    """Reads the CSV `file` row by row, adding every valid row to `table`. Rows are
+    validated by `dec_base.validated_row` and written in batches, each one in it's own
+    transaction, so memory use does not depend on the size of the file. Invalid rows
+    are reported and skipped, without interrupting the import.
+
+    :param file: Path to a CSV file, with a header matching the columns of `table`,
+      see `header_map`. The delimiter is detected from the header.
+    :param table: `tbl_clientes` or `tbl_transacoes`.
+    :param engine: `sqlalchemy.Engine` reflecting the database that will be
+      written, uses `get_engine()` if `None`.
+    :param encoding: Encoding of `file`. Spreadsheets saved by Excel in portuguese
+      usually use "cp1252".
+    :param rows_per_batch: Number of rows inserted in each transaction.
+    :param on_progress: Called with the `ImportReport` after each batch is written.
+
+    :raises ValueError: If no column in the header matches a column of `table`.
+    """
+    engine = get_engine(engine)
+    report = ImportReport(file_size=path.getsize(file))
+    with open(file, "rb") as f:
+        lines = _iter_lines(f, encoding, report)
+        header_line = next(lines, "")
+        try:
+            dialect = csv.Sniffer().sniff(header_line, delimiters=DELIMITERS)
+        except csv.Error:
+            dialect = csv.excel
+        header = next(csv.reader([header_line], dialect), [])
+        columns = header_map(table, header)
+        if len(columns) == 0:
+            raise ValueError(f"Nenhuma coluna de '{table.__tablename__}' encontrada")
+
+        batch: List[tuple[int, Dict[str, Any]]] = []
+
+        def write_batch():
+            missing = _missing_references(table, batch, engine)
+            for line, reason in missing.items():
+                report.add_error(line, reason)
+            rows = [row for line, row in batch if line not in missing]
+            if len(rows) > 0:
+                table._insert_rows(rows, engine)
+            report.n_written = report.n_written + len(rows)
+            batch.clear()
+            if on_progress is not None:
+                on_progress(report)
+
+        reader = csv.reader(lines, dialect)
+        for cells in reader:
+            report.n_lines = report.n_lines + 1
+            line = reader.line_num + 1  # the header was read before `reader`
+            if not any(cell.strip() for cell in cells):
+                continue
+            try:
+                row = {}
+                for i, name in columns.items():
+                    cell = cells[i] if i < len(cells) else ""
+                    value = parse_value(table.__table__.c[name], cell)
+                    # empty cells are left out, to be filled by the column default
+                    if value is not None:
+                        row[name] = value
+                if (table is tbl_transacoes) and (row.get("CarimboTempo") is None):
+                    row["CarimboTempo"] = datetime.now()
+                batch.append((line, table.validated_row(row)))
+            except ValueError as err:
+                report.add_error(line, str(err))
+            if len(batch) >= rows_per_batch:
+                write_batch()
+        write_batch()
+    return report
+
+
+####################
+# EXPORT
+####################
+
+
+def table_export_stmt(table: Type[dec_base]) -> Select:
+    """Selects every row of `table`, ordered by `Id`, with currency columns formatted
+    in reais, so the exported file can be imported back by `import_csv`.
+    """
+    columns = [table.__table__.c.Id]
+    for col in table.__table__.columns:
+        if col.name in ("Id", *table.DERIVED_COLUMNS):
+            continue
+        if isinstance(col.type, CurrencyAmount):
+            columns.append(query_currency(col, label=col.name))
+        else:
+            columns.append(col)
+    return select(*columns).order_by(table.Id)
+
+
+def _formatted_rows(
+    rows: Iterator, colnames: tuple[str, ...], batch_size: int
+) -> Iterator[tuple]:
+    """Formats the amounts in `colnames` of the streamed `rows`, one batch at a time."""
+    while True:
+        batch = [row._asdict() for row in islice(rows, batch_size)]
+        if len(batch) == 0:
+            return
+        for row in format_cents_columns(batch, colnames):
+            yield tuple(row.values())
+
+
+def _export_rows(
+    source: _DataSource | Type[dec_base] | Select,
+    engine: Engine | None,
+    batch_size: int,
+) -> tuple[Select, Iterator]:
+    if isinstance(source, _DataSource):
+        stmt = source.searched_select_stmt(search_text=source.search_text)
+        rows = source.iter_rows(batch_size=batch_size)
+        return stmt, _formatted_rows(rows, source.CURRENCY_COLNAMES, batch_size)
+    stmt = source if isinstance(source, Select) else table_export_stmt(source)
+    return stmt, stream_rows(stmt, engine=engine, batch_size=batch_size)
+
+
+def iter_csv(
+    source: _DataSource | Type[dec_base] | Select,
+    engine: Engine | None = None,
+    delimiter: str = ";",
+    rows_per_chunk: int = ROWS_PER_BATCH,
+) -> Iterator[str]:
+    """Generator of CSV text, the header first, followed by chunks of at most
+    `rows_per_chunk` rows. Rows are streamed from the database, so memory use does not
+    depend on the number of rows, and the chunks can be sent as they are produced.
+
+    :param source: A data source, exported with it's current search and without
+      pagination, a table, exported whole by `table_export_stmt`, or a SELECT query.
+    :param engine: `sqlalchemy.Engine` reflecting the database that will be read,
+      ignored for data sources, uses `get_engine()` if `None`.
+    :param delimiter: Character that separates the columns.
+    """
+    stmt, rows = _export_rows(source, engine, batch_size=rows_per_chunk)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(stmt.selected_columns.keys())
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    n_buffered = 0
+    for row in rows:
+        writer.writerow(row)
+        n_buffered = n_buffered + 1
+        if n_buffered >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            n_buffered = 0
+    yield buffer.getvalue()
+
+
+def export_csv(
+    source: _DataSource | Type[dec_base] | Select,
+    file: str,
+    engine: Engine | None = None,
+    delimiter: str = ";",
+    encoding: str = "utf-8-sig",
+) -> int:
+    """Writes the rows of `source` to the CSV `file` as they are streamed from the
+    database, see `iter_csv`. The default encoding adds a mark that lets Excel
+    recognize accented characters.
+
+    :returns: Number of rows written, excluding the header.
+    """
+    stmt, rows = _export_rows(source, engine, batch_size=ROWS_PER_BATCH)
+    n_rows = 0
+    with open(file, "w", encoding=encoding, newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(stmt.selected_columns.keys())
+        for row in rows:
+            writer.writerow(row)
+            n_rows = n_rows + 1
+    return n_rows
@@ -1,14 +1,25 @@
 import phonenumbers
 import re
-from typing import List, Iterable, Literal, Any, Self, Dict
-from datetime import datetime
+import os
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock, RLock
+from time import monotonic
+from weakref import WeakKeyDictionary
+from typing import List, Iterable, Literal, Any, Self, Dict, Callable, NamedTuple
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
-from copy import copy
+from collections import OrderedDict
+from functools import lru_cache, partial
 from sys import platform
 from sqlalchemy.sql.functions import coalesce
 from sqlalchemy import (
+    Table,
     Column,
+    Index,
     Engine,
     ForeignKey,
     Select,
@@ -19,16 +30,30 @@ from sqlalchemy import (
     Integer,
     String,
     cast,
+    type_coerce,
     update,
     select,
     insert,
     delete,
     or_,
+    and_,
     case,
     text,
     func,
     types,
+    event,
+    table,
+    column,
+    literal,
+    literal_column,
+    bindparam,
+    inspect,
+    Connection,
 )
+from sqlalchemy.engine import FrozenResult
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.dialects.sqlite import dialect as sqlite_dialect
 from sqlalchemy.orm import (
     Mapped,
     DeclarativeBase,
@@ -36,12 +61,116 @@ from sqlalchemy.orm import (
     Session,
 )
 
-from cashd_core import prefs, const, backup
+from cashd_core import prefs, const, backup, migrations, fmt
 
 
-DB_ENGINE = create_engine(
-    f"sqlite:///{Path(const.DATA_DIR, 'database.db')}", echo=False
-)
+####################
+# ENGINE
+####################
+
+
+def sqlite_profile(name: Literal["tuned", "default"]) -> dict[str, Any]:
+    """PRAGMA values applied to every new connection of an engine created by
+    `create_sqlite_engine`. Values of the "tuned" profile are read from `prefs`.
+
+    :param name: Use "tuned" for a write-ahead log with relaxed syncing, bigger caches
+      and a busy timeout, suited for many clients reading while one writes. Use
+      "default" to keep SQLite's own settings, with a rollback journal.
+    """
+    if name == "default":
+        return {"journal_mode": "DELETE"}
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -prefs.DatabaseCacheSize.get(),  # negative values are in kb
+        "mmap_size": prefs.DatabaseMmapSize.get() * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": prefs.DatabaseBusyTimeout.get(),
+    }
+
+
+def create_sqlite_engine(
+    file: str | Path, profile: Literal["tuned", "default"] | None = None
+) -> Engine:
+    """Creates an engine pointing to the SQLite database `file`, with it's
+    connections configured by a `sqlite_profile`.
+
+    :param file: Path to the database file, or ":memory:" for a database that lives
+      in memory, shared by all users of the engine.
+    :param profile: Name of the profile, uses `prefs.DatabaseProfile` if `None`.
+    """
+    if profile is None:
+        profile = prefs.DatabaseProfile.get()
+    pragmas = sqlite_profile(profile)
+    if str(file) == ":memory:":
+        engine = create_engine(
+            "sqlite://",
+            echo=False,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+    else:
+        engine = create_engine(
+            f"sqlite:///{file}",
+            echo=False,
+            poolclass=QueuePool,
+            pool_size=8,
+            max_overflow=8,
+        )
+
+    def apply_profile(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+    event.listen(engine, "connect", apply_profile)
+    return engine
+
+
+class LazyEngine:
+    def __init__(self, file: str | Path, setup: Callable[[Engine], Any]):
+        """Provides an engine that is only created, and has it's schema set up, when
+        it is first used.
+
+        :param file: Path to the database file used by default.
+        :param setup: Function that prepares the database of an engine, called only
+          once for each engine provided by this instance.
+        """
+        self.FILE = file
+        self._setup = setup
+        self._engine: Engine | None = None
+        self._ready_engines: WeakKeyDictionary = WeakKeyDictionary()
+        self._lock = Lock()
+
+    def get(self, engine: Engine | None = None) -> Engine:
+        """Returns `engine` itself if provided. Otherwise returns the current engine,
+        creating it and setting up it's database on the first call.
+        """
+        if engine is not None:
+            return engine
+        current = self._engine
+        if (current is not None) and (current in self._ready_engines):
+            return current
+        with self._lock:
+            if self._engine is None:
+                self._engine = create_sqlite_engine(self.FILE)
+            current = self._engine
+            if current not in self._ready_engines:
+                self._setup(current)
+                self._ready_engines[current] = True
+        return current
+
+    def set(self, target: Engine | str | Path | None = None):
+        """Overrides the engine returned by `get`.
+
+        :param target: An engine, a path to a database file, or ":memory:" for a
+          database in memory. Use `None` to go back to the default database file.
+        """
+        if (target is not None) and not isinstance(target, Engine):
+            target = create_sqlite_engine(target)
+        with self._lock:
+            self._engine = target
 
 
 ####################
@@ -122,19 +251,52 @@ def fmt_text(inp: str | None, required: bool = False) -> str:
     return inp.title()
 
 
-def fmt_phonenumber(inp: str) -> str:
-    """Coerces input into a formatted phone number.
+PHONE_MEMO_SIZE = 4096
+"""Number of distinct phone numbers kept normalized by `normalize_phonenumber`."""
+
+
+@lru_cache(maxsize=PHONE_MEMO_SIZE)
+def normalize_phonenumber(inp: str) -> tuple[str, str]:
+    """Parses a phone number once, returning it formatted for display and in the E.164
+    format, used to compare phone numbers. Results are memoized, since the same numbers
+    are bound again by every update and import.
 
     :param inp: Input value
     :raises ValueError: If it cannot be coerced to expected format.
     """
     try:
-        return phonenumbers.format_number(
-            numobj=phonenumbers.parse(inp, "BR"),
-            num_format=phonenumbers.PhoneNumberFormat.NATIONAL,
-        )
+        numobj = phonenumbers.parse(inp, "BR")
     except phonenumbers.NumberParseException:
         raise ValueError("Número de telefone inválido")
+    return (
+        phonenumbers.format_number(numobj, phonenumbers.PhoneNumberFormat.NATIONAL),
+        phonenumbers.format_number(numobj, phonenumbers.PhoneNumberFormat.E164),
+    )
+
+
+def normalize_phonenumbers(inps: Iterable[str]) -> List[tuple[str, str] | None]:
+    """Normalizes many phone numbers at once, parsing each distinct number only once,
+    see `normalize_phonenumber`. Invalid numbers are returned as `None`.
+    """
+    results: Dict[str, tuple[str, str] | None] = {}
+    normalized = []
+    for inp in inps:
+        if inp not in results:
+            try:
+                results[inp] = normalize_phonenumber(inp)
+            except (ValueError, TypeError, AttributeError):
+                results[inp] = None
+        normalized.append(results[inp])
+    return normalized
+
+
+def fmt_phonenumber(inp: str) -> str:
+    """Coerces input into a formatted phone number.
+
+    :param inp: Input value
+    :raises ValueError: If it cannot be coerced to expected format.
+    """
+    return normalize_phonenumber(inp)[0]
 
 
 def fmt_currency(inp: Any) -> int:
@@ -150,6 +312,337 @@ def fmt_currency(inp: Any) -> int:
     return int(inp)
 
 
+####################
+# DATA VERSION
+####################
+
+
+_WRITE_COUNTERS: WeakKeyDictionary = WeakKeyDictionary()
+_WRITE_COUNTERS_LOCK = Lock()
+# `(checked_at, stamp)` of the database files of each engine, see `data_version`
+_FILE_STAMPS: WeakKeyDictionary = WeakKeyDictionary()
+
+FILE_STAMP_INTERVAL = 1.0
+"""Minimum time (s) between checks of the database files made by `data_version`, in
+between it only reads the in-process write counter.
+"""
+
+
+def bump_data_version(engine: Engine):
+    """Signals that the data in the database pointed by `engine` has changed,
+    invalidating everything cached against the previous `data_version`.
+    """
+    with _WRITE_COUNTERS_LOCK:
+        _WRITE_COUNTERS[engine] = _WRITE_COUNTERS.get(engine, 0) + 1
+
+
+def _file_stamp(database: str) -> tuple:
+    stamp = ()
+    for file in [database, f"{database}-wal"]:
+        try:
+            stat = os.stat(file)
+            stamp = stamp + (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = stamp + (None, None)
+    return stamp
+
+
+def data_version(engine: Engine) -> tuple:
+    """Token that changes whenever the data in the database pointed by `engine` might
+    have changed. Made of a counter bumped by every write performed through
+    `cashd_core.data.dec_base`, and the modification stamp of the database files, that
+    also catches databases restored from backup or changed by another process.
+
+    The files are checked at most once every `FILE_STAMP_INTERVAL` seconds, so changes
+    made outside of this process may take that long to be noticed.
+    """
+    counter = _WRITE_COUNTERS.get(engine, 0)
+    database = engine.url.database
+    if not database or (database == ":memory:"):
+        return (counter,)
+    now = monotonic()
+    checked = _FILE_STAMPS.get(engine)
+    if (checked is None) or (now - checked[0] >= FILE_STAMP_INTERVAL):
+        checked = (now, _file_stamp(database))
+        _FILE_STAMPS[engine] = checked
+    return (counter, *checked[1])
+
+
+####################
+# READ CACHE
+####################
+
+
+class RowCache:
+    def __init__(self, maxsize: int):
+        """Bounded map of rows by `Id`, for one table in one database, that forgets the
+        least recently used rows first. Rows are only valid while the data version they
+        were read on is current, every other row is dropped when it changes.
+
+        :param maxsize: Maximum number of rows kept.
+        """
+        self.MAXSIZE = maxsize
+        self._rows: OrderedDict[int, Dict[str, Any]] = OrderedDict()
+        self._version: tuple | None = None
+        self._lock = Lock()
+        self.hits, self.misses = 0, 0
+
+    def get(self, row_id: int, version: tuple) -> Dict[str, Any] | None:
+        """Column values of the row `row_id`, or `None` if it is not cached for the
+        data `version`.
+        """
+        with self._lock:
+            if version != self._version:
+                self._rows.clear()
+                self._version = version
+            values = self._rows.get(row_id, None)
+            if values is None:
+                self.misses = self.misses + 1
+                return None
+            self.hits = self.hits + 1
+            self._rows.move_to_end(row_id)
+            return values
+
+    def put(self, row_id: int, values: Dict[str, Any], version: tuple):
+        """Keeps the column `values` of the row `row_id`, read on the data `version`."""
+        with self._lock:
+            if version != self._version:
+                return
+            self._rows[row_id] = values
+            self._rows.move_to_end(row_id)
+            if len(self._rows) > self.MAXSIZE:
+                self._rows.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+
+_ROW_CACHES: WeakKeyDictionary = WeakKeyDictionary()
+_ROW_CACHES_LOCK = Lock()
+
+
+def row_cache(engine: Engine, table_cls: type) -> RowCache | None:
+    """The `RowCache` used by `dec_base.read` for `table_cls` in the database pointed by
+    `engine`, or `None` if this table is not cached, see `dec_base.READ_CACHE_SIZE`.
+    """
+    if table_cls.READ_CACHE_SIZE <= 0:
+        return None
+    with _ROW_CACHES_LOCK:
+        caches = _ROW_CACHES.setdefault(engine, {})
+        if table_cls.__tablename__ not in caches:
+            caches[table_cls.__tablename__] = RowCache(table_cls.READ_CACHE_SIZE)
+        return caches[table_cls.__tablename__]
+
+
+RESULT_CACHE_SIZE = 256
+"""Number of query results of the data sources kept for each database, see
+`result_cache`. Use 0 to always query the database.
+"""
+
+
+class ResultCache:
+    def __init__(self, maxsize: int):
+        """Bounded map of query results by `(statement, parameters)`, for one database,
+        that forgets the least recently used results first. Results are only valid while
+        the data version they were fetched on is current, every other result is dropped
+        when it changes.
+
+        :param maxsize: Maximum number of results kept.
+        """
+        self.MAXSIZE = maxsize
+        self._results: OrderedDict[tuple, FrozenResult] = OrderedDict()
+        self._version: tuple | None = None
+        self._lock = Lock()
+        # one lock for each result being fetched, so concurrent requests for the same
+        # result wait for a single query
+        self._fetching: dict[tuple, Lock] = {}
+        self.hits, self.misses = 0, 0
+
+    def _get(self, key: tuple, version: tuple) -> FrozenResult | None:
+        with self._lock:
+            if version != self._version:
+                self._results.clear()
+                self._version = version
+            result = self._results.get(key, None)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def get_or_fetch(
+        self, key: tuple, version: tuple, fetch: Callable[[], FrozenResult]
+    ) -> FrozenResult:
+        """Result cached under `key` for the data `version`, or the one returned by
+        `fetch`, that is kept for the next calls.
+        """
+        result = self._get(key, version)
+        if result is not None:
+            with self._lock:
+                self.hits = self.hits + 1
+            return result
+        with self._lock:
+            key_lock = self._fetching.setdefault(key, Lock())
+        with key_lock:
+            # another thread may have fetched it while this one waited
+            result = self._get(key, version)
+            if result is not None:
+                with self._lock:
+                    self.hits = self.hits + 1
+                return result
+            try:
+                result = fetch()
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+            with self._lock:
+                self.misses = self.misses + 1
+                if version == self._version:
+                    self._results[key] = result
+                    self._results.move_to_end(key)
+                    if len(self._results) > self.MAXSIZE:
+                        self._results.popitem(last=False)
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+_RESULT_CACHES: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def result_cache(engine: Engine) -> ResultCache | None:
+    """The `ResultCache` shared by the data sources reading from the database pointed
+    by `engine`, or `None` if results are not cached, see `RESULT_CACHE_SIZE`.
+    """
+    if RESULT_CACHE_SIZE <= 0:
+        return None
+    with _ROW_CACHES_LOCK:
+        if engine not in _RESULT_CACHES:
+            _RESULT_CACHES[engine] = ResultCache(RESULT_CACHE_SIZE)
+        return _RESULT_CACHES[engine]
+
+
+####################
+# ASYNC
+####################
+
+DB_THREADS = 4
+"""Number of threads that run the database calls awaited through `run_in_db_thread`.
+"""
+_DB_EXECUTOR: ThreadPoolExecutor | None = None
+_DB_EXECUTOR_LOCK = Lock()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by every `run_in_db_thread` call, created on first use."""
+    global _DB_EXECUTOR
+    with _DB_EXECUTOR_LOCK:
+        if _DB_EXECUTOR is None:
+            _DB_EXECUTOR = ThreadPoolExecutor(
+                max_workers=DB_THREADS, thread_name_prefix="cashd-db"
+            )
+        return _DB_EXECUTOR
+
+
+async def run_in_db_thread(fn: Callable, *args, **kwargs) -> Any:
+    """Runs `fn(*args, **kwargs)` in the database thread pool and waits for it's
+    result, so blocking queries don't hold the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(fn, *args, **kwargs))
+
+
+####################
+# CHANGE NOTIFICATIONS
+####################
+
+
+class LedgerChange(NamedTuple):
+    """Change in the ledger of one customer, published by `ledger_changes`.
+
+    :param kind: One of "transaction_added", "transaction_deleted" or
+      "customer_updated".
+    :param customer_id: Id of the customer affected.
+    :param delta: Change in the customer's balance, in cents.
+    :param balance: Customer's balance after the change, in cents.
+    :param transaction_id: Id of the transaction added or deleted, `None` for customer
+      updates and batches of transactions.
+    :param transaction_date: Date of the transaction added or deleted.
+    """
+
+    kind: Literal["transaction_added", "transaction_deleted", "customer_updated"]
+    customer_id: int
+    delta: int
+    balance: int
+    transaction_id: int | None = None
+    transaction_date: date | None = None
+
+
+class ChangeBus:
+    def __init__(self):
+        """Delivers every published change to all subscribed callbacks, in the thread
+        that published it. Callbacks should be quick, and hand the change over to their
+        own thread or event loop when needed.
+        """
+        self._subscribers: list[Callable[[Any], None]] = []
+        self._lock = Lock()
+
+    def subscribe(self, callback: Callable[[Any], None]) -> Callable[[], None]:
+        """Calls `callback` with each change published from now on.
+
+        :returns: Function that cancels this subscription.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback: Callable[[Any], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def has_subscribers(self) -> bool:
+        """Wether anyone would receive a published change, so publishers can skip
+        building it.
+        """
+        return len(self._subscribers) > 0
+
+    def publish(self, change: Any):
+        """Calls every subscribed callback with `change`. Errors in one callback are
+        logged, and don't stop the others.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception:
+                logging.getLogger(__name__).exception(
+                    f"Erro notificando {change} para {callback}"
+                )
+
+
+ledger_changes = ChangeBus()
+"""Publishes a `LedgerChange` after every transaction written or deleted, and every
+customer updated, through `cashd_core.data.dec_base`.
+"""
+
+
+def _customer_balances(ses: Session, customer_ids: Iterable[int]) -> Dict[int, int]:
+    """Balances of the customers `customer_ids`, in cents, read in the current
+    transaction of `ses`. Called before a write is committed, they are the balances
+    right after that write, even when other writes for the same customers follow it.
+    """
+    customer_ids = list(customer_ids)
+    stmt = select(customer_summary.c.IdCliente, customer_summary.c.Saldo).where(
+        customer_summary.c.IdCliente.in_(customer_ids)
+    )
+    balances = dict.fromkeys(customer_ids, 0)
+    balances.update((row.IdCliente, row.Saldo) for row in ses.execute(stmt))
+    return balances
+
+
 ####################
 # STRUCTURE + INTERACTION
 ####################
@@ -157,19 +650,28 @@ def fmt_currency(inp: Any) -> int:
 
 class dec_base(DeclarativeBase):
     Id = Column("Id", Integer, primary_key=True)
+    READ_CACHE_SIZE = 0
+    """Number of rows of this table that `read` keeps in memory, see `row_cache`. Use
+    0 to always read from the database.
+    """
+    DERIVED_COLUMNS: tuple[str, ...] = ()
+    """Columns computed from the other columns by `write`, `update` and
+    `validated_row`, see `_derived_values`. They are left out of `data`, so they never
+    reach the forms.
+    """
 
     @staticmethod
     def _display_name(name: str):
         """Wrapper to generate the *display name* of any data scalar in `self.data`."""
         return name
 
-    def table_is_empty(self, engine: Engine = DB_ENGINE):
+    def table_is_empty(self, engine: Engine | None = None):
         """Static method that returns a boolean value indicating if the current table
         is empty. Should only be used by classes that inherit from
         `cashd_core.data.dec_base`.
         """
         table_cls = type(self)
-        with Session(engine) as ses:
+        with Session(get_engine(engine)) as ses:
             stmt = select(func.count()).select_from(table_cls)
             return ses.execute(stmt).scalar() == 0
 
@@ -178,7 +680,7 @@ class dec_base(DeclarativeBase):
         return {
             colname: getattr(self, colname, None)
             for colname in self.__table__.c.keys()
-            if colname != "Id"
+            if colname not in ("Id", *self.DERIVED_COLUMNS)
         }
 
     @property
@@ -186,7 +688,7 @@ class dec_base(DeclarativeBase):
         return {
             colname: self._display_name(colname)
             for colname in self.__table__.c.keys()
-            if colname != "Id"
+            if colname not in ("Id", *self.DERIVED_COLUMNS)
         }
 
     @property
@@ -194,7 +696,7 @@ class dec_base(DeclarativeBase):
         return {
             colname: type(self.__table__.c[colname].type)
             for colname in self.__table__.c.keys()
-            if colname != "Id"
+            if colname not in ("Id", *self.DERIVED_COLUMNS)
         }
 
     @property
@@ -212,16 +714,26 @@ class dec_base(DeclarativeBase):
         """
         return all(getattr(self, col) for col in self.required_fieldnames)
 
-    def read(self, row_id: int, engine: Engine = DB_ENGINE):
+    def read(self, row_id: int, engine: Engine | None = None):
         """
         Fetches one row of data from the database and loads into this instance.
 
         :param row_id: Primary key integer value to look for in the table.
-        :param engine: `sqlalchemy.Engine` reflecting the database that will be read.
+        :param engine: `sqlalchemy.Engine` reflecting the database that will be read,
+          uses `get_engine()` if `None`.
 
         :raises ValueError: If `row_id` is not present in the table.
         """
         cls = type(self)
+        engine = get_engine(engine)
+        cache = row_cache(engine, cls)
+        if cache is not None:
+            version = data_version(engine)
+            values = cache.get(row_id, version)
+            if values is not None:
+                for name, value in values.items():
+                    setattr(self, name, value)
+                return
         stmt = select(cls).where(cls.Id == row_id)
         with Session(bind=engine) as ses:
             res = ses.execute(stmt).first()
@@ -231,9 +743,17 @@ class dec_base(DeclarativeBase):
                         self.__tablename__}.Id'."
                 )
             row = res[0]
-            for col in self.__table__.columns:
-                value = getattr(row, col.name, None)
-                setattr(self, col.name, value)
+            values = {
+                col.name: getattr(row, col.name, None) for col in self.__table__.columns
+            }
+        for name, value in values.items():
+            setattr(self, name, value)
+        if cache is not None:
+            cache.put(row_id, values, version)
+
+    async def read_async(self, row_id: int, engine: Engine | None = None):
+        """Same as `read`, awaited from the database thread pool."""
+        await run_in_db_thread(self.read, row_id, engine)
 
     def clear(self):
         """Returns all dataclass fields to their defaults, and `Id=None`."""
@@ -248,7 +768,7 @@ class dec_base(DeclarativeBase):
         for name, value in tbl_obj.data.items():
             setattr(self, name, value)
 
-    def update(self, engine: Engine = DB_ENGINE):
+    def update(self, engine: Engine | None = None):
         """If `self.Id` is defined, validates and updates the corresponding row in the
         database with it's own values.
 
@@ -256,37 +776,183 @@ class dec_base(DeclarativeBase):
         """
         if not self.Id:
             raise AttributeError(f"Expected `self.Id` to be integer, got {self.Id=}.")
+        engine = get_engine(engine)
         cls = type(self)
+        values = self.data
+        values.update(self._derived_values(values))
         with Session(bind=engine) as ses:
-            stmt = update(cls).where(cls.Id == self.Id).values(**self.data)
+            stmt = update(cls).where(cls.Id == self.Id).values(**values)
             ses.execute(stmt)
+            after_commit = cls._on_update(ses, self.Id)
             ses.commit()
+        bump_data_version(engine)
         self.read(row_id=self.Id, engine=engine)
+        if after_commit is not None:
+            after_commit()
+
+    async def update_async(self, engine: Engine | None = None):
+        """Same as `update`, awaited from the database thread pool."""
+        await run_in_db_thread(self.update, engine)
 
-    def write(self, engine: Engine = DB_ENGINE):
+    def write(self, engine: Engine | None = None):
         """Validates and adds a new row in the database with it's own data."""
+        engine = get_engine(engine)
         cls = type(self)
+        values = self.data
+        values.update(self._derived_values(values))
         with Session(bind=engine) as ses:
-            stmt = insert(cls).values(**self.data)
-            ses.execute(stmt)
+            stmt = insert(cls).values(**values)
+            self.Id = ses.execute(stmt).inserted_primary_key[0]
+            after_commit = cls._on_insert(ses, [{"Id": self.Id, **values}])
             ses.commit()
+        bump_data_version(engine)
+        if after_commit is not None:
+            after_commit()
+
+    @classmethod
+    def _on_insert(
+        cls, ses: Session, rows: List[Dict[str, Any]]
+    ) -> Callable[[], Any] | None:
+        """Runs in the transaction that inserts `rows` in this table, right before it
+        is committed, so other tables can be updated along with them. Rows inserted one
+        at a time also have their "Id".
+
+        :returns: Function to be called once the rows are committed, or `None`.
+        """
+        return None
 
-    def delete(self, engine: Engine = DB_ENGINE):
+    @classmethod
+    def _on_update(cls, ses: Session, row_id: int) -> Callable[[], Any] | None:
+        """Runs in the transaction that updates the row `row_id` of this table, right
+        before it is committed, see `_on_insert`.
+
+        :returns: Function to be called once the row is committed, or `None`.
+        """
+        return None
+
+    @classmethod
+    def _derived_values(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Values of `DERIVED_COLUMNS` computed from the column `values` of a row, the
+        ones that cannot be computed are left out.
+        """
+        return {}
+
+    @classmethod
+    def validated_row(cls, row: Self | Dict[str, Any]) -> Dict[str, Any]:
+        """Converts `row` to a dict with every column of this table, using the column
+        defaults for missing values, and validates it using the same rules applied
+        when it is written.
+
+        :param row: Instance of this table, or dict mapping column names to values.
+        :raises ValueError: Naming every invalid column of `row`.
+        """
+        dialect = sqlite_dialect()
+        if isinstance(row, dec_base):
+            row = row.data
+        values, errors = {}, []
+        for col in cls.__table__.columns:
+            if col.name in ("Id", *cls.DERIVED_COLUMNS):
+                continue
+            is_scalar = getattr(col.default, "is_scalar", False)
+            values[col.name] = row.get(col.name, col.default.arg if is_scalar else None)
+            if not isinstance(col.type, types.TypeDecorator):
+                continue
+            try:
+                col.type.process_bind_param(values[col.name], dialect)
+            except (ValueError, TypeError, AttributeError) as err:
+                errors.append(f"{col.name}: {err}")
+        if len(errors) > 0:
+            raise ValueError("; ".join(errors))
+        values.update(cls._derived_values(values))
+        return values
+
+    @classmethod
+    def _bulk_rows(cls, rows: Iterable[Self | Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Converts and validates all `rows` at once, see `validated_row`.
+
+        :raises ValueError: Listing the position of every invalid row.
+        """
+        data, errors = [], []
+        for n, row in enumerate(rows, start=1):
+            try:
+                data.append(cls.validated_row(row))
+            except ValueError as err:
+                errors.append(f"{n} ({err})")
+        if len(errors) > 0:
+            raise ValueError(f"Linhas inválidas: {', '.join(errors)}")
+        return data
+
+    @classmethod
+    def _insert_rows(cls, data: List[Dict[str, Any]], engine: Engine | None = None):
+        """Inserts rows already validated by `validated_row` in a single transaction."""
+        engine = get_engine(engine)
+        with Session(bind=engine) as ses:
+            ses.execute(insert(cls), data)
+            after_commit = cls._on_insert(ses, data)
+            ses.commit()
+        bump_data_version(engine)
+        if after_commit is not None:
+            after_commit()
+
+    @classmethod
+    def write_many(
+        cls, rows: Iterable[Self | Dict[str, Any]], engine: Engine | None = None
+    ) -> int:
+        """Validates and adds many new rows to the database, in a single transaction.
+        Nothing is written if any of the rows is invalid.
+
+        :param rows: Instances of this table, or dicts mapping column names to values.
+        :param engine: `sqlalchemy.Engine` reflecting the database that will be
+          written, uses `get_engine()` if `None`.
+
+        :returns: Number of rows written.
+        :raises ValueError: If any row is invalid.
+        """
+        data = cls._bulk_rows(rows)
+        if len(data) == 0:
+            return 0
+        cls._insert_rows(data, engine)
+        return len(data)
+
+    async def write_async(self, engine: Engine | None = None):
+        """Same as `write`, awaited from the database thread pool."""
+        await run_in_db_thread(self.write, engine)
+
+    @classmethod
+    async def write_many_async(
+        cls, rows: Iterable[Self | Dict[str, Any]], engine: Engine | None = None
+    ) -> int:
+        """Same as `write_many`, awaited from the database thread pool."""
+        return await run_in_db_thread(cls.write_many, list(rows), engine)
+
+    def delete(self, engine: Engine | None = None):
         """If `self.Id` is present in the database, attempts to delete it.
 
         :raises AttributeError: If `self.Id` is None or not defined.
         :raises sqlalchemy.exc.IntegrityError: If this deletion would leave orphaned
           foreign keys.
         """
+        engine = get_engine(engine)
         cls = type(self)
         with Session(bind=engine) as ses:
             stmt = delete(cls).where(cls.Id == self.Id)
             ses.execute(stmt)
             ses.commit()
+        bump_data_version(engine)
+
+    async def delete_async(self, engine: Engine | None = None):
+        """Same as `delete`, awaited from the database thread pool."""
+        await run_in_db_thread(self.delete, engine)
 
 
 class tbl_clientes(dec_base):
     __tablename__ = "clientes"
+    READ_CACHE_SIZE = 1024
+    DERIVED_COLUMNS = ("TelefoneE164",)
+    __table_args__ = (
+        Index("ix_clientes_Nome", "PrimeiroNome", "Sobrenome"),
+        Index("ix_clientes_TelefoneE164", "TelefoneE164"),
+    )
     SaldoTransacoes: Mapped[List["tbl_transacoes"]] = relationship()
 
     PrimeiroNome = Column("PrimeiroNome", RequiredText, nullable=False)
@@ -299,28 +965,111 @@ class tbl_clientes(dec_base):
     Bairro = Column("Bairro", NotRequiredText)
     Cidade = Column("Cidade", RequiredText, nullable=False)
     Estado = Column("Estado", RequiredStateAcronym, nullable=False)
+    TelefoneE164 = Column("TelefoneE164", String)
+
+    @classmethod
+    def _derived_values(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        phone = values.get("Telefone", cls.Telefone.default.arg)
+        try:
+            return {"TelefoneE164": normalize_phonenumber(phone)[1]}
+        except (ValueError, TypeError, AttributeError):
+            # invalid numbers are reported when `Telefone` is bound
+            return {}
+
+    @classmethod
+    def _on_update(cls, ses: Session, row_id: int) -> Callable[[], Any] | None:
+        """Publishes the update to `ledger_changes`, once it is committed."""
+        if not ledger_changes.has_subscribers():
+            return None
+        change = LedgerChange(
+            kind="customer_updated",
+            customer_id=row_id,
+            delta=0,
+            balance=_customer_balances(ses, [row_id])[row_id],
+        )
+        return lambda: ledger_changes.publish(change)
+
+    @classmethod
+    def ids_by_phonenumber(cls, phone: str, engine: Engine | None = None) -> List[int]:
+        """Ids of the customers with the phone number `phone`, in any format. Stored
+        numbers are compared by their E.164 form, without parsing them again.
+
+        :raises ValueError: If `phone` is not a valid phone number.
+        """
+        e164 = normalize_phonenumber(phone)[1]
+        stmt = select(cls.Id).where(cls.TelefoneE164 == e164).order_by(cls.Id)
+        with Session(get_engine(engine)) as ses:
+            return list(ses.execute(stmt).scalars())
 
     @property
     def Transacs(self) -> List[Dict]:
-        """List with selected customer's transactions, most recent first."""
+        """List with selected customer's transactions, most recent first. Customers
+        with long histories should use `transactions` to fetch them in windows.
+        """
+        return self.transactions()
+
+    def transactions(
+        self,
+        limit: int | None = None,
+        before_id: int | None = None,
+        since: date | None = None,
+        until: date | None = None,
+        engine: Engine | None = None,
+    ) -> List[Dict]:
+        """Window of the selected customer's transactions, most recent first, with
+        the keys "id", "data", "valor" and "saldo", the customer's balance right after
+        each transaction, also kept in integer cents as "saldo_cents". To fetch the next
+        window, pass the "id" of the last transaction received as `before_id`.
+
+        The balance is a running sum over the customer's transactions in the order they
+        were registered, computed by the database in the same query, so only the rows
+        in the window are sent to Python.
+
+        :param limit: Maximum number of transactions returned, all if `None`.
+        :param before_id: Only transactions registered before the one with this Id.
+        :param since: Only transactions dated on or after this date.
+        :param until: Only transactions dated on or before this date.
+        :param engine: `sqlalchemy.Engine` reflecting the database that will be read,
+          uses `get_engine()` if `None`.
+        """
         customer_id = getattr(self, "Id", None)
         if not customer_id:
             return []
-        stmt = (
-            select(tbl_transacoes.Id, tbl_transacoes.DataTransac, tbl_transacoes.Valor)
-            .where(tbl_transacoes.IdCliente == customer_id)
-            .order_by(tbl_transacoes.Id.desc())
-        )
-        with Session(DB_ENGINE) as ses:
+        running = select(
+            tbl_transacoes.Id,
+            tbl_transacoes.DataTransac,
+            type_coerce(tbl_transacoes.Valor, Integer).label("Valor"),
+            type_coerce(
+                func.sum(tbl_transacoes.Valor).over(order_by=tbl_transacoes.Id),
+                Integer,
+            ).label("Saldo"),
+        ).where(tbl_transacoes.IdCliente == customer_id)
+        # the balance only depends on earlier transactions, so later ones can be left
+        # out before the window function runs, unlike the date filters
+        if before_id is not None:
+            running = running.where(tbl_transacoes.Id < before_id)
+        running = running.subquery()
+        stmt = select(running).order_by(running.c.Id.desc())
+        if since is not None:
+            stmt = stmt.where(running.c.DataTransac >= since)
+        if until is not None:
+            stmt = stmt.where(running.c.DataTransac <= until)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        with Session(get_engine(engine)) as ses:
             res = ses.execute(stmt).all()
-            return (
-                {
-                    "id": r.Id,
-                    "data": r.DataTransac,
-                    "valor": f"{r.Valor/100:.2f}".replace(".", ","),
-                }
-                for r in res
-            )
+        amounts = fmt.format_cents([r.Valor for r in res])
+        balances = fmt.format_cents([r.Saldo for r in res])
+        return [
+            {
+                "id": r.Id,
+                "data": r.DataTransac,
+                "valor": amount,
+                "saldo": balance,
+                "saldo_cents": r.Saldo,
+            }
+            for r, amount, balance in zip(res, amounts, balances)
+        ]
 
     @property
     def NomeCompleto(self):
@@ -347,11 +1096,11 @@ class tbl_clientes(dec_base):
         customer_id = getattr(self, "Id", None)
         if customer_id is None:
             return const.NA_VALUE
-        stmt = select(func.sum(tbl_transacoes.Valor)).where(
-            tbl_transacoes.IdCliente == self.Id
+        stmt = select(customer_summary.c.Saldo).where(
+            customer_summary.c.IdCliente == self.Id
         )
-        with Session(DB_ENGINE) as ses:
-            value = ses.execute(stmt).scalar_one()
+        with Session(get_engine()) as ses:
+            value = ses.execute(stmt).scalar()
             if value is None:
                 return "0,00"
         return f"{value/100:.2f}".replace(".", ",")
@@ -381,6 +1130,11 @@ class tbl_clientes(dec_base):
 
 class tbl_transacoes(dec_base):
     __tablename__ = "transacoes"
+    READ_CACHE_SIZE = 256
+    __table_args__ = (
+        Index("ix_transacoes_IdCliente_Id", "IdCliente", "Id"),
+        Index("ix_transacoes_DataTransac", "DataTransac"),
+    )
     NomeCliente: Mapped["tbl_clientes"] = relationship(back_populates="SaldoTransacoes")
 
     IdCliente: Mapped[int] = Column("IdCliente", ForeignKey("clientes.Id"))
@@ -388,17 +1142,78 @@ class tbl_transacoes(dec_base):
     DataTransac = Column("DataTransac", Date)
     Valor = Column("Valor", CurrencyAmount)  # valor em centavos
 
-    def write(self, engine: Engine = DB_ENGINE):
-        super().write(engine)
-        if not prefs.BackupOnTransaction.get():
+    @classmethod
+    def _on_insert(
+        cls, ses: Session, rows: List[Dict[str, Any]]
+    ) -> Callable[[], Any] | None:
+        """Counts the inserted transactions towards the next automatic backup, and
+        builds the changes published to `ledger_changes`, one for each customer in a
+        batch. Both the backup and the changes run after the rows are committed.
+        """
+        run_backup = count_towards_backup(ses, len(rows))
+        changes = []
+        if ledger_changes.has_subscribers():
+            deltas: Dict[int, int] = {}
+            for row in rows:
+                customer_id, delta = row["IdCliente"], fmt_currency(row["Valor"])
+                deltas[customer_id] = deltas.get(customer_id, 0) + delta
+            balances = _customer_balances(ses, deltas)
+            # only transactions written one at a time are identified
+            single = rows[0] if (len(rows) == 1) and ("Id" in rows[0]) else {}
+            changes = [
+                LedgerChange(
+                    kind="transaction_added",
+                    customer_id=customer_id,
+                    delta=delta,
+                    balance=balances[customer_id],
+                    transaction_id=single.get("Id", None),
+                    transaction_date=single.get("DataTransac", None),
+                )
+                for customer_id, delta in deltas.items()
+            ]
+        if not run_backup and not changes:
+            return None
+
+        def after_commit():
+            for change in changes:
+                ledger_changes.publish(change)
+            if run_backup:
+                backup.run(force=True)
+
+        return after_commit
+
+    def delete(self, engine: Engine | None = None):
+        if not ledger_changes.has_subscribers():
+            return super().delete(engine)
+        engine = get_engine(engine)
+        # the deleted row is returned by the same statement, to build the change
+        stmt = (
+            delete(tbl_transacoes)
+            .where(tbl_transacoes.Id == self.Id)
+            .returning(
+                tbl_transacoes.IdCliente,
+                tbl_transacoes.DataTransac,
+                type_coerce(tbl_transacoes.Valor, Integer).label("Valor"),
+            )
+        )
+        with Session(bind=engine) as ses:
+            deleted = ses.execute(stmt).first()
+            if deleted is not None:
+                balances = _customer_balances(ses, [deleted.IdCliente])
+            ses.commit()
+        bump_data_version(engine)
+        if deleted is None:
             return
-        remaining = prefs.TransactionsToBackup.get()
-        if remaining == 1:
-            backup.run(force=True)
-            default = prefs.TransactionsPerBackup.get()
-            prefs.TransactionsToBackup.set(default)
-        else:
-            prefs.TransactionsToBackup.set(remaining - 1)
+        ledger_changes.publish(
+            LedgerChange(
+                kind="transaction_deleted",
+                customer_id=deleted.IdCliente,
+                delta=-(deleted.Valor or 0),
+                balance=balances[deleted.IdCliente],
+                transaction_id=self.Id,
+                transaction_date=deleted.DataTransac,
+            )
+        )
 
     def __repr__(self):
         Id, Valor, DataTransac, IdCliente = (
@@ -410,6 +1225,47 @@ class tbl_transacoes(dec_base):
         return f"<cashd transaction {Id=}, {IdCliente}, {DataTransac=}, {Valor=}>"
 
 
+customer_summary = Table(
+    "customer_summary",
+    dec_base.metadata,
+    Column("IdCliente", Integer, ForeignKey("clientes.Id"), primary_key=True),
+    Column("Saldo", Integer, nullable=False, default=0),  # saldo em centavos
+    Column("NumTransacoes", Integer, nullable=False, default=0),
+    Column("PrimeiraTransac", Date),
+    Column("UltimaTransac", Date),
+)
+"""Balance, number of transactions, and first and last transaction dates of each
+customer with at least one transaction. Kept in sync with the 'transacoes' table by
+triggers, see `check_customer_summary` and `rebuild_customer_summary`.
+"""
+
+daily_balance = Table(
+    "daily_balance",
+    dec_base.metadata,
+    Column("DataTransac", Date, primary_key=True),
+    Column("Somas", Integer, nullable=False, default=0),  # somas em centavos
+    Column("Deducoes", Integer, nullable=False, default=0),  # deducoes em centavos
+    Column("NumTransacoes", Integer, nullable=False, default=0),
+)
+"""Sums, deductions and number of transactions of each day with at least one
+transaction. Kept in sync with the 'transacoes' table by triggers, see
+`check_daily_balance` and `rebuild_daily_balance`.
+"""
+
+backup_counter = Table(
+    "backup_counter",
+    dec_base.metadata,
+    Column("Id", Integer, primary_key=True),
+    Column("Ativo", Integer, nullable=False, default=1),
+    Column("TransacoesPorBackup", Integer, nullable=False, default=20),
+    Column("TransacoesRestantes", Integer, nullable=False, default=20),
+    Column("Disparou", Integer, nullable=False, default=0),
+)
+"""Single row counting the transactions left until the next automatic backup, updated
+in the same transaction that inserts them, see `count_towards_backup`.
+"""
+
+
 def get_default_customer() -> tbl_clientes:
     """Returns a customer filled with all current default values."""
     customer = tbl_clientes()
@@ -419,7 +1275,506 @@ def get_default_customer() -> tbl_clientes:
     return customer
 
 
-dec_base.metadata.create_all(DB_ENGINE)
+####################
+# SEARCH INDEX
+####################
+
+
+CUSTOMER_SEARCH_INDEX = table("clientes_busca", column("rowid"))
+"""FTS5 index over the customer's name, nickname, address, district, city and state,
+with it's `rowid` matching `clientes.Id`.
+"""
+_CUSTOMER_SEARCH_COLNAMES = [
+    "PrimeiroNome",
+    "Sobrenome",
+    "Apelido",
+    "Endereco",
+    "Bairro",
+    "Cidade",
+    "Estado",
+]
+_SEARCH_INDEX_ENGINES: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _create_customer_search_index(connection: Connection):
+    """Creates `CUSTOMER_SEARCH_INDEX` and the triggers that keep it in sync with the
+    'clientes' table, populating it with the existing customers. Does nothing if the
+    index already exists, and falls back to unindexed searches if the SQLite build
+    lacks FTS5.
+    """
+    name = CUSTOMER_SEARCH_INDEX.name
+    cols = ", ".join(_CUSTOMER_SEARCH_COLNAMES)
+    new_cols = ", ".join(f"new.{col}" for col in _CUSTOMER_SEARCH_COLNAMES)
+    old_cols = ", ".join(f"old.{col}" for col in _CUSTOMER_SEARCH_COLNAMES)
+    exists_stmt = text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name")
+    if connection.execute(exists_stmt, {"name": name}).first() is None:
+        try:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {name} USING fts5({cols}, content='clientes', "
+                "content_rowid='Id', tokenize='unicode61 remove_diacritics 2', "
+                "prefix='2 3')"
+            )
+        except OperationalError:
+            return
+        connection.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON clientes BEGIN "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.Id, {new_cols}); END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON clientes BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) "
+        f"VALUES ('delete', old.Id, {old_cols}); END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE ON clientes BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) "
+        f"VALUES ('delete', old.Id, {old_cols}); "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.Id, {new_cols}); END"
+    )
+    _SEARCH_INDEX_ENGINES[connection.engine] = True
+
+
+def search_index_is_available(engine: Engine) -> bool:
+    """Wether `CUSTOMER_SEARCH_INDEX` was set up on the database pointed by `engine`."""
+    return _SEARCH_INDEX_ENGINES.get(engine, False)
+
+
+def fmt_search_index_query(keywords: Iterable[str]) -> str:
+    """Builds a FTS5 query that matches rows containing words starting with each
+    one of the `keywords`.
+    """
+    return " ".join(f'"{kw}"*' for kw in keywords)
+
+
+####################
+# CUSTOMER SUMMARY
+####################
+
+
+def _summary_add_sql(row: Literal["new", "old"]) -> str:
+    return (
+        "INSERT INTO customer_summary "
+        "(IdCliente, Saldo, NumTransacoes, PrimeiraTransac, UltimaTransac) "
+        f"SELECT {row}.IdCliente, coalesce({row}.Valor, 0), 1, {row}.DataTransac, "
+        f"{row}.DataTransac WHERE {row}.IdCliente IS NOT NULL "
+        "ON CONFLICT (IdCliente) DO UPDATE SET "
+        "Saldo = Saldo + excluded.Saldo, "
+        "NumTransacoes = NumTransacoes + 1, "
+        "PrimeiraTransac = coalesce(min(PrimeiraTransac, excluded.PrimeiraTransac), "
+        "PrimeiraTransac, excluded.PrimeiraTransac), "
+        "UltimaTransac = coalesce(max(UltimaTransac, excluded.UltimaTransac), "
+        "UltimaTransac, excluded.UltimaTransac);"
+    )
+
+
+def _summary_remove_sql(row: Literal["new", "old"]) -> str:
+    return (
+        "UPDATE customer_summary SET "
+        f"Saldo = Saldo - coalesce({row}.Valor, 0), "
+        "NumTransacoes = NumTransacoes - 1, "
+        "PrimeiraTransac = (SELECT min(DataTransac) FROM transacoes "
+        f"WHERE IdCliente = {row}.IdCliente), "
+        "UltimaTransac = (SELECT max(DataTransac) FROM transacoes "
+        f"WHERE IdCliente = {row}.IdCliente) "
+        f"WHERE IdCliente = {row}.IdCliente; "
+        "DELETE FROM customer_summary "
+        f"WHERE IdCliente = {row}.IdCliente AND NumTransacoes <= 0;"
+    )
+
+
+def _create_customer_summary_triggers(connection: Connection):
+    """Creates the triggers that keep `customer_summary` in sync with the 'transacoes'
+    and 'clientes' tables. Does nothing if they already exist.
+    """
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS customer_summary_insert "
+        f"AFTER INSERT ON transacoes BEGIN {_summary_add_sql('new')} END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS customer_summary_delete "
+        f"AFTER DELETE ON transacoes BEGIN {_summary_remove_sql('old')} END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS customer_summary_update "
+        "AFTER UPDATE OF IdCliente, DataTransac, Valor ON transacoes BEGIN "
+        f"{_summary_remove_sql('old')} {_summary_add_sql('new')} END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS customer_summary_delete_customer "
+        "AFTER DELETE ON clientes BEGIN "
+        "DELETE FROM customer_summary WHERE IdCliente = old.Id; END"
+    )
+
+
+def _customer_ledger_stmt() -> Select:
+    """Aggregates the 'transacoes' table into the same columns as `customer_summary`."""
+    return (
+        select(
+            tbl_transacoes.IdCliente,
+            func.coalesce(func.sum(type_coerce(tbl_transacoes.Valor, Integer)), 0),
+            func.count(),
+            func.min(tbl_transacoes.DataTransac),
+            func.max(tbl_transacoes.DataTransac),
+        )
+        .where(tbl_transacoes.IdCliente.is_not(None))
+        .group_by(tbl_transacoes.IdCliente)
+    )
+
+
+def rebuild_customer_summary(
+    engine: Engine | None = None, connection: Connection | None = None
+):
+    """Recomputes every row of `customer_summary` from the 'transacoes' table, and
+    makes sure the triggers that keep it in sync exist.
+
+    :param engine: Engine pointing to the database that will be rebuilt.
+    :param connection: Connection to use instead of `engine`, the caller is responsible
+      for commiting the changes.
+    """
+    if connection is None:
+        engine = get_engine(engine)
+        with engine.begin() as conn:
+            rebuild_customer_summary(connection=conn)
+        bump_data_version(engine)
+        return
+    _create_customer_summary_triggers(connection)
+    connection.execute(delete(customer_summary))
+    connection.execute(
+        insert(customer_summary).from_select(
+            [
+                "IdCliente",
+                "Saldo",
+                "NumTransacoes",
+                "PrimeiraTransac",
+                "UltimaTransac",
+            ],
+            _customer_ledger_stmt(),
+        )
+    )
+
+
+def check_customer_summary(engine: Engine | None = None) -> List[int]:
+    """Compares `customer_summary` against the 'transacoes' table.
+
+    :returns: Ids of the customers whose summary differs from their transactions,
+      an empty list if the summary is correct.
+    """
+    summary_stmt = select(
+        customer_summary.c.IdCliente,
+        customer_summary.c.Saldo,
+        customer_summary.c.NumTransacoes,
+        customer_summary.c.PrimeiraTransac,
+        customer_summary.c.UltimaTransac,
+    )
+    ledger_stmt = _customer_ledger_stmt()
+    with Session(get_engine(engine)) as ses:
+        missing = ses.execute(ledger_stmt.except_(summary_stmt)).all()
+        extra = ses.execute(summary_stmt.except_(ledger_stmt)).all()
+    return sorted({row[0] for row in missing + extra})
+
+
+####################
+# DAILY BALANCE
+####################
+
+
+def _daily_add_sql(row: Literal["new", "old"], sign: Literal["+", "-"]) -> str:
+    delta = 1 if sign == "+" else -1
+    return (
+        "INSERT INTO daily_balance (DataTransac, Somas, Deducoes, NumTransacoes) "
+        f"SELECT {row}.DataTransac, "
+        f"{sign}(CASE WHEN {row}.Valor > 0 THEN {row}.Valor ELSE 0 END), "
+        f"{sign}(CASE WHEN {row}.Valor < 0 THEN {row}.Valor ELSE 0 END), {delta} "
+        f"WHERE {row}.DataTransac IS NOT NULL "
+        "ON CONFLICT (DataTransac) DO UPDATE SET "
+        "Somas = Somas + excluded.Somas, "
+        "Deducoes = Deducoes + excluded.Deducoes, "
+        "NumTransacoes = NumTransacoes + excluded.NumTransacoes; "
+        "DELETE FROM daily_balance "
+        f"WHERE DataTransac = {row}.DataTransac AND NumTransacoes <= 0;"
+    )
+
+
+def _create_daily_balance_triggers(connection: Connection):
+    """Creates the triggers that keep `daily_balance` in sync with the 'transacoes'
+    table. Does nothing if they already exist.
+    """
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS daily_balance_insert "
+        f"AFTER INSERT ON transacoes BEGIN {_daily_add_sql('new', '+')} END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS daily_balance_delete "
+        f"AFTER DELETE ON transacoes BEGIN {_daily_add_sql('old', '-')} END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS daily_balance_update "
+        "AFTER UPDATE OF DataTransac, Valor ON transacoes BEGIN "
+        f"{_daily_add_sql('old', '-')} {_daily_add_sql('new', '+')} END"
+    )
+
+
+def _daily_ledger_stmt() -> Select:
+    """Aggregates the 'transacoes' table into the same columns as `daily_balance`."""
+    valor = type_coerce(tbl_transacoes.Valor, Integer)
+    return (
+        select(
+            tbl_transacoes.DataTransac,
+            func.coalesce(func.sum(case((valor > 0, valor), else_=0)), 0),
+            func.coalesce(func.sum(case((valor < 0, valor), else_=0)), 0),
+            func.count(),
+        )
+        .where(tbl_transacoes.DataTransac.is_not(None))
+        .group_by(tbl_transacoes.DataTransac)
+    )
+
+
+def rebuild_daily_balance(
+    engine: Engine | None = None, connection: Connection | None = None
+):
+    """Recomputes every row of `daily_balance` from the 'transacoes' table, and makes
+    sure the triggers that keep it in sync exist.
+
+    :param engine: Engine pointing to the database that will be rebuilt.
+    :param connection: Connection to use instead of `engine`, the caller is responsible
+      for commiting the changes.
+    """
+    if connection is None:
+        engine = get_engine(engine)
+        with engine.begin() as conn:
+            rebuild_daily_balance(connection=conn)
+        bump_data_version(engine)
+        return
+    _create_daily_balance_triggers(connection)
+    connection.execute(delete(daily_balance))
+    connection.execute(
+        insert(daily_balance).from_select(
+            ["DataTransac", "Somas", "Deducoes", "NumTransacoes"],
+            _daily_ledger_stmt(),
+        )
+    )
+
+
+def check_daily_balance(engine: Engine | None = None) -> List[date]:
+    """Compares `daily_balance` against the 'transacoes' table.
+
+    :returns: Dates whose rollup differs from their transactions, an empty list if the
+      rollup is correct.
+    """
+    rollup_stmt = select(
+        daily_balance.c.DataTransac,
+        daily_balance.c.Somas,
+        daily_balance.c.Deducoes,
+        daily_balance.c.NumTransacoes,
+    )
+    ledger_stmt = _daily_ledger_stmt()
+    with Session(get_engine(engine)) as ses:
+        missing = ses.execute(ledger_stmt.except_(rollup_stmt)).all()
+        extra = ses.execute(rollup_stmt.except_(ledger_stmt)).all()
+    return sorted({row[0] for row in missing + extra})
+
+
+####################
+# BACKUP COUNTER
+####################
+
+
+def _seed_backup_counter(connection: Connection):
+    """Creates the row of `backup_counter` from the backup preferences, if missing.
+    Preferences are only read here, never when transactions are written.
+    """
+    stmt = select(backup_counter.c.Id).where(backup_counter.c.Id == 1)
+    if connection.execute(stmt).first() is not None:
+        return
+    connection.execute(
+        insert(backup_counter).values(
+            Id=1,
+            Ativo=int(prefs.BackupOnTransaction.get()),
+            TransacoesPorBackup=prefs.TransactionsPerBackup.get(),
+            TransacoesRestantes=prefs.TransactionsToBackup.get(),
+        )
+    )
+
+
+def count_towards_backup(connection: Connection | Session, n_transactions: int) -> bool:
+    """Discounts `n_transactions` from the transactions left until the next automatic
+    backup, in the current transaction of `connection`. The count starts over when it
+    reaches zero.
+
+    The counter is read and updated by a single `UPDATE ... RETURNING`, so among
+    concurrent writers only the one that reaches the count is told to run a backup.
+
+    :returns: Wether this call reached the count, and a backup should run once the
+      transaction is committed. Always `False` while automatic backups are disabled.
+    """
+
+    def build():
+        remaining = backup_counter.c.TransacoesRestantes - bindparam("n_transactions")
+        reached = remaining <= 0
+        return (
+            update(backup_counter)
+            .where(backup_counter.c.Id == 1, backup_counter.c.Ativo == 1)
+            .values(
+                TransacoesRestantes=case(
+                    (reached, backup_counter.c.TransacoesPorBackup), else_=remaining
+                ),
+                Disparou=case((reached, 1), else_=0),
+            )
+            .returning(backup_counter.c.Disparou)
+        )
+
+    stmt = cached_statement((backup_counter, "count"), build)
+    reached = connection.execute(stmt, {"n_transactions": n_transactions}).scalar()
+    return bool(reached)
+
+
+def set_backup_schedule(
+    enabled: bool | None = None,
+    transactions_per_backup: int | None = None,
+    engine: Engine | None = None,
+):
+    """Updates the automatic backups of the database, along with the preferences
+    displayed to the user. Changing `transactions_per_backup` starts the count over.
+
+    :param enabled: Wether a backup should run after every `transactions_per_backup`
+      transactions, keeps the current value if `None`.
+    :param transactions_per_backup: Number of transactions between backups, keeps the
+      current value if `None`.
+    :param engine: `sqlalchemy.Engine` reflecting the database that will be updated,
+      uses `get_engine()` if `None`.
+    """
+    values = {}
+    if enabled is not None:
+        prefs.BackupOnTransaction.set(enabled)
+        values["Ativo"] = int(enabled)
+    if transactions_per_backup is not None:
+        transactions_per_backup = int(transactions_per_backup)
+        prefs.TransactionsPerBackup.set(transactions_per_backup)
+        prefs.TransactionsToBackup.set(transactions_per_backup)
+        values["TransacoesPorBackup"] = transactions_per_backup
+        values["TransacoesRestantes"] = transactions_per_backup
+    if len(values) == 0:
+        return
+    with Session(get_engine(engine)) as ses:
+        stmt = update(backup_counter).where(backup_counter.c.Id == 1).values(values)
+        ses.execute(stmt)
+        ses.commit()
+
+
+def _create_derived_structures(target, connection: Connection, **kw):
+    """Sets up the indexes and summaries derived from the main tables, and the backup
+    counter, after they are created by `dec_base.metadata.create_all`. Existing
+    databases get them on the next `create_all`.
+    """
+    _create_customer_search_index(connection)
+    trigger_stmt = text(
+        "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name=:name"
+    )
+    summary_trigger = {"name": "customer_summary_insert"}
+    if connection.execute(trigger_stmt, summary_trigger).first() is None:
+        rebuild_customer_summary(connection=connection)
+    rollup_trigger = {"name": "daily_balance_insert"}
+    if connection.execute(trigger_stmt, rollup_trigger).first() is None:
+        rebuild_daily_balance(connection=connection)
+    _seed_backup_counter(connection)
+
+
+event.listen(dec_base.metadata, "after_create", _create_derived_structures)
+
+
+####################
+# MIGRATIONS
+####################
+
+
+def _add_hot_query_indexes(connection: Connection):
+    """Creates the indexes used by the customer's history, the date groupings and the
+    customer name lookups.
+    """
+    names = [
+        "ix_clientes_Nome",
+        "ix_transacoes_IdCliente_Id",
+        "ix_transacoes_DataTransac",
+    ]
+    for table in [tbl_clientes.__table__, tbl_transacoes.__table__]:
+        for index in table.indexes:
+            if index.name in names:
+                index.create(connection, checkfirst=True)
+
+
+def _add_phonenumber_e164(connection: Connection):
+    """Adds `tbl_clientes.TelefoneE164`, filled with the numbers of existing customers,
+    and it's index.
+    """
+    columns = [col["name"] for col in inspect(connection).get_columns("clientes")]
+    if "TelefoneE164" not in columns:
+        connection.exec_driver_sql(
+            'ALTER TABLE clientes ADD COLUMN "TelefoneE164" VARCHAR'
+        )
+    rows = connection.execute(
+        select(tbl_clientes.Id, tbl_clientes.Telefone).where(
+            tbl_clientes.TelefoneE164.is_(None)
+        )
+    ).all()
+    normalized = normalize_phonenumbers(r.Telefone for r in rows)
+    params = [
+        {"row_id": r.Id, "e164": numbers[1]}
+        for r, numbers in zip(rows, normalized)
+        if numbers is not None
+    ]
+    if len(params) > 0:
+        connection.execute(
+            text('UPDATE clientes SET "TelefoneE164" = :e164 WHERE "Id" = :row_id'),
+            params,
+        )
+    for index in tbl_clientes.__table__.indexes:
+        if index.name == "ix_clientes_TelefoneE164":
+            index.create(connection, checkfirst=True)
+
+
+MIGRATIONS = [
+    migrations.Migration(
+        version=1,
+        description="Indices para historico, datas e nomes de clientes",
+        upgrade=_add_hot_query_indexes,
+    ),
+    migrations.Migration(
+        version=2,
+        description="Telefone dos clientes no formato E.164",
+        upgrade=_add_phonenumber_e164,
+    ),
+]
+"""Schema changes applied to existing databases, see `cashd_core.migrations`. New
+databases are created with all of them by `dec_base.metadata`.
+"""
+
+
+def _setup_database(engine: Engine):
+    """Creates or migrates the Cashd database."""
+    migrations.init_database(engine, dec_base.metadata, MIGRATIONS)
+
+
+_DATABASE = LazyEngine(Path(const.DATA_DIR, "database.db"), setup=_setup_database)
+
+
+def get_engine(engine: Engine | None = None) -> Engine:
+    """Returns `engine` itself if provided, or the engine pointing to the Cashd
+    database otherwise. The database is created or migrated on the first call.
+    """
+    return _DATABASE.get(engine)
+
+
+def set_engine(target: Engine | str | Path | None = None):
+    """Points `get_engine` to another database, see `LazyEngine.set`."""
+    _DATABASE.set(target)
+
+
+def __getattr__(name: str):
+    # `DB_ENGINE` is created on first use instead of on import
+    if name == "DB_ENGINE":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 FORMATTED_FULL_CUSTOMER_NAME = case(
@@ -497,14 +1852,83 @@ def query_currency(
     ).label(label)
 
 
+def query_cents(value_query, label: str = "Value"):
+    """Selects an amount of money as integer cents, zero if missing. Amounts are only
+    formatted when displayed, see `cashd_core.fmt.format_cents`.
+
+    :param value_query: Input compatible with `sqlalchemy.select` that evaluates to an
+      numeric integer column.
+    :param label: Column label.
+    """
+    return type_coerce(coalesce(value_query, 0), Integer).label(label)
+
+
+def stream_rows(stmt: Select, engine: Engine | None = None, batch_size: int = 1000):
+    """Generator with the rows of `stmt`, fetched in batches of `batch_size` rows
+    from a server-side cursor, so memory use does not depend on the number of rows.
+    The connection is held until the generator is exhausted or closed.
+    """
+    with get_engine(engine).connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(stmt)
+        for row in result:
+            yield row
+
+
+STATEMENT_CACHE_SIZE = 512
+"""Number of statements kept by `cached_statement`, use 0 to build them on every
+call.
+"""
+
+_STATEMENTS: OrderedDict[tuple, Any] = OrderedDict()
+_STATEMENTS_LOCK = Lock()
+
+
+def cached_statement(key: tuple, build: Callable[[], Any]) -> Any:
+    """Statement returned by `build`, reused by later calls with the same `key`.
+
+    Statements are meant to be templates, with the values that change between calls
+    left as `bindparam` and passed when executing them. Reusing the same object skips
+    building it and computing it's cache key, and SQLAlchemy only compiles it once.
+
+    :param key: Hashable tuple identifying the statement. Statements used as parts of
+      `key` are compared by identity.
+    :param build: Callable with no arguments that builds the statement.
+    """
+    if STATEMENT_CACHE_SIZE <= 0:
+        return build()
+    with _STATEMENTS_LOCK:
+        stmt = _STATEMENTS.get(key, None)
+        if stmt is not None:
+            _STATEMENTS.move_to_end(key)
+            return stmt
+    stmt = build()
+    with _STATEMENTS_LOCK:
+        _STATEMENTS[key] = stmt
+        while len(_STATEMENTS) > STATEMENT_CACHE_SIZE:
+            _STATEMENTS.popitem(last=False)
+    return stmt
+
+
 class _DataSource:
+    DATE_FORMAT: str | None = None
+    NROWS_CACHE_SIZE = 64
+    CURRENCY_COLNAMES: tuple[str, ...] = ()
+    """Columns with amounts in integer cents, formatted by `formatted_data`."""
+    DATABASE: LazyEngine = _DATABASE
+    """Database read when no engine is given, sources of other databases replace it."""
+
     def __init__(
         self,
         select_stmt: Select,
         paginated: bool = True,
         searchable: bool = False,
         search_colnames: Iterable[str] = [],
-        engine: Engine = DB_ENGINE,
+        engine: Engine | None = None,
+        keyset: Iterable[tuple[Any, Literal["asc", "desc"]]] = [],
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        search_index: tuple[Any, Any] | None = None,
+        prefetch_pages: bool = False,
     ):
         """Create a data class that interacts with the database, providing interaction
         capabilities to data widgets.
@@ -515,15 +1939,38 @@ class _DataSource:
         :param searchable: Wether this data source handles searches to subset the
           `select_stmt` results.
         :param search_colnames: Name of the columns where the search will be applied.
-        :param engine: Engine pointing to the database where the data will be handled.
+        :param engine: Engine pointing to the database where the data will be handled,
+          uses the one of `DATABASE`, `get_engine()` by default, if `None`.
+        :param keyset: Pairs of `(column, "asc" | "desc")` that reproduce the ordering
+          of `select_stmt` and uniquely identify each of it's rows, used by
+          `pagination_mode="keyset"`.
+        :param pagination_mode: Use "offset" to page with `LIMIT ... OFFSET`, or
+          "keyset" to seek from the last or first key of the current page, so deep
+          pages don't need to walk through all the previous rows.
+        :param count_rows: Wether `nrows` should be counted. Only takes effect on
+          `pagination_mode="keyset"`, when `False` the `nrows` will be `None`, and
+          `has_more` tells if there is a next page.
+        :param search_index: Pair of `(fts_table, key_column)`, where `fts_table` is a
+          FTS5 index whose `rowid` matches `key_column` in `select_stmt`. When present
+          in the database, searches use it to match words starting with each keyword,
+          instead of scanning `search_colnames`.
+        :param prefetch_pages: Wether the pages right before and after the current one
+          are fetched in the database thread pool once it is served, so flipping pages
+          is answered by `result_cache`. Only takes effect on paginated data sources
+          while results are cached.
 
         :raises ValueError: If `searchable=True`, and `search_colnames` is an empty list,
-          or if one of the selected column names are not present in the select query.
+          or if one of the selected column names are not present in the select query,
+          or if `pagination_mode="keyset"` and `keyset` is an empty list.
         """
         if searchable and (len(search_colnames) == 0):
             raise ValueError(
                 "Expecting at least one search colname on searchable data source."
             )
+        if paginated and (pagination_mode == "keyset") and (len(keyset) == 0):
+            raise ValueError(
+                "Expecting at least one keyset column on keyset pagination."
+            )
         selected_colnames = select_stmt.selected_columns.keys()
         for col in search_colnames:
             if col not in selected_colnames:
@@ -534,11 +1981,35 @@ class _DataSource:
         if paginated:
             self._current_page = 1
             self._rows_per_page = prefs.settings.data_tables_rows_per_page
+            self.PAGINATION_MODE = pagination_mode
+            self.COUNT_ROWS = count_rows or (pagination_mode == "offset")
+            # keyset pagination state: the key that the current page seeks from, and
+            # the keys of the first and last rows of the current page
+            self._seek_key: tuple | None = None
+            self._seek_backwards = False
+            self._page_keys: tuple[tuple | None, tuple | None] = (None, None)
+            self._has_previous = False
+            self.has_more = False
+            self.PREFETCH_PAGES = prefetch_pages
+            # data version and queries of the last prefetch, and it's pending fetches
+            self._prefetched: tuple | None = None
+            self._prefetching: list[Future] = []
         if searchable:
             self._search_text = ""
             self.SEARCH_COLNAMES = search_colnames
+            self.SEARCH_INDEX = search_index
         self.SELECT_STMT = select_stmt
-        self.ENGINE = engine
+        # values of the parameters of `SELECT_STMT`, passed on every execution
+        self.SELECT_PARAMS: Dict[str, Any] = {}
+        self.KEYSET = list(keyset)
+        self.ENGINE = self.DATABASE.get(engine)
+        # row counts by `(search_text, DATE_FORMAT, *SELECT_PARAMS)`, valid while the
+        # data version they were counted on is still current
+        self._nrows_cache: dict[tuple, int] = {}
+        self._nrows_version: tuple | None = None
+        # held by the `*_async` methods, so calls running in the database thread pool
+        # don't change the state of this source at the same time
+        self._lock = RLock()
         self._fetch_metadata()
 
     def _fetch_metadata(self, search_text: str = ""):
@@ -546,7 +2017,8 @@ class _DataSource:
         state of this class's `select_statement`:
 
         - :nrows: Number of rows in this data source. Affected by search text
-          when the data source is searchable.
+          when the data source is searchable. Is `None` on keyset pagination
+          when `count_rows=False`.
 
         If searchable:
 
@@ -556,17 +2028,25 @@ class _DataSource:
         If paginated:
 
         - :min_idx: Index of the first item in the current page;
-        - :max_idx: Index of the last item in the current page.
+        - :max_idx: Index of the last item in the current page;
+        - :has_more: Wether there are rows after the current page.
         """
         # `search_text`
         if self.is_searchable():
+            if self.is_keyset_paginated() and (search_text != self._search_text):
+                # keys from the previous search are meaningless for the new one
+                self._reset_keyset()
             self._search_text = search_text
         # `nrows`
-        with Session(self.ENGINE) as ses:
-            select_stmt = self.searched_select_stmt(search_text)
-            nrows_stmt = select(func.count()).select_from(select_stmt.subquery())
-            self.nrows = ses.execute(nrows_stmt).scalar()
-        if self.is_paginated():
+        if self.is_paginated() and not self.COUNT_ROWS:
+            self.nrows = None
+        else:
+            self.nrows = self._count_rows(search_text)
+        if self.is_keyset_paginated():
+            page_length = len(self.current_data)
+            self.min_idx = self._rows_per_page * (self.current_page - 1)
+            self.max_idx = self.min_idx + page_length
+        elif self.is_paginated():
             # `min_idx`
             if self.nrows < self._rows_per_page:
                 self.min_idx = 0
@@ -578,17 +2058,230 @@ class _DataSource:
                 self.max_idx = self.nrows
             else:
                 self.max_idx = max_idx
+            self.has_more = self.max_idx < self.nrows
+
+    def _count_rows(self, search_text: str = "") -> int:
+        """Number of rows returned by the searched SELECT query. Counts are cached by
+        search text, date format and parameters, and only recounted after the data
+        changes.
+        """
+        version = data_version(self.ENGINE)
+        if version != self._nrows_version:
+            self._nrows_cache.clear()
+            self._nrows_version = version
+        key = (search_text, self.DATE_FORMAT, *self.SELECT_PARAMS.items())
+        if key not in self._nrows_cache:
+            select_stmt, params = self._searched_stmt(search_text)
+            nrows_stmt = cached_statement(
+                (select_stmt, "count"),
+                lambda: select(func.count()).select_from(select_stmt.subquery()),
+            )
+            nrows = self._fetch_result(nrows_stmt, params)().scalar()
+            if len(self._nrows_cache) >= self.NROWS_CACHE_SIZE:
+                # forget the oldest search
+                del self._nrows_cache[next(iter(self._nrows_cache))]
+            self._nrows_cache[key] = nrows
+        return self._nrows_cache[key]
+
+    def _fetch_result(self, stmt: Select, params: Dict[str, Any]) -> FrozenResult:
+        """Executes `stmt` with `params`, sharing the result with every data source that
+        runs the same query on the same data version, see `result_cache`.
+        """
+
+        def fetch() -> FrozenResult:
+            with Session(self.ENGINE) as ses:
+                return ses.execute(stmt, params).freeze()
+
+        cache = result_cache(self.ENGINE)
+        if cache is None:
+            return fetch()
+        key = (stmt, tuple(sorted(params.items())))
+        return cache.get_or_fetch(key, data_version(self.ENGINE), fetch)
 
     @property
     def current_data(self) -> list:
         """Assigns the data based on the current metadata values to
         `current_data`.
         """
-        stmt = self.searched_select_stmt(search_text=self.search_text)
-        if self.is_paginated():
-            stmt = stmt.limit(self.rows_per_page).offset(self.min_idx)
-        with Session(self.ENGINE) as ses:
-            return ses.execute(stmt).all()
+        if self.is_keyset_paginated():
+            rows = self._fetch_keyset_page()
+        elif self.is_paginated():
+            rows = self._fetch_result(*self._offset_page_stmt(self.min_idx))().all()
+        else:
+            stmt, params = self._searched_stmt(search_text=self.search_text)
+            return self._fetch_result(stmt, params)().all()
+        self._prefetch_adjacent_pages()
+        return rows
+
+    def _offset_page_stmt(self, offset: int) -> tuple[Select, Dict[str, Any]]:
+        """SELECT query of the page of an offset paginated data source that starts at
+        the row `offset`, and the parameters to execute it with.
+        """
+        searched_stmt, params = self._searched_stmt(search_text=self.search_text)
+        stmt = cached_statement(
+            (searched_stmt, "page"),
+            lambda: searched_stmt.limit(bindparam("page_limit")).offset(
+                bindparam("page_offset")
+            ),
+        )
+        params = params | {"page_limit": self.rows_per_page, "page_offset": offset}
+        return stmt, params
+
+    def _adjacent_page_queries(self) -> list[tuple[Select, Dict[str, Any]]]:
+        """SELECT queries of the pages right after and right before the current one,
+        with the parameters to execute them with, the same `fetch_next_page` and
+        `fetch_previous_page` would run. Pages that don't exist are left out.
+        """
+        queries = []
+        if self.is_keyset_paginated():
+            first_key, last_key = self._page_keys
+            limit = self.rows_per_page + 1
+            if self.has_more and (last_key is not None):
+                stmt, _, _, params = self._keyset_select_stmt(limit, last_key, False)
+                queries.append((stmt, params))
+            if self._current_page == 2:
+                stmt, _, _, params = self._keyset_select_stmt(limit, None, False)
+                queries.append((stmt, params))
+            elif (self._current_page > 2) and (first_key is not None):
+                stmt, _, _, params = self._keyset_select_stmt(limit, first_key, True)
+                queries.append((stmt, params))
+            return queries
+        if self.has_more:
+            queries.append(self._offset_page_stmt(self.max_idx))
+        if self._current_page > 1:
+            previous_offset = self.rows_per_page * (self._current_page - 2)
+            queries.append(self._offset_page_stmt(previous_offset))
+        return queries
+
+    def _prefetch_adjacent_pages(self):
+        """Fetches the pages around the current one into `result_cache`, in the
+        database thread pool, when `PREFETCH_PAGES` is set. Each page is only fetched
+        once for each data version, and dropped if the data changes before it runs.
+        """
+        if (not self.PREFETCH_PAGES) or (result_cache(self.ENGINE) is None):
+            return
+        version = data_version(self.ENGINE)
+        queries = self._adjacent_page_queries()
+        prefetch_key = (
+            version,
+            *[(stmt, tuple(sorted(params.items()))) for stmt, params in queries],
+        )
+        if prefetch_key == self._prefetched:
+            return
+        self._prefetched = prefetch_key
+        self._prefetching = [f for f in self._prefetching if not f.done()]
+        for stmt, params in queries:
+            self._prefetching.append(
+                get_db_executor().submit(self._prefetch_result, stmt, params, version)
+            )
+
+    def _prefetch_result(self, stmt: Select, params: Dict[str, Any], version: tuple):
+        """Runs in the database thread pool, see `_prefetch_adjacent_pages`."""
+        if data_version(self.ENGINE) != version:
+            return
+        try:
+            self._fetch_result(stmt, params)
+        except Exception:
+            # the page will be fetched again if the user flips to it
+            logging.getLogger(__name__).exception("Erro buscando página adjacente")
+
+    @property
+    def formatted_data(self) -> list[dict[str, Any]]:
+        """Rows of `current_data` as dicts, with the amounts in `CURRENCY_COLNAMES`
+        formatted as text, to be displayed.
+        """
+        rows = [row._asdict() for row in self.current_data]
+        return fmt.format_cents_columns(rows, self.CURRENCY_COLNAMES)
+
+    def _keyset_select_stmt(
+        self, limit: int, seek_key: tuple | None, seek_backwards: bool
+    ) -> tuple[Select, list[str], list[str], Dict[str, Any]]:
+        """Builds the SELECT query that seeks a page of a keyset paginated data source,
+        fetching `limit` rows starting right after `seek_key`, or right before it if
+        `seek_backwards`. Starts from the first row if `seek_key` is `None`.
+
+        :returns: A tuple with four items, in order: 1- The SELECT query; 2- Names of
+          the columns selected by `self.SELECT_STMT`; 3- Names of the key columns; 4-
+          Parameters to execute the query with.
+        """
+        searched_stmt, params = self._searched_stmt(search_text=self.search_text)
+        colnames = list(searched_stmt.selected_columns.keys())
+        keynames = [f"_keyset_{i}" for i in range(len(self.KEYSET))]
+        has_seek_key = seek_key is not None
+
+        def build() -> Select:
+            # keys are kept as raw database values, so custom types don't reprocess them
+            stmt = searched_stmt.order_by(None).add_columns(
+                *[
+                    type_coerce(col, types.NullType()).label(name)
+                    for (col, _), name in zip(self.KEYSET, keynames)
+                ]
+            )
+            subq = stmt.subquery()
+            ascending = [
+                (direction == "asc") != seek_backwards for _, direction in self.KEYSET
+            ]
+            outer = select(*[subq.c[name] for name in colnames + keynames])
+            if has_seek_key:
+                # (k0 > v0) OR (k0 = v0 AND k1 > v1) OR ..., with `<` on descending keys
+                seek_clauses = []
+                for i, name in enumerate(keynames):
+                    col, value = subq.c[name], bindparam(f"seek_{i}")
+                    previous_keys_equal = [
+                        subq.c[keynames[j]] == bindparam(f"seek_{j}") for j in range(i)
+                    ]
+                    after = (col > value) if ascending[i] else (col < value)
+                    seek_clauses.append(and_(*previous_keys_equal, after))
+                outer = outer.where(or_(*seek_clauses))
+            outer = outer.order_by(
+                *[
+                    subq.c[name].asc() if asc else subq.c[name].desc()
+                    for name, asc in zip(keynames, ascending)
+                ]
+            )
+            return outer.limit(bindparam("keyset_limit"))
+
+        # `KEYSET` always goes along with `SELECT_STMT`, so it is not part of the key
+        stmt = cached_statement(
+            (searched_stmt, "keyset", has_seek_key, seek_backwards), build
+        )
+        params = params | {"keyset_limit": limit}
+        if has_seek_key:
+            params.update({f"seek_{i}": v for i, v in enumerate(seek_key)})
+        return stmt, colnames, keynames, params
+
+    def _fetch_keyset_page(self) -> list:
+        """Fetches the current page of a keyset paginated data source, probing one
+        extra row to tell if there are more rows after it without a `COUNT(*)`.
+        Updates `has_more` and the keys of the first and last rows in the page.
+        """
+        rows_per_page = self.rows_per_page
+        stmt, colnames, keynames, params = self._keyset_select_stmt(
+            rows_per_page + 1, self._seek_key, self._seek_backwards
+        )
+        frozen = self._fetch_result(stmt, params)
+        rows = frozen().columns(*colnames).all()[:rows_per_page]
+        keys = [tuple(k) for k in frozen().columns(*keynames).all()]
+        probed_more = len(keys) > rows_per_page
+        keys = keys[:rows_per_page]
+        if self._seek_backwards:
+            rows.reverse()
+            keys.reverse()
+            # the page the user came from is still ahead
+            self.has_more = True
+            self._has_previous = probed_more
+        else:
+            self.has_more = probed_more
+            self._has_previous = self._seek_key is not None
+        self._page_keys = (keys[0], keys[-1]) if keys else (None, None)
+        return rows
+
+    def _reset_keyset(self):
+        """Returns a keyset paginated data source to it's first page."""
+        self._current_page = 1
+        self._seek_key = None
+        self._seek_backwards = False
+        self._page_keys = (None, None)
 
     def get_data_slice(self, irange: tuple[int, int] | None = None) -> list:
         """Generator containing all rows of this source, or a range of indexes.
@@ -603,11 +2296,18 @@ class _DataSource:
                 reverse = True
             stmt = stmt.limit(last - first).offset(first)
         with Session(self.ENGINE) as ses:
-            result = ses.execute(stmt).all()
+            result = ses.execute(stmt, self.SELECT_PARAMS).all()
             if reverse:
                 return list(reversed(result))
             return result
 
+    def iter_rows(self, batch_size: int = 1000):
+        """Generator with all rows of this source, ignoring the pagination but keeping
+        the current search, see `stream_rows`.
+        """
+        stmt = self.searched_select_stmt(search_text=self.search_text)
+        return stream_rows(stmt, engine=self.ENGINE, batch_size=batch_size)
+
     def is_paginated(self) -> bool:
         try:
             _ = self._current_page
@@ -615,6 +2315,9 @@ class _DataSource:
         except AttributeError:
             return False
 
+    def is_keyset_paginated(self) -> bool:
+        return self.is_paginated() and (self.PAGINATION_MODE == "keyset")
+
     def is_searchable(self) -> bool:
         try:
             _ = self._search_text
@@ -630,17 +2333,79 @@ class _DataSource:
         :param search_text: Text with all the keywords that will be inserted into the
           searched SELECT query.
         """
+        stmt, params = self._searched_stmt(search_text)
+        if len(params) == 0:
+            return stmt
+        return stmt.params(**params)
+
+    def _searched_stmt(self, search_text: str = "") -> tuple[Select, Dict[str, Any]]:
+        """Same as `searched_select_stmt`, but the keywords are left as parameters of a
+        cached statement, that only depends on the number of keywords. Returns the
+        statement and the parameters it must be executed with, including
+        `SELECT_PARAMS`.
+        """
         if not self.is_searchable() or (search_text == ""):
-            return self.SELECT_STMT
+            return self.SELECT_STMT, dict(self.SELECT_PARAMS)
         keywords = re.findall(r"\w+", search_text)
-        stmt = copy(self.SELECT_STMT)
-        for kw in keywords:
-            kw_in_cols = [
-                self.SELECT_STMT.selected_columns[col].ilike(f"%{kw}%")
-                for col in self.SEARCH_COLNAMES
-            ]
-            stmt = stmt.where(or_(*kw_in_cols))
-        return stmt
+        if keywords and self.uses_search_index():
+            stmt, params = self._indexed_search_stmt(keywords)
+            return stmt, self.SELECT_PARAMS | params
+
+        def build() -> Select:
+            stmt = self.SELECT_STMT
+            for i in range(len(keywords)):
+                kw_in_cols = [
+                    self.SELECT_STMT.selected_columns[col].ilike(bindparam(f"kw_{i}"))
+                    for col in self.SEARCH_COLNAMES
+                ]
+                stmt = stmt.where(or_(*kw_in_cols))
+            return stmt
+
+        stmt = cached_statement((self.SELECT_STMT, "search", len(keywords)), build)
+        params = {f"kw_{i}": f"%{kw}%" for i, kw in enumerate(keywords)}
+        return stmt, self.SELECT_PARAMS | params
+
+    def _indexed_search_stmt(
+        self, keywords: List[str]
+    ) -> tuple[Select, Dict[str, Any]]:
+        """Filters `self.SELECT_STMT` to the rows matching all `keywords` in
+        `self.SEARCH_INDEX`. Numeric keywords also match the key column itself.
+        """
+        index, key_col = self.SEARCH_INDEX
+        is_number = tuple(kw.isdecimal() for kw in keywords)
+        text_keywords = [kw for kw in keywords if not kw.isdecimal()]
+
+        def matching(param_name: str) -> Select:
+            return select(index.c.rowid).where(
+                literal_column(index.name).op("MATCH")(bindparam(param_name))
+            )
+
+        def build() -> Select:
+            stmt = self.SELECT_STMT
+            if not all(is_number):
+                stmt = stmt.where(key_col.in_(matching("match")))
+            for i, number in enumerate(is_number):
+                if number:
+                    key = select(bindparam(f"key_{i}", type_=Integer))
+                    matching_or_key = matching(f"match_{i}").union(key)
+                    stmt = stmt.where(key_col.in_(matching_or_key))
+            return stmt
+
+        stmt = cached_statement((self.SELECT_STMT, "indexed_search", is_number), build)
+        params = {}
+        if text_keywords:
+            params["match"] = fmt_search_index_query(text_keywords)
+        for i, kw in enumerate(keywords):
+            if kw.isdecimal():
+                params[f"match_{i}"] = fmt_search_index_query([kw])
+                params[f"key_{i}"] = int(kw)
+        return stmt, params
+
+    def uses_search_index(self) -> bool:
+        """Wether searches on this data source are done through a FTS5 index."""
+        return (getattr(self, "SEARCH_INDEX", None) is not None) and (
+            search_index_is_available(self.ENGINE)
+        )
 
     @property
     def current_page(self) -> int:
@@ -660,10 +2425,20 @@ class _DataSource:
         """Advances one page and update `current_data`. Does nothing if already
         on last page.
         """
+        if self.is_keyset_paginated():
+            if not self.has_more:
+                return
+            last_key = self._page_keys[1]
+            if last_key is None:
+                return
+            self._seek_key, self._seek_backwards = last_key, False
+            self._current_page = self._current_page + 1
+            self._fetch_metadata(search_text=self.search_text)
+            return
         if self.max_idx == self.nrows:
             return
         self._current_page = self._current_page + 1
-        self._fetch_metadata()
+        self._fetch_metadata(search_text=self.search_text)
 
     def fetch_previous_page(self):
         """Backtracks one page and update `current_data`. Does nothing if already
@@ -671,8 +2446,21 @@ class _DataSource:
         """
         if self._current_page == 1:
             return
+        if self.is_keyset_paginated():
+            first_key = self._page_keys[0]
+            if (first_key is None) or (self._current_page == 2):
+                self._reset_keyset()
+            else:
+                self._seek_key, self._seek_backwards = first_key, True
+                self._current_page = self._current_page - 1
+            self._fetch_metadata(search_text=self.search_text)
+            if self._seek_backwards and not self._has_previous:
+                # reached the first rows earlier than expected, rows were removed
+                self._reset_keyset()
+                self._fetch_metadata(search_text=self.search_text)
+            return
         self._current_page = self._current_page - 1
-        self._fetch_metadata()
+        self._fetch_metadata(search_text=self.search_text)
 
     def update_date_format(self, date_freq: Literal["m", "w", "d"]):
         """Updates `self.SELECT_STMT` to reflect the date frequency requested. Does
@@ -681,6 +2469,18 @@ class _DataSource:
         """
         pass
 
+    def update_period(
+        self,
+        since: date | None = None,
+        until: date | None = None,
+        last_n: int | None = None,
+    ):
+        """Bounds `self.SELECT_STMT` to a date range, or to the last `last_n` periods
+        of the current date frequency. Does nothing if the data source can't be bound
+        to a period.
+        """
+        pass
+
     @property
     def search_text(self) -> str:
         """If searchable, returns the last provided `search_text`, or an empty
@@ -693,9 +2493,61 @@ class _DataSource:
         if self.is_searchable():
             self._fetch_metadata(search_text=value)
 
+    async def _run_locked(self, fn: Callable, *args, **kwargs) -> Any:
+        """Awaits `fn(*args, **kwargs)` in the database thread pool, holding the lock
+        of this data source.
+        """
+
+        def locked():
+            with self._lock:
+                return fn(*args, **kwargs)
+
+        return await run_in_db_thread(locked)
+
+    async def current_data_async(self) -> list:
+        """Same as `current_data`, awaited from the database thread pool."""
+        return await self._run_locked(lambda: self.current_data)
+
+    async def formatted_data_async(self) -> list[dict[str, Any]]:
+        """Same as `formatted_data`, awaited from the database thread pool."""
+        return await self._run_locked(lambda: self.formatted_data)
+
+    async def set_search_text_async(self, value: str):
+        """Same as assigning `search_text`, awaited from the database thread pool."""
+        await self._run_locked(setattr, self, "search_text", value)
+
+    async def fetch_next_page_async(self):
+        """Same as `fetch_next_page`, awaited from the database thread pool."""
+        await self._run_locked(self.fetch_next_page)
+
+    async def fetch_previous_page_async(self):
+        """Same as `fetch_previous_page`, awaited from the database thread pool."""
+        await self._run_locked(self.fetch_previous_page)
+
+    async def update_date_format_async(self, date_freq: Literal["m", "w", "d"]):
+        """Same as `update_date_format`, awaited from the database thread pool."""
+        await self._run_locked(self.update_date_format, date_freq)
+
+    async def update_period_async(
+        self,
+        since: date | None = None,
+        until: date | None = None,
+        last_n: int | None = None,
+    ):
+        """Same as `update_period`, awaited from the database thread pool."""
+        await self._run_locked(self.update_period, since, until, last_n)
+
 
 class LastTransactionsSource(_DataSource):
-    def __init__(self, engine: Engine = DB_ENGINE):
+    CURRENCY_COLNAMES = ("Valor",)
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
         """Manages database interaction on for 'Last Transactions' data,
         with columns:
 
@@ -703,16 +2555,17 @@ class LastTransactionsSource(_DataSource):
         :Cliente: Customer name formatted as
           "`{Id},  {FirstName} {LastName} ({Nickname})`" whit nickname
           present, or "`{Id},  {FirstName} {LastName}`" otherwise.
-        :Valor: Transaction amount.
+        :Valor: Transaction amount, in cents.
         """
-        select_stmt = (
-            select(
+        select_stmt = cached_statement(
+            (LastTransactionsSource, "select"),
+            lambda: select(
                 tbl_transacoes.DataTransac.label("Data"),
                 FORMATTED_FULL_CUSTOMER_NAME.label("Nome"),
-                query_currency(tbl_transacoes.Valor, label="Valor"),
+                query_cents(tbl_transacoes.Valor, label="Valor"),
             )
             .join(tbl_clientes, tbl_transacoes.IdCliente == tbl_clientes.Id)
-            .order_by(tbl_transacoes.Id.desc())
+            .order_by(tbl_transacoes.Id.desc()),
         )
         super().__init__(
             select_stmt,
@@ -720,11 +2573,21 @@ class LastTransactionsSource(_DataSource):
             searchable=False,
             search_colnames=[],
             engine=engine,
+            keyset=[(tbl_transacoes.Id, "desc")],
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            prefetch_pages=prefetch_pages,
         )
 
 
 class CustomerListSource(_DataSource):
-    def __init__(self, engine=DB_ENGINE):
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
         """Manages database interaction on for 'Customer List' data,
         with columns:
 
@@ -738,10 +2601,13 @@ class CustomerListSource(_DataSource):
           - "`{Address} - {City}/{State}`" when District is missing,
           - or just "`{City}/{State}`" when they are both missing.
         """
-        select_stmt = select(
-            tbl_clientes.Id.label("Id"),
-            FORMATTED_FULL_CUSTOMER_NAME.label("Name"),
-            FORMATTED_FULL_CUSTOMER_LOCATION.label("Place"),
+        select_stmt = cached_statement(
+            (CustomerListSource, "select"),
+            lambda: select(
+                tbl_clientes.Id.label("Id"),
+                FORMATTED_FULL_CUSTOMER_NAME.label("Name"),
+                FORMATTED_FULL_CUSTOMER_LOCATION.label("Place"),
+            ),
         )
         super().__init__(
             select_stmt=select_stmt,
@@ -749,11 +2615,36 @@ class CustomerListSource(_DataSource):
             searchable=True,
             search_colnames=["Name", "Place"],
             engine=engine,
+            keyset=[(tbl_clientes.Id, "asc")],
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            search_index=(CUSTOMER_SEARCH_INDEX, tbl_clientes.Id),
+            prefetch_pages=prefetch_pages,
         )
 
+    def customer_row(self, customer_id: int):
+        """Row of the customer `customer_id`, with the same columns as `current_data`,
+        or `None` if it doesn't exist. Used to update one displayed customer without
+        fetching the whole page again.
+        """
+        stmt = cached_statement(
+            (CustomerListSource, "customer_row"),
+            lambda: self.SELECT_STMT.where(tbl_clientes.Id == bindparam("customer_id")),
+        )
+        with Session(self.ENGINE) as ses:
+            return ses.execute(stmt, {"customer_id": customer_id}).first()
+
 
 class HighestAmountsSource(_DataSource):
-    def __init__(self, engine: Engine = DB_ENGINE):
+    CURRENCY_COLNAMES = ("OwedAmount",)
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
         """Manages database interaction on for 'Highest Owed Amounts' data,
         with columns:
 
@@ -761,16 +2652,16 @@ class HighestAmountsSource(_DataSource):
         "`{Id},  {FirstName} {LastName} ({Nickname})`" whit nickname
         present, or "`{Id},  {FirstName} {LastName}`" otherwise.
         :LastTransac: Date of last transaction performed by the customer.
-        :OwedAmount: Total amount owed by the customer.
+        :OwedAmount: Total amount owed by the customer, in cents.
         """
-        select_stmt = (
-            select(
+        select_stmt = cached_statement(
+            (HighestAmountsSource, "select"),
+            lambda: select(
                 FORMATTED_FULL_CUSTOMER_NAME.label("Name"),
-                query_currency(func.sum(tbl_transacoes.Valor), label="OwedAmount"),
+                query_cents(customer_summary.c.Saldo, label="OwedAmount"),
             )
-            .join(tbl_clientes, tbl_transacoes.IdCliente == tbl_clientes.Id)
-            .group_by(tbl_clientes.Id)
-            .order_by(func.sum(tbl_transacoes.Valor).desc())
+            .join(tbl_clientes, customer_summary.c.IdCliente == tbl_clientes.Id)
+            .order_by(customer_summary.c.Saldo.desc(), customer_summary.c.IdCliente),
         )
         super().__init__(
             select_stmt=select_stmt,
@@ -778,11 +2669,26 @@ class HighestAmountsSource(_DataSource):
             searchable=False,
             search_colnames=[],
             engine=engine,
+            keyset=[
+                (customer_summary.c.Saldo, "desc"),
+                (customer_summary.c.IdCliente, "asc"),
+            ],
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            prefetch_pages=prefetch_pages,
         )
 
 
 class InactiveCustomersSource(_DataSource):
-    def __init__(self, engine: Engine = DB_ENGINE):
+    CURRENCY_COLNAMES = ("OwedAmount",)
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
         """Manages database interaction on for 'Inactive Customers' data,
         with columns:
 
@@ -790,17 +2696,17 @@ class InactiveCustomersSource(_DataSource):
         "`{Id},  {FirstName} {LastName} ({Nickname})`" whit nickname
         present, or "`{Id},  {FirstName} {LastName}`" otherwise.
         :LastTransac: Date of last transaction performed by the customer.
-        :OwedAmount: Total amount owed by the customer.
+        :OwedAmount: Total amount owed by the customer, in cents.
         """
-        select_stmt = (
-            select(
+        select_stmt = cached_statement(
+            (InactiveCustomersSource, "select"),
+            lambda: select(
                 FORMATTED_FULL_CUSTOMER_NAME.label("Name"),
-                func.max(tbl_transacoes.DataTransac).label("LastTransac"),
-                query_currency(func.sum(tbl_transacoes.Valor), label="OwedAmount"),
+                customer_summary.c.UltimaTransac.label("LastTransac"),
+                query_cents(customer_summary.c.Saldo, label="OwedAmount"),
             )
-            .join(tbl_clientes, tbl_transacoes.IdCliente == tbl_clientes.Id)
-            .group_by(tbl_clientes.Id)
-            .order_by(func.max(tbl_transacoes.DataTransac))
+            .join(tbl_clientes, customer_summary.c.IdCliente == tbl_clientes.Id)
+            .order_by(customer_summary.c.UltimaTransac, customer_summary.c.IdCliente),
         )
         super().__init__(
             select_stmt=select_stmt,
@@ -808,122 +2714,268 @@ class InactiveCustomersSource(_DataSource):
             searchable=False,
             search_colnames=[],
             engine=engine,
+            keyset=[
+                (customer_summary.c.UltimaTransac, "asc"),
+                (customer_summary.c.IdCliente, "asc"),
+            ],
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            prefetch_pages=prefetch_pages,
         )
 
 
-class TransactionBalanceSource(_DataSource):
-    sums_col = func.sum(case((tbl_transacoes.Valor > 0, tbl_transacoes.Valor)))
-    deductions_col = func.sum(case((tbl_transacoes.Valor < 0, tbl_transacoes.Valor)))
-    balance_col = func.sum(tbl_transacoes.Valor)
+DATE_FREQ_FORMATS = {"m": "%Y-%m", "w": "%Y-%W", "d": "%Y-%m-%d"}
+"""`strftime` format of the month, week and day frequencies of the balance sources."""
 
-    def __init__(self, engine: Engine = DB_ENGINE):
-        """Manages database interaction on for 'Transaction Balance' data,
-        with columns:
 
-        :Date: Transaction date, might be an interval of month, week or day
-          formatted as YYYY-MM, YYYY-WW or YYYY-MM-DD, respectively.
-        :Sums: Total amount of all purchases registered.
-        :Deductions: Total amount of all payments registered.
-        :Balance: Sums + (-Deductions).
-        """
-        # initial date frequency is monthlhy
-        date_col = func.strftime("%Y-%m", tbl_transacoes.DataTransac).label("Date")
-        select_stmt = (
-            select(
-                date_col,
-                query_currency(self.sums_col, label="Sums"),
-                query_currency(self.deductions_col, label="Deductions"),
-                query_currency(self.balance_col, label="Balance"),
-            )
-            .group_by(date_col)
-            .order_by(date_col.desc())
-        )
+def first_day_of_periods(
+    date_freq: Literal["m", "w", "d"], n_periods: int, today: date | None = None
+) -> date:
+    """First day of the last `n_periods` months, weeks or days, counting the one that
+    contains `today`. Weeks start on monday, like in `%W`.
+
+    :raises ValueError: If `n_periods` is lower than 1.
+    """
+    if n_periods < 1:
+        raise ValueError(f"Expected at least one period, got {n_periods=}.")
+    today = date.today() if today is None else today
+    match date_freq:
+        case "m":
+            month_idx = today.year * 12 + today.month - 1 - (n_periods - 1)
+            return date(month_idx // 12, month_idx % 12 + 1, 1)
+        case "w":
+            return today - timedelta(days=today.weekday() + 7 * (n_periods - 1))
+        case _:
+            return today - timedelta(days=n_periods - 1)
+
+
+class _PeriodSource(_DataSource, ABC):
+    """Data sources that group `daily_balance` by month, week or day, and can be bound
+    to a period. Subclasses build their SELECT query in `_date_select_stmt`.
+    """
+
+    SINCE_PARAM = bindparam("period_since", date.min, type_=Date)
+    UNTIL_PARAM = bindparam("period_until", date.max, type_=Date)
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
+        # initial date frequency is monthly, over the whole history
+        self.DATE_FORMAT = DATE_FREQ_FORMATS["m"]
+        self.PERIOD: tuple[date | None, date | None] = (None, None)
+        self.LAST_N_PERIODS: int | None = None
+        select_stmt, date_expr = self._date_select_stmt(self.DATE_FORMAT)
         super().__init__(
             select_stmt=select_stmt,
             paginated=True,
             searchable=False,
             search_colnames=[],
             engine=engine,
+            keyset=[(date_expr, "desc")],
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            prefetch_pages=prefetch_pages,
         )
 
-    def update_date_format(self, date_freq: Literal["m", "w", "d"]):
-        date_format = "%Y-%m"
-        if date_freq == "w":
-            date_format = "%Y-%W"
-        if date_freq == "d":
-            date_format = "%Y-%m-%d"
-        date_col = func.strftime(date_format, tbl_transacoes.DataTransac).label("Date")
-        self.SELECT_STMT = (
-            select(
-                date_col,
-                query_currency(self.sums_col, label="Sums"),
-                query_currency(self.deductions_col, label="Deductions"),
-                query_currency(self.balance_col, label="Balance"),
-            )
-            .group_by(date_col)
-            .order_by(date_col.desc())
+    @classmethod
+    @abstractmethod
+    def _date_select_stmt(cls, date_format: str) -> tuple[Select, Any]:
+        """SELECT query grouping the rows by `date_format`, and the expression of the
+        grouped date, used as the pagination key.
+        """
+
+    @classmethod
+    def _period_rows(cls, stmt: Select) -> Select:
+        """Filters `stmt` to the days between `SINCE_PARAM` and `UNTIL_PARAM`."""
+        return stmt.where(
+            daily_balance.c.DataTransac >= cls.SINCE_PARAM,
+            daily_balance.c.DataTransac <= cls.UNTIL_PARAM,
         )
 
+    def update_date_format(self, date_freq: Literal["m", "w", "d"]):
+        self.DATE_FORMAT = DATE_FREQ_FORMATS.get(date_freq, DATE_FREQ_FORMATS["m"])
+        self.SELECT_STMT, date_expr = self._date_select_stmt(self.DATE_FORMAT)
+        self.KEYSET = [(date_expr, "desc")]
+        if self.LAST_N_PERIODS is not None:
+            # the same number of periods of the new frequency
+            self._set_period(self._first_day_of_last_periods(), None)
+        if self.is_keyset_paginated():
+            self._reset_keyset()
+        self._fetch_metadata()
 
-class AggregatedAmountSource(_DataSource):
-    sums_col = coalesce(
-        func.sum(case((tbl_transacoes.Valor > 0, tbl_transacoes.Valor))), 0
-    )
-    deductions_col = coalesce(
-        func.sum(case((tbl_transacoes.Valor < 0, tbl_transacoes.Valor))), 0
-    )
+    def update_period(
+        self,
+        since: date | None = None,
+        until: date | None = None,
+        last_n: int | None = None,
+    ):
+        """Bounds the rows to the days between `since` and `until`, inclusive, or to
+        the last `last_n` periods of the current date frequency, counting the current
+        one. Calling it without arguments goes back to the whole history.
+
+        :raises ValueError: If `last_n` is used along with `since` or `until`, or is
+          lower than 1.
+        """
+        if (last_n is not None) and ((since is not None) or (until is not None)):
+            raise ValueError("Use either `last_n` or `since` and `until`, not both.")
+        self.LAST_N_PERIODS = last_n
+        if last_n is not None:
+            since = self._first_day_of_last_periods()
+        self._set_period(since, until)
+        if self.is_keyset_paginated():
+            self._reset_keyset()
+        self._fetch_metadata()
 
-    def __init__(self, engine: Engine = DB_ENGINE):
+    @property
+    def SELECT_PARAMS(self) -> Dict[str, Any]:
+        # the last periods move along with the current date, so a source kept around
+        # past midnight, or the start of a week or month, doesn't show a stale window
+        if self.LAST_N_PERIODS is not None:
+            since = self._first_day_of_last_periods()
+            if since != self.PERIOD[0]:
+                self._set_period(since, None)
+        return self._select_params
+
+    @SELECT_PARAMS.setter
+    def SELECT_PARAMS(self, params: Dict[str, Any]):
+        self._select_params = params
+
+    def _first_day_of_last_periods(self) -> date:
+        date_freq = {v: k for k, v in DATE_FREQ_FORMATS.items()}[self.DATE_FORMAT]
+        return first_day_of_periods(date_freq, self.LAST_N_PERIODS)
+
+    def _set_period(self, since: date | None, until: date | None):
+        params = {}
+        if since is not None:
+            params[self.SINCE_PARAM.key] = since
+        if until is not None:
+            params[self.UNTIL_PARAM.key] = until
+        self.PERIOD = (since, until)
+        self.SELECT_PARAMS = params
+
+
+class TransactionBalanceSource(_PeriodSource):
+    CURRENCY_COLNAMES = ("Sums", "Deductions", "Balance")
+    sums_col = func.sum(daily_balance.c.Somas)
+    deductions_col = func.sum(daily_balance.c.Deducoes)
+    balance_col = func.sum(daily_balance.c.Somas + daily_balance.c.Deducoes)
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
         """Manages database interaction on for 'Transaction Balance' data,
         with columns:
 
         :Date: Transaction date, might be an interval of month, week or day
           formatted as YYYY-MM, YYYY-WW or YYYY-MM-DD, respectively.
-        :Sums: Total amount of all purchases registered.
-        :Deductions: Total amount of all payments registered.
-        :AcumBalance: Sums + (-Deductions) aggregated over time.
-        """
-        date_col = func.strftime("%Y-%m", tbl_transacoes.DataTransac).label("Date")
-        acum_balance_col = query_currency(
-            func.sum(self.sums_col + self.deductions_col).over(order_by=date_col.asc()),
-            label="AcumBalance",
-        )
-        select_stmt = (
-            select(
-                date_col,
-                query_currency(self.sums_col, label="Sums"),
-                query_currency(self.deductions_col, label="Deductions"),
-                acum_balance_col,
-            )
-            .group_by(date_col)
-            .order_by(date_col.desc())
-        )
+        :Sums: Total amount of all purchases registered, in cents.
+        :Deductions: Total amount of all payments registered, in cents.
+        :Balance: Sums + (-Deductions), in cents.
+        """
         super().__init__(
-            select_stmt=select_stmt,
-            paginated=True,
-            searchable=False,
-            search_colnames=[],
             engine=engine,
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            prefetch_pages=prefetch_pages,
         )
 
-    def update_date_format(self, date_freq: Literal["m", "w", "d"]):
-        date_format = "%Y-%m"
-        if date_freq == "w":
-            date_format = "%Y-%W"
-        if date_freq == "d":
-            date_format = "%Y-%m-%d"
-        date_col = func.strftime(date_format, tbl_transacoes.DataTransac).label("Date")
-        acum_balance_col = query_currency(
-            func.sum(self.sums_col + self.deductions_col).over(order_by=date_col.asc()),
-            label="AcumBalance",
-        )
-        self.SELECT_STMT = (
-            select(
-                date_col,
-                query_currency(self.sums_col, label="Sums"),
-                query_currency(self.deductions_col, label="Deductions"),
-                acum_balance_col,
+    @classmethod
+    def _date_select_stmt(cls, date_format: str) -> tuple[Select, Any]:
+        """SELECT query grouping the days of `daily_balance` by `date_format`, and the
+        expression of the grouped date. Built once for each date format.
+        """
+
+        def build():
+            date_expr = func.strftime(date_format, daily_balance.c.DataTransac)
+            date_col = date_expr.label("Date")
+            stmt = (
+                select(
+                    date_col,
+                    query_cents(cls.sums_col, label="Sums"),
+                    query_cents(cls.deductions_col, label="Deductions"),
+                    query_cents(cls.balance_col, label="Balance"),
+                )
+                .group_by(date_col)
+                .order_by(date_col.desc())
             )
-            .group_by(date_col)
-            .order_by(date_col.desc())
+            return cls._period_rows(stmt), date_expr
+
+        return cached_statement((cls, "select", date_format), build)
+
+
+class AggregatedAmountSource(_PeriodSource):
+    CURRENCY_COLNAMES = ("Sums", "Deductions", "AcumBalance")
+    sums_col = coalesce(func.sum(daily_balance.c.Somas), 0)
+    deductions_col = coalesce(func.sum(daily_balance.c.Deducoes), 0)
+
+    def __init__(
+        self,
+        engine: Engine | None = None,
+        pagination_mode: Literal["offset", "keyset"] = "offset",
+        count_rows: bool = True,
+        prefetch_pages: bool = False,
+    ):
+        """Manages database interaction on for 'Transaction Balance' data,
+        with columns:
+
+        :Date: Transaction date, might be an interval of month, week or day
+          formatted as YYYY-MM, YYYY-WW or YYYY-MM-DD, respectively.
+        :Sums: Total amount of all purchases registered, in cents.
+        :Deductions: Total amount of all payments registered, in cents.
+        :AcumBalance: Sums + (-Deductions) aggregated over time, in cents.
+        """
+        super().__init__(
+            engine=engine,
+            pagination_mode=pagination_mode,
+            count_rows=count_rows,
+            prefetch_pages=prefetch_pages,
         )
+
+    @classmethod
+    def _date_select_stmt(cls, date_format: str) -> tuple[Select, Any]:
+        """SELECT query grouping the days of `daily_balance` by `date_format`, and the
+        expression of the grouped date. Built once for each date format.
+
+        The accumulated balance starts from the sum of all days before the period, so
+        only the days in the period are aggregated.
+        """
+
+        def build():
+            date_expr = func.strftime(date_format, daily_balance.c.DataTransac)
+            date_col = date_expr.label("Date")
+            prior_days = daily_balance.alias("prior_days")
+            prior_balance = (
+                select(
+                    coalesce(func.sum(prior_days.c.Somas + prior_days.c.Deducoes), 0)
+                )
+                .where(prior_days.c.DataTransac < cls.SINCE_PARAM)
+                .scalar_subquery()
+            )
+            acum_balance_col = query_cents(
+                prior_balance
+                + func.sum(cls.sums_col + cls.deductions_col).over(
+                    order_by=date_col.asc()
+                ),
+                label="AcumBalance",
+            )
+            stmt = (
+                select(
+                    date_col,
+                    query_cents(cls.sums_col, label="Sums"),
+                    query_cents(cls.deductions_col, label="Deductions"),
+                    acum_balance_col,
+                )
+                .group_by(date_col)
+                .order_by(date_col.desc())
+            )
+            return cls._period_rows(stmt), date_expr
+
+        return cached_statement((cls, "select", date_format), build)
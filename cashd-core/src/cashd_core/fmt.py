@@ -1,4 +1,6 @@
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Iterable
 
 from cashd_core import const
 
@@ -39,3 +41,104 @@ class StringToCurrency:
     def is_valid(self) -> bool:
         """Verify if the integer is a valid input for currency."""
         return self.invalid_reason is None
+
+
+class StringToTransactions:
+    DATE_FORMAT = "%d/%m/%Y"
+
+    def __init__(self, user_input: str, default_date: date | None = None):
+        """Handles a batch of transactions inserted by the user in a multi-line text
+        field, one per line, as `DD/MM/AAAA;Valor`, or just `Valor` for transactions
+        made on `default_date` (today if `None`).
+        """
+        self._user_input = user_input or ""
+        self.default_date = default_date or date.today()
+
+    @property
+    def lines(self) -> list[str]:
+        """Non-empty lines of the user input, without surrounding whitespace."""
+        lines = [line.strip() for line in self._user_input.splitlines()]
+        return [line for line in lines if line != ""]
+
+    def _parse_line(self, line: str) -> tuple[date, StringToCurrency]:
+        """Splits one line in it's date and value.
+
+        :raises ValueError: If the line has more than two fields, or an invalid date.
+        """
+        fields = [field.strip() for field in line.split(";")]
+        if len(fields) == 1:
+            return self.default_date, StringToCurrency(fields[0])
+        if len(fields) == 2:
+            dt = datetime.strptime(fields[0], self.DATE_FORMAT)
+            return dt.date(), StringToCurrency(fields[1])
+        raise ValueError("Use o formato DD/MM/AAAA;Valor")
+
+    @property
+    def value(self) -> list[tuple[date, int]]:
+        """List of `(date, value)` for each line, with values as integers preserving
+        two decimal places, like `StringToCurrency.value`.
+
+        :raises ValueError: If any line is invalid, see `invalid_reason`.
+        """
+        reason = self.invalid_reason
+        if reason is not None:
+            raise ValueError(reason)
+        rows = []
+        for line in self.lines:
+            transac_date, amount = self._parse_line(line)
+            rows.append((transac_date, amount.value))
+        return rows
+
+    @property
+    def invalid_reason(self) -> str | None:
+        """Returns a string that explains why the lines of this input are invalid,
+        or None otherwise.
+        """
+        if len(self.lines) == 0:
+            return "Nenhuma transação inserida"
+        reasons = []
+        for n, line in enumerate(self._user_input.splitlines(), start=1):
+            if line.strip() == "":
+                continue
+            try:
+                _, amount = self._parse_line(line.strip())
+            except ValueError:
+                reasons.append(f"Linha {n}: use o formato DD/MM/AAAA;Valor")
+                continue
+            if not amount.is_valid():
+                reasons.append(f"Linha {n}: {amount.invalid_reason}")
+        if len(reasons) > 0:
+            return "\n".join(reasons)
+
+    def is_valid(self) -> bool:
+        """Verify if every line is a valid transaction."""
+        return self.invalid_reason is None
+
+
+def format_cents(values: Iterable[int | None], decimal_sep: str = ",") -> list[str]:
+    """Formats a whole column of amounts in integer cents, like the ones returned by
+    the data sources, as currency text with two decimal places, like "-1234,56".
+    Missing amounts are formatted as zero.
+    """
+    formatted = []
+    for value in values:
+        cents = int(value or 0)
+        units, rest = divmod(abs(cents), 100)
+        sign = "-" if cents < 0 else ""
+        formatted.append(f"{sign}{units}{decimal_sep}{rest:02d}")
+    return formatted
+
+
+def format_cents_columns(
+    rows: Iterable[dict[str, Any]], colnames: Iterable[str], decimal_sep: str = ","
+) -> list[dict[str, Any]]:
+    """Copies of `rows` with the amounts in the columns `colnames` formatted by
+    `format_cents`, one column at a time. Meant to be applied to the rows that will be
+    displayed, so the database only returns numbers.
+    """
+    rows = [dict(row) for row in rows]
+    for col in colnames:
+        texts = format_cents([row[col] for row in rows], decimal_sep=decimal_sep)
+        for row, text in zip(rows, texts):
+            row[col] = text
+    return rows
@@ -0,0 +1,133 @@
+from os import path
+from time import perf_counter
+from typing import Callable, Iterable, NamedTuple
+import logging
+
+from sqlalchemy import Connection, Engine, MetaData, inspect
+
+from cashd_core import backup
+
+
+####################
+# GLOBAL VARS
+####################
+
+logger = logging.getLogger(__name__)
+
+
+####################
+# MIGRATIONS
+####################
+
+
+class Migration(NamedTuple):
+    """One step in the evolution of a database schema.
+
+    :param version: Schema version this migration brings the database to, stored in
+      `PRAGMA user_version`. Versions start at 1, and must be sequential.
+    :param description: Short text explaining what the migration does.
+    :param upgrade: Callable that performs the migration on the connection it receives.
+      Must be idempotent, applying it to a database that already has the changes should
+      have no effect.
+    """
+
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def get_user_version(engine: Engine) -> int:
+    """Current schema version of the database pointed by `engine`."""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def _set_user_version(connection: Connection, version: int):
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def pending_migrations(
+    engine: Engine, migrations: Iterable[Migration]
+) -> list[Migration]:
+    """Migrations that were not applied to the database pointed by `engine` yet,
+    in the order they should be applied.
+    """
+    current_version = get_user_version(engine)
+    return sorted(
+        [m for m in migrations if m.version > current_version],
+        key=lambda m: m.version,
+    )
+
+
+def stamp(engine: Engine, migrations: Iterable[Migration]):
+    """Marks all `migrations` as applied, without running them. Meant for databases
+    created from scratch by the current schema.
+    """
+    latest = max([m.version for m in migrations], default=0)
+    with engine.begin() as conn:
+        _set_user_version(conn, latest)
+
+
+def migrate(
+    engine: Engine,
+    migrations: Iterable[Migration],
+    backup_dir: str | None = backup.BACKUP_PATH,
+) -> list[tuple[int, str, float]]:
+    """Applies all pending `migrations` to the database pointed by `engine`, in order.
+    Each migration runs in it's own transaction, and bumps `PRAGMA user_version` when
+    it succeeds, so an interrupted upgrade resumes from the failed step.
+
+    :param engine: Engine pointing to the database that will be migrated.
+    :param migrations: All migrations known for this database.
+    :param backup_dir: Directory where a copy of the database file is saved before
+      applying any migration. Use `None` to skip the safety backup.
+
+    :returns: List of `(version, description, seconds)` for each applied migration.
+    :raises Exception: Any error raised by a migration, after logging it.
+    """
+    pending = pending_migrations(engine, migrations)
+    if len(pending) == 0:
+        return []
+    database = engine.url.database
+    if backup_dir and database and path.isfile(database):
+        backup.checkpoint(database, _raise=True)
+        backup.copy_file(database, backup_dir, _raise=True)
+    timings = []
+    for migration in pending:
+        logger.info(f"Aplicando migracao {migration.version}: {migration.description}")
+        start = perf_counter()
+        try:
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                _set_user_version(conn, migration.version)
+        except Exception as err:
+            logger.error(
+                f"Erro na migracao {migration.version} de '{database}': {err}",
+                exc_info=True,
+            )
+            raise err
+        elapsed = perf_counter() - start
+        logger.info(f"Migracao {migration.version} concluida em {elapsed:.3f}s")
+        timings.append((migration.version, migration.description, elapsed))
+    return timings
+
+
+def init_database(
+    engine: Engine,
+    metadata: MetaData,
+    migrations: Iterable[Migration],
+    backup_dir: str | None = backup.BACKUP_PATH,
+) -> list[tuple[int, str, float]]:
+    """Creates the tables in `metadata` that are missing in the database pointed by
+    `engine`, then brings it's schema up to date. Databases without any of the tables
+    are created with the current schema, and are only stamped with the latest version.
+
+    :returns: Same as `cashd_core.migrations.migrate`.
+    """
+    existing_tables = inspect(engine).get_table_names()
+    is_new = not any(name in existing_tables for name in metadata.tables.keys())
+    metadata.create_all(engine)
+    if is_new:
+        stamp(engine, migrations)
+        return []
+    return migrate(engine, migrations, backup_dir=backup_dir)
@@ -85,16 +85,17 @@ class CustomerTransactions(_Document):
     def _write_content(self):
         s = self.style
         # get first 10 transactions (most recent)
-        transactions = [tr for i, tr in zip(range(10), self.customer.Transacs)]
+        transactions = self.customer.transactions(limit=10)
         transactions.reverse()  # set most recent last
         content_width = self.meta.size[0] - self.meta.margin[1] - self.meta.margin[3]
-        col_widths = [content_width * 0.50, content_width * 0.5]
+        col_widths = [content_width * 0.34, content_width * 0.33, content_width * 0.33]
 
         # table header
         head_data = [
             [
                 Paragraph("<b>Data</b>", s.L_BOLD),
                 Paragraph("<b>Valor (R$)</b>", s.R_BOLD),
+                Paragraph("<b>Saldo (R$)</b>", s.R_BOLD),
             ]
         ]
         table_head = Table(head_data, colWidths=col_widths)
@@ -104,6 +105,7 @@ class CustomerTransactions(_Document):
             [
                 Paragraph(tr["data"].strftime("%d/%m/%Y"), s.L_PARA),
                 Paragraph(tr["valor"], s.R_PARA),
+                Paragraph(tr["saldo"], s.R_PARA),
             ]
             for tr in transactions
         ]
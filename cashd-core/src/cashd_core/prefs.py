@@ -1,6 +1,9 @@
-from os import path, makedirs
+from os import path, makedirs, replace, stat, fsync, fdopen, unlink
 from sys import platform
 from pathlib import Path
+from tempfile import mkstemp
+from threading import Lock, RLock
+from time import monotonic
 from typing import Literal, Iterator, Any, Callable
 from configparser import (
     ConfigParser,
@@ -19,6 +22,141 @@ BACKUP_CONFIG_FILE = Path(CONFIG_DIR, "backup.ini")
 LOG_FILE = path.join(LOG_DIR, "prefs.log")
 DB_FILE = path.join(CASHD_FILES_DIR, "data", "database.db")
 
+# a single handler for the whole process, however many configs are created
+logger = logging.getLogger(f"cashd.{__name__}")
+logger.setLevel(logging.DEBUG)
+logger.propagate = False
+if not logger.handlers:
+    log_handler = logging.FileHandler(LOG_FILE)
+    log_handler.setLevel(logging.DEBUG)
+    log_handler.setFormatter(
+        logging.Formatter("%(asctime)s :: %(levelname)s %(message)s")
+    )
+    logger.addHandler(log_handler)
+
+
+####################
+# CONFIG STORE
+####################
+
+
+class ConfigStore:
+    REVALIDATE_INTERVAL = 1.0
+    """Minimum time (s) between checks for changes in the config file made outside of
+    this store, reads in between are served from memory without touching the disk.
+    """
+
+    def __init__(self, config_file: str | Path):
+        """Contents of one config file, parsed once and shared by the whole process, see
+        `config_store`. The file is only parsed again when it's modification time or
+        size changes, like when edited by hand or by another process. Writes replace
+        the whole file at once, so it's never left half written.
+
+        :param config_file: Path to the config file, created empty if missing.
+        """
+        self.config_file = Path(config_file)
+        self._parser = ConfigParser()
+        self._stamp: tuple | None = None
+        self._checked_at: float | None = None
+        self._lock = RLock()
+
+    def _file_stamp(self) -> tuple | None:
+        try:
+            file_stat = stat(self.config_file)
+        except OSError:
+            return None
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def _revalidate(self, force: bool = False):
+        """Parses the file again if it changed since it was last read or written."""
+        now = monotonic()
+        if not force and (self._checked_at is not None):
+            if now - self._checked_at < self.REVALIDATE_INTERVAL:
+                return
+        self._checked_at = now
+        stamp = self._file_stamp()
+        if (stamp is not None) and (stamp == self._stamp):
+            return
+        if stamp is None:
+            self.config_file.touch(exist_ok=True)
+            stamp = self._file_stamp()
+        parser = ConfigParser()
+        # stamped before reading, so a change made while reading is parsed next time
+        with open(self.config_file, "r", encoding="utf-8") as buffer:
+            parser.read_file(buffer)
+        self._parser, self._stamp = parser, stamp
+
+    @property
+    def parser(self) -> ConfigParser:
+        """Current contents of the config file. Should only be changed through this
+        store's methods, so changes are written to the file.
+        """
+        with self._lock:
+            self._revalidate()
+            return self._parser
+
+    def reload(self):
+        """Parses the config file again on the next read, even if it looks unchanged."""
+        with self._lock:
+            self._stamp, self._checked_at = None, None
+
+    def add_section(self, section: str):
+        """Creates `section` in the config file, does nothing if it already exists."""
+        with self._lock:
+            self._revalidate(force=True)
+            if self._parser.has_section(section):
+                return
+            self._parser.add_section(section)
+            self._write()
+
+    def set(self, section: str, key: str, value: str):
+        """Writes `value` to the option `key` of `section` in the config file, creating
+        the section if needed.
+        """
+        with self._lock:
+            # changes made outside of this store are kept
+            self._revalidate(force=True)
+            if not self._parser.has_section(section):
+                self._parser.add_section(section)
+            self._parser.set(section, key, value)
+            self._write()
+
+    def _write(self):
+        """Writes the parsed contents to a temporary file, that replaces the config
+        file when complete.
+        """
+        fd, temp_file = mkstemp(
+            dir=self.config_file.parent, prefix=f".{self.config_file.name}."
+        )
+        try:
+            with fdopen(fd, "w", encoding="utf-8") as buffer:
+                self._parser.write(buffer)
+                buffer.flush()
+                fsync(buffer.fileno())
+            replace(temp_file, self.config_file)
+        except Exception:
+            # what is in memory no longer matches the file
+            self._stamp = None
+            if path.isfile(temp_file):
+                unlink(temp_file)
+            raise
+        self._stamp, self._checked_at = self._file_stamp(), monotonic()
+
+
+_CONFIG_STORES: dict[Path, ConfigStore] = {}
+_CONFIG_STORES_LOCK = Lock()
+
+
+def config_store(config_file: str | Path) -> ConfigStore:
+    """The `ConfigStore` of `config_file`, shared by every config and handler of this
+    process that reads it.
+    """
+    config_file = Path(config_file).absolute()
+    with _CONFIG_STORES_LOCK:
+        if config_file not in _CONFIG_STORES:
+            _CONFIG_STORES[config_file] = ConfigStore(config_file)
+        return _CONFIG_STORES[config_file]
+
 
 def get_parser(filename: str) -> tuple[Path, ConfigParser]:
     """Base function to produce *parser factories*. The parser factories should not
@@ -27,14 +165,11 @@ def get_parser(filename: str) -> tuple[Path, ConfigParser]:
     :filename: Name of the config file without extension.
 
     :returns: A tuple with two items, in order: 1- A `Path` object describing the
-      config file location; 2- A `ConfigParser`.
+      config file location; 2- The `ConfigParser` of it's `ConfigStore`, parsed once
+      and shared by the whole process, see `config_store`.
     """
-    parser = ConfigParser()
     config_file = Path(CONFIG_DIR, f"{filename}.ini")
-    config_file.touch(exist_ok=True)
-    with open(config_file, "r", encoding="utf-8") as buffer:
-        parser.read_file(buffer)
-    return (config_file, parser)
+    return (config_file, config_store(config_file).parser)
 
 
 def prefs_parser():
@@ -73,20 +208,10 @@ class _Config:
         )
 
         config_file, parser = self._parser_factory()
+        self._store = config_store(config_file)
         if not parser.has_section(section):
-            parser.add_section(section=section)
-            with open(config_file, "w") as configfile:
-                parser.write(configfile)
-
-        self.logger = logging.getLogger(f"cashd.{__name__}")
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.propagate = False
-
-        log_fmt = logging.Formatter("%(asctime)s :: %(levelname)s %(message)s")
-        log_handler = logging.FileHandler(LOG_FILE)
-        log_handler.setLevel(logging.DEBUG)
-        log_handler.setFormatter(log_fmt)
-        self.logger.addHandler(log_handler)
+            self._store.add_section(section)
+        self.logger = logger
 
     @classmethod
     def get(cls):
@@ -101,11 +226,9 @@ class _Config:
         interactor.__set(value)
 
     def __set(self, value: Any):
-        config_file, parser = self._parser_factory()
-        parser.set(self._section, self._key, str(value))
+        config_file = self._store.config_file
         try:
-            with open(config_file, "w", encoding="utf-8") as buffer:
-                parser.write(buffer)
+            self._store.set(self._section, self._key, str(value))
         except Exception as err:
             self.logger.error(
                 f"Unexpected error trying set {self._key}={value} on "
@@ -119,7 +242,7 @@ class _Config:
             )
 
     def __get(self) -> Any | None:
-        config_file, parser = self._parser_factory()
+        config_file, parser = self._store.config_file, self._store.parser
         try:
             return parser.get(self._section, self._key, fallback=self._default)
         except NoOptionError:
@@ -165,7 +288,7 @@ class _ConfigList(_Config):
         interactor.__rm(value=value)
 
     def __get(self) -> Iterator[str]:
-        config_file, parser = self._parser_factory()
+        config_file, parser = self._store.config_file, self._store.parser
         try:
             string = parser.get(self._section, self._key)
             string = string.replace("[", "").replace("]", "")
@@ -194,11 +317,9 @@ class _ConfigList(_Config):
             .replace("]", "\n]")
             .replace("\\\\", "\\")
         )
-        config_file, parser = self._parser_factory()
-        parser.set(self._section, self._key, string_list)
+        config_file = self._store.config_file
         try:
-            with open(config_file, "w") as configfile:
-                parser.write(configfile)
+            self._store.set(self._section, self._key, string_list)
         except Exception as err:
             self.logger.error(
                 f"Unexpected error trying set {self._key}={value} on "
@@ -296,6 +417,36 @@ class CompanyContact(_Config):
         super().__init__(key="company_contact_info", default="")
 
 
+class DatabaseProfile(_Config):
+    """Name of the SQLite connection profile used by the database engines, "tuned"
+    or "default" to keep SQLite's own settings.
+    """
+
+    def __init__(self):
+        super().__init__(section="database", key="profile", default="tuned")
+
+
+class DatabaseCacheSize(_ConfigInt):
+    """Page cache size (kb) of each database connection in the "tuned" profile."""
+
+    def __init__(self):
+        super().__init__(section="database", key="cache_size_kb", default=16384)
+
+
+class DatabaseMmapSize(_ConfigInt):
+    """Size (mb) of the database file mapped in memory in the "tuned" profile."""
+
+    def __init__(self):
+        super().__init__(section="database", key="mmap_size_mb", default=64)
+
+
+class DatabaseBusyTimeout(_ConfigInt):
+    """Time (ms) a connection waits for a locked database in the "tuned" profile."""
+
+    def __init__(self):
+        super().__init__(section="database", key="busy_timeout_ms", default=5000)
+
+
 # backup.ini
 
 
@@ -359,8 +510,8 @@ class TransactionsPerBackup(_ConfigInt):
 
 
 class TransactionsToBackup(_ConfigInt):
-    """Transactions remaining until a backup starts, updated only when
-    'backup_on_transaction=true'.
+    """Transactions remaining until a backup starts when the database is created. The
+    count is then kept in the database, see `cashd_core.data.count_towards_backup`.
     """
 
     def __init__(self):
@@ -372,6 +523,34 @@ class TransactionsToBackup(_ConfigInt):
         )
 
 
+class BackupPagesPerStep(_ConfigInt):
+    """Database pages copied at each step of a backup, see `BackupStepSleep`. Use -1
+    to copy the whole database at once.
+    """
+
+    def __init__(self):
+        super().__init__(
+            parser_factory=backup_parser,
+            section="copy",
+            key="pages_per_step",
+            default=1024,
+        )
+
+
+class BackupStepSleep(_ConfigInt):
+    """Time (ms) paused after each step of a backup, so writers are not held back
+    while large databases are copied.
+    """
+
+    def __init__(self):
+        super().__init__(
+            parser_factory=backup_parser,
+            section="copy",
+            key="step_sleep_ms",
+            default=5,
+        )
+
+
 class SettingsHandler:
     """
     Valores de configuração usados:
@@ -398,25 +577,6 @@ class SettingsHandler:
         self.config_file = path.join(CONFIG_DIR, f"{configname}.ini")
         self.log_file = path.join(LOG_DIR, f"{configname}.log")
 
-        # config parser
-        self.conf = ConfigParser()
-        self.conf.read(self.config_file)
-        try:
-            self.conf.add_section("default")
-        except DuplicateSectionError:
-            pass
-
-        # logger
-        self.logger = logging.getLogger(f"cashd.{__name__}")
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.propagate = False
-
-        log_fmt = logging.Formatter("%(asctime)s :: %(levelname)s %(message)s")
-        log_handler = logging.FileHandler(LOG_FILE)
-        log_handler.setLevel(logging.DEBUG)
-        log_handler.setFormatter(log_fmt)
-        self.logger.addHandler(log_handler)
-
         # create files, if not exist
         for file in [self.config_file, self.log_file]:
             makedirs(path.split(file)[0], exist_ok=True)
@@ -424,6 +584,16 @@ class SettingsHandler:
                 with open(file=file, mode="a"):
                     pass
 
+        # config parser, shared with every other handler of the same file
+        self.store = config_store(self.config_file)
+        self.store.add_section("default")
+        self.logger = logger
+
+    @property
+    def conf(self) -> ConfigParser:
+        """Current contents of the config file, see `ConfigStore.parser`."""
+        return self.store.parser
+
     def parse_list_from_config(self, string: str) -> list[str]:
         """
         Transforma uma config com multiplos itens uma uma lista de strings
@@ -446,13 +616,7 @@ class SettingsHandler:
     def _write(self, sect: str, key: str, val: str):
         """Escreve a combinacao de `key` e `val` na seção `sect`"""
         try:
-            if not self.conf.has_section(sect):
-                self.conf.add_section(sect)
-
-            self.conf.set(sect, key, val)
-            with open(self.config_file, "w") as newconfig:
-                self.conf.write(newconfig)
-            self.conf.read(self.config_file)
+            self.store.set(sect, key, val)
             self.logger.info(
                 f"Valor atualizado em {
                     self.config_file}: [{sect}] {key} = {val}"
@@ -499,11 +663,7 @@ class SettingsHandler:
             )
             return
         new_list = current_list + [val]
-
-        self.conf.set(sect, key, self.parse_list_to_config(new_list))
-        with open(self.config_file, "w", encoding="utf-8") as newconfig:
-            self.conf.write(newconfig)
-        self.conf.read(self.config_file)
+        self.store.set(sect, key, self.parse_list_to_config(new_list))
 
     def _rm_from_list(self, sect: str, key: str, idx: int):
         """Retira o `idx`-esimo item da lista, não faz nada se `idx` for inválido."""
@@ -519,10 +679,7 @@ class SettingsHandler:
             self.logger.error(f"{idx} fora dos limites, deve ser menor que {n}")
 
         _ = current_list.pop(idx)
-        self.conf.set(sect, key, self.parse_list_to_config(current_list))
-        with open(self.config_file, "w") as newconfig:
-            self.conf.write(newconfig)
-        self.conf.read(self.config_file, "iso 8859-1")
+        self.store.set(sect, key, self.parse_list_to_config(current_list))
 
 
 class PreferencesHandler(SettingsHandler):
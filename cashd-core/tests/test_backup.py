@@ -12,6 +12,7 @@ from cashd_core.backup import (
     read_db_size,
     write_current_size,
     copy_file,
+    backup_database,
     rename_on_db_folder,
     check_sqlite,
     read_last_recorded_size,
@@ -20,8 +21,9 @@ from cashd_core.backup import (
     load,
     run,
 )
-from cashd_core import data  # ensure database was created
+from cashd_core import backup, data
 
+data.get_engine()  # ensure database was created
 
 CONFIGS_DIR = os.path.split(CONFIG_FILE)[0]
 
@@ -67,6 +69,99 @@ def test_copy_file():
     os.unlink(tempfile.name)
 
 
+def test_backup_database():
+    """Test if backups include what was committed to the write-ahead log, even while
+    the database is being written.
+    """
+    with TemporaryDirectory() as tempdir:
+        db_file = os.path.join(tempdir, "live.db")
+        con = sqlite3.connect(db_file)
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.execute("PRAGMA wal_autocheckpoint=0;")
+        con.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value BLOB);")
+        con.executemany("INSERT INTO t (value) VALUES (randomblob(4096))", [()] * 200)
+        con.commit()
+        # an open transaction is not part of the backup
+        con.execute("INSERT INTO t (value) VALUES (NULL)")
+        backup_dir = os.path.join(tempdir, "backups")
+        os.mkdir(backup_dir)
+        copy = backup_database(db_file, backup_dir, pages_per_step=16, step_sleep_ms=0)
+        con.rollback()
+        con.close()
+        assert os.listdir(backup_dir) == [os.path.split(copy)[1]]
+        copy_con = sqlite3.connect(copy)
+        try:
+            assert copy_con.execute("SELECT count(*) FROM t").fetchone()[0] == 200
+            assert copy_con.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        finally:
+            copy_con.close()
+        # nothing is left behind on failures
+        assert backup_database(db_file, os.path.join(tempdir, "missing")) is None
+        with pytest.raises(sqlite3.Error):
+            backup_database(
+                os.path.join(tempdir, "none", "x.db"), backup_dir, _raise=True
+            )
+        assert len(os.listdir(backup_dir)) == 1
+
+
+def test_backup_database_step_sleep(monkeypatch):
+    """Test if backups pause `step_sleep_ms` after each step but the last."""
+    pauses = []
+    monkeypatch.setattr(backup, "sleep", pauses.append)
+    with TemporaryDirectory() as tempdir:
+        db_file = os.path.join(tempdir, "live.db")
+        con = sqlite3.connect(db_file)
+        con.execute("PRAGMA journal_mode=DELETE;")
+        con.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value BLOB);")
+        con.executemany("INSERT INTO t (value) VALUES (randomblob(4096))", [()] * 100)
+        con.commit()
+        n_pages = con.execute("PRAGMA page_count").fetchone()[0]
+        con.close()
+        copy = backup_database(db_file, tempdir, pages_per_step=10, step_sleep_ms=7)
+        assert copy is not None
+        assert pauses == [0.007] * ((n_pages - 1) // 10)
+
+
+def test_backup_database_rollback_journal(monkeypatch):
+    """Test if backups of databases out of WAL mode, that start over at every commit
+    between their steps, are copied in a single step after `MAX_BACKUP_RESTARTS`.
+    """
+    steps, commits = [], []
+    copy_database = backup._copy_database
+
+    def record_copy(source, target_path, pages_per_step, *args, **kwargs):
+        steps.append(pages_per_step)
+        return copy_database(source, target_path, pages_per_step, *args, **kwargs)
+
+    monkeypatch.setattr(backup, "_copy_database", record_copy)
+    with TemporaryDirectory() as tempdir:
+        db_file = os.path.join(tempdir, "live.db")
+        con = sqlite3.connect(db_file)
+        con.execute("PRAGMA journal_mode=DELETE;")
+        con.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value BLOB);")
+        con.executemany("INSERT INTO t (value) VALUES (randomblob(4096))", [()] * 100)
+        con.commit()
+
+        def write_in_pause(seconds: float):
+            con.execute("INSERT INTO t (value) VALUES (NULL)")
+            con.commit()
+            commits.append(seconds)
+
+        monkeypatch.setattr(backup, "sleep", write_in_pause)
+        copy = backup_database(db_file, tempdir, pages_per_step=10, step_sleep_ms=1)
+        con.close()
+        assert copy is not None
+        assert steps == [10, -1]
+        assert len(commits) == backup.MAX_BACKUP_RESTARTS + 1
+        copy_con = sqlite3.connect(copy)
+        try:
+            n_rows = copy_con.execute("SELECT count(*) FROM t").fetchone()[0]
+            assert n_rows == 100 + len(commits)
+            assert copy_con.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        finally:
+            copy_con.close()
+
+
 def test_rename_on_db_folder():
     db_folder = os.path.split(DB_FILE)[0]
 
@@ -0,0 +1,131 @@
+from cashd_core.data import (
+    dec_base,
+    tbl_clientes,
+    tbl_transacoes,
+    create_sqlite_engine,
+    check_customer_summary,
+    HighestAmountsSource,
+    select,
+    Session,
+)
+from cashd_core.csvio import import_csv, export_csv, iter_csv, parse_currency
+from cashd_core import data, backup
+from decimal import Decimal
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import pytest
+
+
+CUSTOMERS_CSV = """Primeiro Nome;Sobrenome;Telefone;Cidade;Estado
+Ana;Silva;;Curitiba;pr
+;Souza;;Londrina;PR
+João;Lima;abc;Londrina;PR
+
+Bia;Reis;(41) 99999-0000;Maringá;PR
+"""
+
+TRANSACTIONS_CSV = """IdCliente,DataTransac,Valor
+1,31/12/2024,"1.234,56"
+9,2024-01-01,10
+2,31/02/2024,1
+2,01/02/2024,-3.5
+"""
+
+
+@pytest.fixture
+def csv_dir(monkeypatch):
+    monkeypatch.setattr(backup, "run", lambda **kw: None)
+    with TemporaryDirectory() as tmpdir:
+        yield Path(tmpdir)
+
+
+def test_parse_currency():
+    assert parse_currency("1.234,56") == Decimal("1234.56")
+    assert parse_currency("R$ -10") == Decimal("-10")
+    assert parse_currency("3.5") == Decimal("3.5")
+    with pytest.raises(ValueError):
+        parse_currency("abc")
+
+
+def test_import_csv(csv_dir):
+    """Test if valid rows are imported in batches, and bad lines are reported."""
+    engine = create_sqlite_engine(":memory:")
+    dec_base.metadata.create_all(engine)
+    customers_file = Path(csv_dir, "clientes.csv")
+    customers_file.write_text(CUSTOMERS_CSV, encoding="utf-8")
+    progress = []
+    report = import_csv(
+        customers_file,
+        tbl_clientes,
+        engine=engine,
+        rows_per_batch=1,
+        on_progress=lambda r: progress.append(r.progress),
+    )
+    assert (report.n_written, report.n_errors) == (2, 2)
+    assert [line for line, _ in report.errors] == [3, 4]
+    assert progress == sorted(progress)
+    assert progress[-1] == 1.0
+
+    transactions_file = Path(csv_dir, "transacoes.csv")
+    transactions_file.write_text(TRANSACTIONS_CSV, encoding="utf-8")
+    report = import_csv(transactions_file, tbl_transacoes, engine=engine)
+    assert (report.n_written, report.n_errors) == (2, 2)
+    # lines pointing to missing customers are only found when the batch is written
+    assert sorted(line for line, _ in report.errors) == [3, 4]
+    with Session(engine) as ses:
+        stmt = select(tbl_transacoes.DataTransac, tbl_transacoes.Valor)
+        # amounts are stored in cents
+        assert ses.execute(stmt).all() == [
+            (date(2024, 12, 31), 123456),
+            (date(2024, 2, 1), -350),
+        ]
+        customer = ses.execute(select(tbl_clientes).where(tbl_clientes.Id == 1))
+        assert customer.scalar_one().Telefone == "(99) 90000-0000"
+    assert check_customer_summary(engine=engine) == []
+    engine.dispose()
+
+
+def test_import_csv_unknown_header(csv_dir):
+    """Test if files without any known column are rejected."""
+    file = Path(csv_dir, "planilha.csv")
+    file.write_text("a;b;c\n1;2;3\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        import_csv(file, tbl_clientes, engine=create_sqlite_engine(":memory:"))
+
+
+def test_export_csv(csv_dir):
+    """Test if tables and data sources are exported in a format that can be imported
+    back, streaming the rows in chunks.
+    """
+    engine = create_sqlite_engine(":memory:")
+    dec_base.metadata.create_all(engine)
+    customers_file = Path(csv_dir, "clientes.csv")
+    customers_file.write_text(CUSTOMERS_CSV, encoding="utf-8")
+    import_csv(customers_file, tbl_clientes, engine=engine)
+    transactions_file = Path(csv_dir, "transacoes.csv")
+    transactions_file.write_text(TRANSACTIONS_CSV, encoding="utf-8")
+    import_csv(transactions_file, tbl_transacoes, engine=engine)
+
+    chunks = list(iter_csv(tbl_transacoes, engine=engine, rows_per_chunk=1))
+    assert len(chunks) == 1 + 2 + 1  # header, one chunk per row, empty tail
+    assert chunks[0].startswith("Id;IdCliente;CarimboTempo;DataTransac;Valor")
+    assert chunks[1].endswith(";2024-12-31;1234,56\n")
+
+    # round trip of the raw table
+    exported_file = Path(csv_dir, "exportado.csv")
+    assert export_csv(tbl_transacoes, exported_file, engine=engine) == 2
+    copy_engine = create_sqlite_engine(":memory:")
+    dec_base.metadata.create_all(copy_engine)
+    import_csv(customers_file, tbl_clientes, engine=copy_engine)
+    report = import_csv(exported_file, tbl_transacoes, engine=copy_engine)
+    assert (report.n_written, report.n_errors) == (2, 0)
+    assert check_customer_summary(engine=copy_engine) == []
+
+    # data sources keep their columns
+    source = HighestAmountsSource(engine=engine, pagination_mode="keyset")
+    assert export_csv(source, exported_file, engine=engine) == 2
+    lines = exported_file.read_text(encoding="utf-8-sig").splitlines()
+    assert lines == ["Name;OwedAmount", "1, Ana Silva;1234,56", "2, Bia Reis;-3,50"]
+    engine.dispose()
+    copy_engine.dispose()
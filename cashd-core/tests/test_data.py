@@ -3,9 +3,31 @@ from cashd_core.data import (
     tbl_clientes,
     tbl_transacoes,
     CustomerListSource,
+    LastTransactionsSource,
     TransactionBalanceSource,
+    AggregatedAmountSource,
+    HighestAmountsSource,
+    InactiveCustomersSource,
+    customer_summary,
+    check_customer_summary,
+    rebuild_customer_summary,
+    daily_balance,
+    backup_counter,
+    check_daily_balance,
+    rebuild_daily_balance,
+    first_day_of_periods,
+    run_in_db_thread,
+    ledger_changes,
     get_default_customer,
+    create_sqlite_engine,
+    get_engine,
+    set_engine,
+    row_cache,
+    result_cache,
+    normalize_phonenumber,
+    normalize_phonenumbers,
     insert,
+    update,
     select,
     func,
     create_engine,
@@ -13,9 +35,15 @@ from cashd_core.data import (
     Session,
 )
 from cashd_core.prefs import settings
+from cashd_core.fmt import format_cents
+from cashd_core import backup, data, prefs
 from . import mock_data
 from datetime import date, datetime
-from sqlalchemy import exc
+from concurrent import futures
+import asyncio
+import threading
+import time
+from sqlalchemy import exc, event
 from typing import Generator
 from pathlib import Path
 import pytest
@@ -38,6 +66,58 @@ def test_engine(scope="session") -> Generator[Engine, None, None]:
     TEST_DB_PATH.unlink(missing_ok=True)
 
 
+@pytest.mark.parametrize(
+    argnames=("profile", "journal_mode", "synchronous"),
+    argvalues=[("tuned", "wal", 1), ("default", "delete", 2)],
+)
+def test_sqlite_profile(profile, journal_mode, synchronous):
+    """Test if the connection profile is applied to new connections."""
+    engine = create_sqlite_engine(TEST_DB_PATH, profile=profile)
+    try:
+        with engine.connect() as conn:
+            pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            assert pragma("journal_mode") == journal_mode
+            assert pragma("synchronous") == synchronous
+            if profile == "tuned":
+                assert pragma("temp_store") == 2
+                assert pragma("busy_timeout") > 0
+    finally:
+        engine.dispose()
+        TEST_DB_PATH.unlink(missing_ok=True)
+
+
+def test_lazy_engine():
+    """Test if the default engine can be pointed to another database."""
+    set_engine(":memory:")
+    try:
+        engine = get_engine()
+        assert get_engine() is engine
+        assert CustomerListSource().ENGINE is engine
+        # the schema is created on first use
+        assert tbl_clientes().table_is_empty()
+        customer = tbl_clientes(
+            PrimeiroNome="John",
+            Sobrenome="Doe",
+            Telefone="(11) 90000-0000",
+            Cidade="Curitiba",
+            Estado="PR",
+        )
+        customer.write()
+        assert not tbl_clientes().table_is_empty()
+        assert CustomerListSource().nrows == 1
+        # sources reading other databases resolve their engine through `DATABASE`
+        other = data.LazyEngine(":memory:", setup=dec_base.metadata.create_all)
+
+        class OtherSource(CustomerListSource):
+            DATABASE = other
+
+        assert OtherSource().ENGINE is other.get() is not engine
+        assert OtherSource().nrows == 0
+    finally:
+        set_engine(None)
+    assert get_engine() is not engine
+
+
 def test_test_db(test_engine):
     """Tests if the test database is accessible and contains data."""
     with Session(bind=test_engine) as ses:
@@ -105,6 +185,69 @@ def test_read_transaction(test_engine):
     assert pytransac.Id is None
 
 
+def test_read_cache(monkeypatch, test_engine):
+    """Test if repeated reads are served from memory until the data changes."""
+    select_queries = []
+
+    @event.listens_for(test_engine, "before_cursor_execute")
+    def record_select(conn, cursor, statement, *args):
+        if "FROM clientes" in statement:
+            select_queries.append(statement)
+
+    customer = tbl_clientes()
+    for _ in range(3):
+        customer.read(row_id=1, engine=test_engine)
+    assert len(select_queries) == 1
+    # writing through `dec_base` invalidates it
+    customer.Apelido = "Lido de novo"
+    customer.update(engine=test_engine)
+    n_queries = len(select_queries)
+    other = tbl_clientes()
+    other.read(row_id=1, engine=test_engine)
+    assert len(select_queries) == n_queries
+    assert other.Apelido == "Lido De Novo"
+    # so does writing from outside of it, once the database files are checked again
+    monkeypatch.setattr(data, "FILE_STAMP_INTERVAL", 0)
+    with test_engine.begin() as conn:
+        conn.execute(
+            update(tbl_clientes).where(tbl_clientes.Id == 1).values(Apelido="")
+        )
+    other.read(row_id=1, engine=test_engine)
+    assert len(select_queries) == n_queries + 1
+    assert other.Apelido == ""
+    # the cache is bounded
+    cache = row_cache(test_engine, tbl_clientes)
+    assert cache.MAXSIZE == tbl_clientes.READ_CACHE_SIZE
+    for row_id in range(1, 30):
+        other.read(row_id=row_id, engine=test_engine)
+    assert len(cache._rows) <= cache.MAXSIZE
+
+
+def test_data_version_file_checks(monkeypatch, test_engine):
+    """Test if the database files are only checked once per interval, while writes
+    made through `dec_base` change the version right away.
+    """
+    stats = []
+    real_stat = data.os.stat
+    monkeypatch.setattr(
+        data.os, "stat", lambda file: stats.append(file) or real_stat(file)
+    )
+    monkeypatch.setattr(data, "FILE_STAMP_INTERVAL", 3600)
+    data._FILE_STAMPS.pop(test_engine, None)
+    version = data.data_version(test_engine)
+    n_stats = len(stats)
+    assert n_stats > 0
+    for _ in range(10):
+        assert data.data_version(test_engine) == version
+    assert len(stats) == n_stats
+    data.bump_data_version(test_engine)
+    assert data.data_version(test_engine) != version
+    assert len(stats) == n_stats
+    monkeypatch.setattr(data, "FILE_STAMP_INTERVAL", 0)
+    data.data_version(test_engine)
+    assert len(stats) > n_stats
+
+
 def test_update_customer(test_engine):
     """Tests if customer data is being correctly updated on the database."""
     customer = tbl_clientes()
@@ -141,6 +284,30 @@ def test_write_customer(test_engine):
         assert db_customer is not None
 
 
+def test_phonenumber_e164(test_engine):
+    """Test if phone numbers are normalized once, and looked up by their E.164 form."""
+    normalize_phonenumber.cache_clear()
+    assert normalize_phonenumbers(["41 99999-0000", "(41) 99999-0000", "abc"]) == [
+        ("(41) 99999-0000", "+5541999990000"),
+        ("(41) 99999-0000", "+5541999990000"),
+        None,
+    ]
+    normalize_phonenumbers(["41 99999-0000"] * 10)
+    assert normalize_phonenumber.cache_info().misses == 3
+    customer = get_default_customer()
+    customer.PrimeiroNome, customer.Sobrenome = "Fone", "Teste"
+    customer.Cidade, customer.Estado = "Curitiba", "PR"
+    customer.Telefone = "41 99999-0000"
+    customer.write(engine=test_engine)
+    (customer_id,) = tbl_clientes.ids_by_phonenumber("+55 41 99999 0000", test_engine)
+    customer.read(row_id=customer_id, engine=test_engine)
+    assert customer.TelefoneE164 == "+5541999990000"
+    customer.Telefone = "(41) 98888-0000"
+    customer.update(engine=test_engine)
+    assert tbl_clientes.ids_by_phonenumber("41988880000", test_engine) == [customer_id]
+    assert tbl_clientes.ids_by_phonenumber("41999990000", test_engine) == []
+
+
 def test_write_transaction(test_engine):
     """Tests if transaction data is being correctly written to the database."""
     transac = tbl_transacoes()
@@ -161,6 +328,219 @@ def test_write_transaction(test_engine):
         assert db_transac is not None
 
 
+def test_async_data_access(test_engine, monkeypatch):
+    """Test if the `*_async` methods run in the database thread pool, and give the
+    same results as their blocking counterparts.
+    """
+    monkeypatch.setattr(backup, "run", lambda **kw: None)
+    source = CustomerListSource(engine=test_engine, pagination_mode="keyset")
+    balance = TransactionBalanceSource(engine=test_engine)
+
+    async def main():
+        thread_name = await run_in_db_thread(lambda: threading.current_thread().name)
+        assert thread_name.startswith("cashd-db")
+        customer = tbl_clientes()
+        await customer.read_async(row_id=1, engine=test_engine)
+        transac = tbl_transacoes(
+            IdCliente=customer.Id, DataTransac=date(1999, 12, 31), Valor=321
+        )
+        await transac.write_async(engine=test_engine)
+        n_written = await tbl_transacoes.write_many_async(
+            [transac, transac], engine=test_engine
+        )
+        assert n_written == 2
+        # concurrent calls on different sources
+        first_page, _ = await asyncio.gather(
+            source.current_data_async(), balance.update_date_format_async("d")
+        )
+        await source.fetch_next_page_async()
+        await source.set_search_text_async(customer.PrimeiroNome)
+        return customer, first_page, await source.current_data_async()
+
+    customer, first_page, searched = asyncio.run(main())
+    assert customer.Id == 1
+    assert balance.DATE_FORMAT == "%Y-%m-%d"
+    datetime.strptime(balance.current_data[0].Date, "%Y-%m-%d")
+    assert len(first_page) > 0
+    assert source.current_page == 1
+    assert 1 in [row.Id for row in searched]
+
+
+def test_ledger_changes(test_engine, monkeypatch):
+    """Test if writes, deletions and customer updates publish the change in the
+    customer's balance.
+    """
+    monkeypatch.setattr(backup, "run", lambda **kw: None)
+    changes = []
+    unsubscribe = ledger_changes.subscribe(changes.append)
+    try:
+        customer = tbl_clientes()
+        customer.read(row_id=1, engine=test_engine)
+        with Session(test_engine) as ses:
+            balance = ses.execute(
+                select(customer_summary.c.Saldo).where(
+                    customer_summary.c.IdCliente == 1
+                )
+            ).scalar()
+        transac = tbl_transacoes(
+            IdCliente=1, DataTransac=date(1999, 12, 31), Valor=1050
+        )
+        transac.write(engine=test_engine)
+        tbl_transacoes.write_many(
+            [
+                {"IdCliente": 1, "DataTransac": date(1999, 12, 31), "Valor": v}
+                for v in [-50, -100]
+            ],
+            engine=test_engine,
+        )
+        transac.delete(engine=test_engine)
+        customer.update(engine=test_engine)
+    finally:
+        unsubscribe()
+    assert [(c.kind, c.customer_id, c.delta, c.balance) for c in changes] == [
+        ("transaction_added", 1, 1050, balance + 1050),
+        ("transaction_added", 1, -150, balance + 900),
+        ("transaction_deleted", 1, -1050, balance - 150),
+        ("customer_updated", 1, 0, balance - 150),
+    ]
+    assert changes[0].transaction_id == changes[2].transaction_id == transac.Id
+    assert changes[2].transaction_date == date(1999, 12, 31)
+    # nothing is published after unsubscribing
+    transac.write(engine=test_engine)
+    assert len(changes) == 4
+
+
+def test_ledger_changes_concurrent_writes(test_engine, monkeypatch):
+    """Test if each published change carries the balance right after it's own write,
+    when many threads write for the same customer.
+    """
+    monkeypatch.setattr(backup, "run", lambda **kw: None)
+    changes = []
+    unsubscribe = ledger_changes.subscribe(changes.append)
+
+    def write_some():
+        for _ in range(5):
+            transac = tbl_transacoes(IdCliente=1, DataTransac=date.today(), Valor=1)
+            transac.write(engine=test_engine)
+
+    def let_others_commit(ses):
+        time.sleep(0.01)
+
+    try:
+        with Session(test_engine) as ses:
+            stmt = select(customer_summary.c.Saldo).where(
+                customer_summary.c.IdCliente == 1
+            )
+            balance = ses.execute(stmt).scalar()
+        # other writes land between each commit and anything that runs after it
+        event.listen(Session, "after_commit", let_others_commit)
+        threads = [threading.Thread(target=write_some) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(Session, "after_commit", let_others_commit)
+        unsubscribe()
+    balances = sorted(c.balance for c in changes)
+    assert balances == list(range(balance + 1, balance + 21))
+
+
+def test_write_many(test_engine, monkeypatch):
+    """Test if rows are validated and written in bulk, counting towards the backup
+    as a single step.
+    """
+    counter = {"backups": 0}
+    monkeypatch.setattr(
+        backup, "run", lambda **kw: counter.update(backups=counter["backups"] + 1)
+    )
+    remaining_stmt = select(backup_counter.c.TransacoesRestantes)
+    with Session(test_engine) as ses:
+        ses.execute(
+            update(backup_counter).values(
+                Ativo=1, TransacoesPorBackup=20, TransacoesRestantes=5
+            )
+        )
+        ses.commit()
+        n_before = ses.execute(select(func.count(tbl_transacoes.Id))).scalar()
+    rows = [
+        {"IdCliente": 1, "DataTransac": date(1999, 12, 31), "Valor": 100},
+        tbl_transacoes(IdCliente=2, DataTransac=date(1999, 12, 31), Valor=-50),
+        {"IdCliente": 3, "DataTransac": date(1999, 12, 31), "Valor": 25},
+    ]
+    assert tbl_transacoes.write_many(rows, engine=test_engine) == 3
+    with Session(test_engine) as ses:
+        assert ses.execute(remaining_stmt).scalar() == 2
+    assert counter["backups"] == 0
+    # a batch reaching the counter runs a single backup
+    assert tbl_transacoes.write_many(rows, engine=test_engine) == 3
+    with Session(test_engine) as ses:
+        assert ses.execute(remaining_stmt).scalar() == 20
+    assert counter["backups"] == 1
+    # nothing is written if any row is invalid
+    with pytest.raises(ValueError, match="Linhas inválidas: 2"):
+        tbl_transacoes.write_many(
+            [rows[0], {"IdCliente": 1, "Valor": "abc"}], engine=test_engine
+        )
+    with Session(test_engine) as ses:
+        n_after = ses.execute(select(func.count(tbl_transacoes.Id))).scalar()
+    assert n_after == n_before + 6
+    assert check_customer_summary(engine=test_engine) == []
+    # customers use the column defaults for missing values
+    customers = [
+        {"PrimeiroNome": "ana", "Sobrenome": "lote", "Cidade": "x", "Estado": "pr"},
+        {"PrimeiroNome": "", "Sobrenome": "lote", "Cidade": "x", "Estado": "pr"},
+    ]
+    with pytest.raises(ValueError, match="Linhas inválidas: 2"):
+        tbl_clientes.write_many(customers, engine=test_engine)
+    assert tbl_clientes.write_many(customers[:1], engine=test_engine) == 1
+    with Session(test_engine) as ses:
+        stmt = select(tbl_clientes).where(tbl_clientes.Sobrenome == "Lote")
+        customer = ses.execute(stmt).scalar_one()
+        assert customer.Estado == "PR"
+        assert customer.Telefone == "(99) 90000-0000"
+
+
+def test_backup_counter(test_engine, monkeypatch):
+    """Test if concurrent writers run exactly one backup each time the count of
+    transactions is reached, without reading the preferences.
+    """
+    backups = []
+    monkeypatch.setattr(backup, "run", lambda **kw: backups.append(kw))
+    monkeypatch.setattr(prefs.TransactionsToBackup, "get", lambda: 1 / 0)
+    with Session(test_engine) as ses:
+        ses.execute(
+            update(backup_counter).values(
+                Ativo=1, TransacoesPorBackup=10, TransacoesRestantes=10
+            )
+        )
+        ses.commit()
+
+    def write_transactions(customer_id: int):
+        for _ in range(10):
+            transac = tbl_transacoes(
+                IdCliente=customer_id, DataTransac=date(1999, 12, 31), Valor=1
+            )
+            transac.write(engine=test_engine)
+
+    threads = [
+        threading.Thread(target=write_transactions, args=(i,)) for i in range(1, 5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backups == [{"force": True}] * 4
+    with Session(test_engine) as ses:
+        stmt = select(backup_counter.c.TransacoesRestantes)
+        assert ses.execute(stmt).scalar() == 10
+        # disabled counters are left untouched
+        ses.execute(update(backup_counter).values(Ativo=0))
+        ses.commit()
+    tbl_transacoes.write_many([{"IdCliente": 1, "Valor": 1}] * 10, engine=test_engine)
+    assert len(backups) == 4
+
+
 def test_searchable_paginated_data_source(test_engine):
     """Test if a paginated and/or searchable data source behaves accordingly."""
     source = CustomerListSource(engine=test_engine)
@@ -187,6 +567,292 @@ def test_searchable_paginated_data_source(test_engine):
         assert ("José" in row.Name) or ("Silva" in row.Name)
 
 
+@pytest.mark.parametrize(
+    argnames=("source_cls"),
+    argvalues=[
+        LastTransactionsSource,
+        HighestAmountsSource,
+        InactiveCustomersSource,
+        TransactionBalanceSource,
+    ],
+)
+def test_currency_columns(source_cls, test_engine):
+    """Test if data sources return amounts in cents, formatted only when displayed."""
+    source = source_cls(engine=test_engine)
+    rows, formatted = source.current_data, source.formatted_data
+    assert len(source.CURRENCY_COLNAMES) > 0
+    for row, formatted_row in zip(rows, formatted):
+        for col in source.CURRENCY_COLNAMES:
+            cents = getattr(row, col)
+            assert type(cents) is int
+            assert formatted_row[col] == f"{cents / 100:.2f}".replace(".", ",")
+    assert format_cents([-5, 0, None, 123456]) == ["-0,05", "0,00", "0,00", "1234,56"]
+
+
+def test_cached_statements(test_engine):
+    """Test if data sources reuse their statements, passing the values as parameters."""
+    source = CustomerListSource(engine=test_engine)
+    other = CustomerListSource(engine=test_engine)
+    assert source.SELECT_STMT is other.SELECT_STMT
+    stmt_ana, params_ana = source._searched_stmt("Ana Silva")
+    stmt_jose, params_jose = other._searched_stmt("José Santos")
+    assert stmt_ana is stmt_jose
+    assert params_ana != params_jose
+    # binding the parameters returns the same rows
+    with Session(test_engine) as ses:
+        assert ses.execute(stmt_ana, params_ana).all() == (
+            ses.execute(source.searched_select_stmt("Ana Silva")).all()
+        )
+    balance = TransactionBalanceSource(engine=test_engine)
+    monthly_stmt = balance.SELECT_STMT
+    balance.update_date_format("d")
+    assert balance.SELECT_STMT is not monthly_stmt
+    balance.update_date_format("m")
+    assert balance.SELECT_STMT is monthly_stmt
+
+
+@pytest.mark.parametrize(
+    argnames=("source_cls"),
+    argvalues=[
+        CustomerListSource,
+        LastTransactionsSource,
+        HighestAmountsSource,
+        InactiveCustomersSource,
+    ],
+)
+def test_keyset_paginated_data_source(source_cls, test_engine):
+    """Test if keyset pagination yields the same pages as offset pagination."""
+    offset_source = source_cls(engine=test_engine)
+    keyset_source = source_cls(engine=test_engine, pagination_mode="keyset")
+    probing_source = source_cls(
+        engine=test_engine, pagination_mode="keyset", count_rows=False
+    )
+    assert keyset_source.is_keyset_paginated()
+    assert not offset_source.is_keyset_paginated()
+    # without counting, only the "has more" probe tells if there is a next page
+    assert probing_source.nrows is None
+    sources = [offset_source, keyset_source, probing_source]
+    pages = []
+    while True:
+        current_pages = [s.current_data for s in sources]
+        assert current_pages[0] == current_pages[1] == current_pages[2]
+        assert len({(s.min_idx, s.max_idx, s.current_page) for s in sources}) == 1
+        pages.append(current_pages[0])
+        if not probing_source.has_more:
+            break
+        for source in sources:
+            source.fetch_next_page()
+    assert sum(len(p) for p in pages) == offset_source.nrows
+    # walk back to the first page
+    for page in reversed(pages[:-1]):
+        for source in sources:
+            source.fetch_previous_page()
+            assert source.current_data == page
+    assert keyset_source.current_page == 1
+
+
+def test_indexed_search(test_engine):
+    """Test if customer searches use the full-text index, and if it follows updates."""
+    source = CustomerListSource(engine=test_engine)
+    assert source.uses_search_index()
+    customer = tbl_clientes()
+    customer.read(row_id=1, engine=test_engine)
+    # prefixes match, and so does the Id
+    source.search_text = f"{customer.PrimeiroNome[:3]} {customer.Sobrenome}"
+    assert 1 in [row.Id for row in source.current_data]
+    source.search_text = f"1 {customer.Sobrenome}"
+    assert 1 in [row.Id for row in source.current_data]
+    # accents are ignored
+    source.search_text = "jose"
+    assert len(source.current_data) > 0
+    for row in source.current_data:
+        assert ("José" in row.Name) or ("José" in row.Place)
+    # the index follows the updated name
+    customer.PrimeiroNome = "Zacarias"
+    customer.update(engine=test_engine)
+    source.search_text = "Zacar"
+    assert [row.Id for row in source.current_data] == [1]
+
+
+def test_customer_summary(test_engine):
+    """Test if the customer summary follows the transactions, and can be rebuilt."""
+    assert check_customer_summary(engine=test_engine) == []
+    transac = tbl_transacoes()
+    transac.read(row_id=1, engine=test_engine)
+    customer_id = transac.IdCliente
+    # insert, update and delete are reflected on the summary
+    new_transac = tbl_transacoes(
+        IdCliente=customer_id, DataTransac=date(1999, 12, 31), Valor=123
+    )
+    new_transac.write(engine=test_engine)
+    assert check_customer_summary(engine=test_engine) == []
+    transac.Valor = 99999
+    transac.update(engine=test_engine)
+    assert check_customer_summary(engine=test_engine) == []
+    transac.delete(engine=test_engine)
+    assert check_customer_summary(engine=test_engine) == []
+    with Session(test_engine) as ses:
+        first_transac = ses.execute(
+            select(customer_summary.c.PrimeiraTransac).where(
+                customer_summary.c.IdCliente == customer_id
+            )
+        ).scalar_one()
+        assert first_transac == date(1999, 12, 31)
+    # tampered rows are found and fixed by a rebuild
+    with Session(test_engine) as ses:
+        ses.execute(customer_summary.update().values(Saldo=0))
+        ses.commit()
+    assert customer_id in check_customer_summary(engine=test_engine)
+    rebuild_customer_summary(engine=test_engine)
+    assert check_customer_summary(engine=test_engine) == []
+
+
+def test_daily_balance(test_engine):
+    """Test if the daily rollup follows the transactions, can be rebuilt, and matches
+    the amounts of the transactions grouped by the stats sources.
+    """
+    assert check_daily_balance(engine=test_engine) == []
+    transac = tbl_transacoes()
+    transac.read(row_id=1, engine=test_engine)
+    new_transac = tbl_transacoes(
+        IdCliente=transac.IdCliente, DataTransac=date(1999, 12, 31), Valor=-123
+    )
+    new_transac.write(engine=test_engine)
+    assert check_daily_balance(engine=test_engine) == []
+    transac.Valor = 99999
+    transac.DataTransac = date(1999, 12, 31)
+    transac.update(engine=test_engine)
+    assert check_daily_balance(engine=test_engine) == []
+    source = TransactionBalanceSource(engine=test_engine)
+    source.update_date_format("d")
+    oldest = source.SELECT_STMT.order_by(None).order_by("Date").limit(1)
+    with Session(test_engine) as ses:
+        assert tuple(ses.execute(oldest).one()) == ("1999-12-31", 99999, -123, 99876)
+    transac.delete(engine=test_engine)
+    assert check_daily_balance(engine=test_engine) == []
+    with Session(test_engine) as ses:
+        stmt = select(daily_balance).where(
+            daily_balance.c.DataTransac == date(1999, 12, 31)
+        )
+        assert tuple(ses.execute(stmt).one()) == (date(1999, 12, 31), 0, -123, 1)
+    # tampered rows are found and fixed by a rebuild
+    with Session(test_engine) as ses:
+        ses.execute(daily_balance.update().values(Somas=0))
+        ses.commit()
+    assert len(check_daily_balance(engine=test_engine)) > 0
+    rebuild_daily_balance(engine=test_engine)
+    assert check_daily_balance(engine=test_engine) == []
+
+
+def test_cached_row_count(test_engine):
+    """Test if row counts are reused while the data is unchanged."""
+    count_queries = []
+
+    @event.listens_for(test_engine, "before_cursor_execute")
+    def record_count(conn, cursor, statement, *args):
+        if statement.lstrip().lower().startswith("select count("):
+            count_queries.append(statement)
+
+    source = CustomerListSource(engine=test_engine)
+    nrows = source.nrows
+    assert len(count_queries) == 1
+    source.fetch_next_page()
+    source.fetch_previous_page()
+    source.search_text = "Silva"
+    source.search_text = ""
+    # one new count for the new search, then the cached one
+    assert len(count_queries) == 2
+    assert source.nrows == nrows
+    # writing invalidates the cached counts
+    customer = get_default_customer()
+    customer.fill(
+        tbl_clientes(
+            PrimeiroNome="John",
+            Sobrenome="Doe",
+            Telefone="(11) 90000-0000",
+            Cidade="Curitiba",
+            Estado="PR",
+        )
+    )
+    customer.write(engine=test_engine)
+    source.fetch_next_page()
+    assert len(count_queries) == 3
+    assert source.nrows == nrows + 1
+
+
+@pytest.mark.parametrize("pagination_mode", ["offset", "keyset"])
+def test_shared_results(pagination_mode, test_engine):
+    """Test if data sources over the same query keep their own page and search, but
+    share the results fetched by each other.
+    """
+    queries = []
+
+    @event.listens_for(test_engine, "before_cursor_execute")
+    def record_query(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    first = CustomerListSource(engine=test_engine, pagination_mode=pagination_mode)
+    first_page = first.current_data
+    n_queries = len(queries)
+    second = CustomerListSource(engine=test_engine, pagination_mode=pagination_mode)
+    assert second.current_data == first_page
+    assert len(queries) == n_queries
+    # each source moves on it's own
+    second.fetch_next_page()
+    second.search_text = "Silva"
+    assert first.current_page == 1
+    assert first.search_text == ""
+    assert first.current_data == first_page
+    # results are fetched again after the data changes
+    cache = result_cache(test_engine)
+    misses = cache.misses
+    customer = tbl_clientes()
+    customer.read(row_id=first_page[0].Id, engine=test_engine)
+    customer.update(engine=test_engine)
+    first.current_data
+    assert cache.misses == misses + 1
+
+
+@pytest.mark.parametrize("pagination_mode", ["offset", "keyset"])
+def test_prefetch_pages(pagination_mode, test_engine):
+    """Test if the pages around the current one are fetched in the background, and
+    thrown away when the data changes before they are used.
+    """
+    page_queries = []
+
+    @event.listens_for(test_engine, "before_cursor_execute")
+    def record_query(conn, cursor, statement, *args):
+        # queries made while serving pages, prefetches run in other threads
+        if threading.current_thread() is threading.main_thread():
+            if "count(" not in statement:
+                page_queries.append(statement)
+
+    source = CustomerListSource(
+        engine=test_engine, pagination_mode=pagination_mode, prefetch_pages=True
+    )
+    source.current_data
+    futures.wait(source._prefetching)
+    n_queries = len(page_queries)
+    source.fetch_next_page()
+    second_page = source.current_data
+    assert len(page_queries) == n_queries
+    futures.wait(source._prefetching)
+    # both the first and the third pages are ready
+    n_queries = len(page_queries)
+    source.fetch_previous_page()
+    assert source.current_data[0].Id < second_page[0].Id
+    assert len(page_queries) == n_queries
+    futures.wait(source._prefetching)
+    # prefetched pages are not served after the data changes
+    customer = tbl_clientes()
+    customer.read(row_id=1, engine=test_engine)
+    customer.update(engine=test_engine)
+    n_queries = len(page_queries)
+    source.fetch_next_page()
+    assert source.current_data == second_page
+    assert len(page_queries) > n_queries
+
+
 def test_not_searchable_data_source(test_engine):
     """Test if a not searchable data source behaves accordingly."""
     source = TransactionBalanceSource(engine=test_engine)
@@ -225,13 +891,88 @@ def test_multiple_timings(test_engine):
     datetime.strptime(cdate, "%Y-%m-%d")
 
 
+def test_first_day_of_periods():
+    today = date(2024, 1, 17)  # a wednesday
+    assert first_day_of_periods("m", 1, today) == date(2024, 1, 1)
+    assert first_day_of_periods("m", 13, today) == date(2023, 1, 1)
+    assert first_day_of_periods("w", 2, today) == date(2024, 1, 8)
+    assert first_day_of_periods("d", 3, today) == date(2024, 1, 15)
+    with pytest.raises(ValueError):
+        first_day_of_periods("m", 0, today)
+    # the first day moves when the current date crosses into a new period
+    assert first_day_of_periods("d", 1, date(2024, 1, 31)) == date(2024, 1, 31)
+    assert first_day_of_periods("d", 1, date(2024, 2, 1)) == date(2024, 2, 1)
+    assert first_day_of_periods("w", 1, date(2024, 1, 21)) == date(2024, 1, 15)
+    assert first_day_of_periods("w", 1, date(2024, 1, 22)) == date(2024, 1, 22)
+    assert first_day_of_periods("m", 2, date(2023, 12, 31)) == date(2023, 11, 1)
+    assert first_day_of_periods("m", 2, date(2024, 1, 1)) == date(2023, 12, 1)
+
+
+@pytest.mark.parametrize("pagination_mode", ["offset", "keyset"])
+def test_bounded_periods(pagination_mode, test_engine):
+    """Test if the date grouped sources can be bound to a period, and the accumulated
+    balance inside it matches the one computed over the whole history.
+    """
+    source = AggregatedAmountSource(engine=test_engine, pagination_mode=pagination_mode)
+    source.update_date_format("d")
+    full_history = {row.Date: row for row in source.get_data_slice()}
+    days = sorted(full_history)
+    since, until = date.fromisoformat(days[1]), date.fromisoformat(days[-2])
+    source.update_period(since=since, until=until)
+    assert source.PERIOD == (since, until)
+    if pagination_mode == "offset":
+        assert source.nrows == len(days) - 2
+    for row in source.current_data:
+        assert row == full_history[row.Date]
+    assert source.current_data[0].Date == days[-2]
+
+    balance = TransactionBalanceSource(engine=test_engine)
+    balance.update_period(last_n=3)
+    assert balance.PERIOD == (first_day_of_periods("m", 3), None)
+    assert balance.nrows <= 3
+    # the same number of periods follows the date frequency
+    balance.update_date_format("w")
+    assert balance.PERIOD == (first_day_of_periods("w", 3), None)
+    balance.update_date_format("m")
+    balance.update_period()
+    assert balance.PERIOD == (None, None)
+    assert balance.nrows == TransactionBalanceSource(engine=test_engine).nrows
+    with pytest.raises(ValueError):
+        balance.update_period(since=since, last_n=3)
+
+
+def test_last_periods_follow_the_date(monkeypatch, test_engine):
+    """Test if sources bound to the last periods move their window along with the
+    current date, instead of keeping the one of when they were bound.
+    """
+    today = {"value": date(2024, 1, 31)}
+    first_day = data.first_day_of_periods
+    monkeypatch.setattr(
+        data,
+        "first_day_of_periods",
+        lambda date_freq, n_periods: first_day(date_freq, n_periods, today["value"]),
+    )
+    balance = TransactionBalanceSource(engine=test_engine)
+    balance.update_date_format("d")
+    balance.update_period(last_n=2)
+    assert balance.PERIOD == (date(2024, 1, 30), None)
+    # midnight passes while the source is kept around
+    today["value"] = date(2024, 2, 1)
+    balance.current_data
+    assert balance.PERIOD == (date(2024, 1, 31), None)
+    assert balance.SELECT_PARAMS == {"period_since": date(2024, 1, 31)}
+    balance.update_date_format("m")
+    assert balance.PERIOD == (date(2024, 1, 1), None)
+
+
 def test_validated_data(test_engine):
     """Test `cashd.data.ValidatedData` properties."""
     customer = tbl_clientes()
     customer.read(row_id=1, engine=test_engine)
-    # all columns except "Id" should be available on `data`
+    # all columns except "Id" and the derived ones should be available on `data`
     colnames = tbl_clientes.__table__.c.keys()
-    colnames.remove("Id")
+    for name in ["Id", *tbl_clientes.DERIVED_COLUMNS]:
+        colnames.remove(name)
     assert list(customer.data.keys()) == colnames
     # data should match values on read row
     with Session(bind=test_engine) as ses:
@@ -247,6 +988,43 @@ def test_validated_data(test_engine):
         assert customer.types[name] == type(customer.__table__.c[name].type)
 
 
+def test_customer_transactions_window(test_engine):
+    """Test if the customer's history can be fetched in windows, most recent first."""
+    customer = tbl_clientes()
+    customer.read(row_id=1, engine=test_engine)
+    everything = customer.transactions(engine=test_engine)
+    assert len(everything) == 4
+    first = customer.transactions(limit=3, engine=test_engine)
+    assert first == everything[:3]
+    rest = customer.transactions(limit=3, before_id=first[-1]["id"], engine=test_engine)
+    assert rest == everything[3:]
+    # date range is inclusive
+    dates = sorted(tr["data"] for tr in everything)
+    ranged = customer.transactions(since=dates[1], until=dates[2], engine=test_engine)
+    assert [tr["data"] for tr in ranged] == [dates[2], dates[1]]
+
+
+def test_customer_transactions_balance(test_engine):
+    """Test if each transaction comes with the running balance of the customer."""
+    customer = tbl_clientes()
+    customer.read(row_id=1, engine=test_engine)
+    everything = customer.transactions(engine=test_engine)
+    balance = 0
+    for tr in reversed(everything):
+        balance = balance + int(tr["valor"].replace(",", ""))
+        assert tr["saldo_cents"] == balance
+        # formatted like the amounts of the stats tables
+        assert tr["saldo"] == format_cents([balance])[0]
+    # windows and date filters do not change the balance of each transaction
+    rest = customer.transactions(
+        limit=2, before_id=everything[1]["id"], engine=test_engine
+    )
+    assert rest == everything[2:4]
+    dates = sorted(tr["data"] for tr in everything)
+    for tr in customer.transactions(since=dates[1], until=dates[2], engine=test_engine):
+        assert tr in everything
+
+
 @pytest.mark.parametrize(argnames=("row_id"), argvalues=[i for i in range(1, 30)])
 def test_customer_special_properties(row_id, test_engine):
     """Check if `tbl_clientes` special properties follow the expected format."""
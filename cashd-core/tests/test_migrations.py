@@ -0,0 +1,98 @@
+from cashd_core.data import (
+    dec_base,
+    tbl_clientes,
+    normalize_phonenumber,
+    MIGRATIONS,
+    create_engine,
+    Engine,
+)
+from cashd_core.migrations import (
+    Migration,
+    get_user_version,
+    pending_migrations,
+    migrate,
+    init_database,
+)
+from sqlalchemy import inspect, insert, select
+from . import mock_data
+from tempfile import TemporaryDirectory
+from typing import Generator
+from pathlib import Path
+import os
+import pytest
+
+
+TEST_DB_PATH = Path(Path(__file__).parent, "test_migrations.db")
+
+
+@pytest.fixture
+def old_engine() -> Generator[Engine, None, None]:
+    """Engine pointing to a database created before any migration existed."""
+    engine = create_engine(f"sqlite:///{TEST_DB_PATH}")
+    dec_base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in dec_base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn)
+        conn.exec_driver_sql('ALTER TABLE clientes DROP COLUMN "TelefoneE164"')
+        conn.execute(insert(tbl_clientes).values(mock_data.customers))
+    yield engine
+    engine.dispose()
+    TEST_DB_PATH.unlink(missing_ok=True)
+
+
+def index_names(engine: Engine) -> list[str]:
+    inspector = inspect(engine)
+    return [
+        index["name"]
+        for table_name in inspector.get_table_names()
+        for index in inspector.get_indexes(table_name)
+    ]
+
+
+def test_migrate(old_engine):
+    """Test if pending migrations are applied once, after a safety backup."""
+    assert get_user_version(old_engine) == 0
+    assert "ix_transacoes_IdCliente_Id" not in index_names(old_engine)
+    with TemporaryDirectory() as backup_dir:
+        timings = migrate(old_engine, MIGRATIONS, backup_dir=backup_dir)
+        assert len(os.listdir(backup_dir)) == 1
+    assert [version for version, _, _ in timings] == [m.version for m in MIGRATIONS]
+    assert get_user_version(old_engine) == MIGRATIONS[-1].version
+    for name in [
+        "ix_clientes_Nome",
+        "ix_transacoes_IdCliente_Id",
+        "ix_transacoes_DataTransac",
+    ]:
+        assert name in index_names(old_engine)
+    with old_engine.connect() as conn:
+        stmt = select(tbl_clientes.Telefone, tbl_clientes.TelefoneE164)
+        for phone, e164 in conn.execute(stmt):
+            assert e164 == normalize_phonenumber(phone)[1]
+    # nothing left to apply
+    assert pending_migrations(old_engine, MIGRATIONS) == []
+    assert migrate(old_engine, MIGRATIONS, backup_dir=None) == []
+
+
+def test_failed_migration(old_engine):
+    """Test if a failing migration keeps the version of the last successful one."""
+
+    def broken_upgrade(connection):
+        raise RuntimeError("Broken migration")
+
+    broken = MIGRATIONS + [Migration(len(MIGRATIONS) + 1, "Broken", broken_upgrade)]
+    with pytest.raises(RuntimeError):
+        migrate(old_engine, broken, backup_dir=None)
+    assert get_user_version(old_engine) == MIGRATIONS[-1].version
+
+
+def test_init_new_database():
+    """Test if a new database is created already on the latest version."""
+    engine = create_engine(f"sqlite:///{TEST_DB_PATH}")
+    try:
+        assert init_database(engine, dec_base.metadata, MIGRATIONS) == []
+        assert get_user_version(engine) == MIGRATIONS[-1].version
+        assert "ix_transacoes_IdCliente_Id" in index_names(engine)
+    finally:
+        engine.dispose()
+        TEST_DB_PATH.unlink(missing_ok=True)
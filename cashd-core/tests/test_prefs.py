@@ -3,10 +3,14 @@ from os import path, unlink
 from tempfile import TemporaryFile, TemporaryDirectory
 from cashd_core.prefs import (
     PREFS_CONFIG_FILE,
+    LOG_FILE,
     SettingsHandler,
     PreferencesHandler,
     BackupPrefsHandler,
     get_parser,
+    config_store,
+    logger,
+    ConfigStore,
     _ConfigList,
     _ConfigInt,
     _ConfigBool,
@@ -129,6 +133,38 @@ def test_bool_conf():
             conf_path.unlink()
 
 
+def test_config_store(monkeypatch):
+    """Test if config files are parsed once and served from memory, parsed again
+    when changed by someone else, and written without leaving temporary files.
+    """
+    conf_path, _ = test_parser()
+    try:
+        for _ in range(5):
+            TestConfigInt.set(TestConfigInt.get() + 1)
+        log_files = [getattr(h, "baseFilename", None) for h in logger.handlers]
+        assert log_files.count(path.abspath(LOG_FILE)) == 1
+        store = config_store(conf_path)
+        assert test_parser()[1] is store.parser
+        parsed = []
+        monkeypatch.setattr(
+            ConfigStore, "_file_stamp", lambda self: parsed.append(self) or (0, 0)
+        )
+        TestConfigInt.get()
+        assert len(parsed) == 0
+        monkeypatch.undo()
+
+        # changes made by another process are picked up
+        monkeypatch.setattr(ConfigStore, "REVALIDATE_INTERVAL", 0)
+        conf_path.write_text("[int_test]\nlevel = 42\n", encoding="utf-8")
+        assert TestConfigInt.get() == 42
+        TestConfigBool.set(True)
+        assert "level = 42" in conf_path.read_text(encoding="utf-8")
+        assert [f.name for f in conf_path.parent.glob(f".{conf_path.name}.*")] == []
+    finally:
+        if conf_path.is_file():
+            conf_path.unlink()
+
+
 @pytest.mark.parametrize(
     "string,expected_list",
     [
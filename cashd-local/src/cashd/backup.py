@@ -8,6 +8,7 @@ import logging
 import shutil
 
 from cashd_core.prefs import BackupPrefsHandler
+from cashd_core.backup import checkpoint
 
 ####################
 # GLOBAL VARS
@@ -229,6 +230,7 @@ def load(file: str, _raise: bool = False) -> None:
             raise OSError(msg)
 
     if db_is_present:
+        checkpoint(DB_FILE, _raise=_raise)
         now = datetime.now()
         dbfilename = path.split(DB_FILE)[1]
         stashfilename = f"stashed{now}.db".replace(":", "-")
@@ -264,6 +266,7 @@ def run(
     settings.write_dbsize(current_size)
 
     try:
+        checkpoint(DB_FILE, _raise=_raise)
         backup_places = [i for i in [BACKUP_PATH] + backup_places if i != ""]
         for place in backup_places:
             try:
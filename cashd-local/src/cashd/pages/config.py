@@ -1,5 +1,6 @@
 from .base import BaseSection
 from sys import platform
+import asyncio
 
 from toga.app import App
 from toga.style import Pack
@@ -12,20 +13,39 @@ from toga.widgets.divider import Divider
 from toga.widgets.selection import Selection
 from toga.widgets.textinput import TextInput
 from toga.widgets.numberinput import NumberInput
+from toga.widgets.progressbar import ProgressBar
 from toga.widgets.scrollcontainer import ScrollContainer
 from toga.dialogs import (
     SelectFolderDialog,
     OpenFileDialog,
+    SaveFileDialog,
     InfoDialog,
     ErrorDialog,
 )
 
-from cashd_core import prefs, const
+from cashd_core import prefs, const, csvio, data
 from cashd import style, backup, widgets
 from cashd.widgets.elems import ListOfItems
 
 
 class ConfigSection(BaseSection):
+    EXPORTS = {
+        "Clientes": lambda: data.tbl_clientes,
+        "Transações": lambda: data.tbl_transacoes,
+        "Maiores saldos": lambda: data.HighestAmountsSource(
+            pagination_mode="keyset", count_rows=False
+        ),
+        "Clientes inativos": lambda: data.InactiveCustomersSource(
+            pagination_mode="keyset", count_rows=False
+        ),
+        "Balanço mensal": lambda: data.TransactionBalanceSource(
+            pagination_mode="keyset", count_rows=False
+        ),
+    }
+    """Display names of everything that can be exported, and functions returning the
+    corresponding table or data source.
+    """
+
     def __init__(self, app: App):
         super().__init__(app)
 
@@ -212,6 +232,50 @@ class ConfigSection(BaseSection):
             ],
         )
 
+        self.import_actions = widgets.form.FormHandler(n_cols=2)
+        self.import_actions.add_fields(
+            fields=[
+                widgets.form.FormField(
+                    label="Arquivos CSV",
+                    input_widget=Button(
+                        "Importar clientes", on_press=self.import_customers
+                    ),
+                    description="Nome, Sobrenome, Telefone,\nCidade, Estado...",
+                    id="import_customers_button",
+                ),
+                widgets.form.FormField(
+                    label="",
+                    input_widget=Button(
+                        "Importar transações", on_press=self.import_transactions
+                    ),
+                    description="IdCliente, DataTransac e\nValor em reais.",
+                    id="import_transactions_button",
+                ),
+            ],
+        )
+        self.export_selection = Selection(
+            items=list(self.EXPORTS.keys()), style=style.user_input(Selection)
+        )
+        """Table or data source that will be exported by `export_button`."""
+        self.export_actions = widgets.form.FormHandler(n_cols=2)
+        self.export_actions.add_fields(
+            fields=[
+                widgets.form.FormField(
+                    label="Exportar",
+                    input_widget=self.export_selection,
+                    description="Arquivo CSV com separador ';'.",
+                    id="export_selection",
+                ),
+                widgets.form.FormField(
+                    label="",
+                    input_widget=Button("Exportar", on_press=self.export_csv),
+                    id="export_button",
+                ),
+            ],
+        )
+        self.import_progress = ProgressBar(max=1, value=0, style=style.SEPARATOR)
+        """Progress of the CSV file being imported."""
+
         self.company_info_section = Box(
             style=Pack(direction="column", width=const.CONTENT_WIDTH / 2),
             children=[
@@ -242,12 +306,24 @@ class ConfigSection(BaseSection):
             ],
         )
 
+        self.import_section = Box(
+            style=Pack(direction="column", width=const.CONTENT_WIDTH / 2),
+            children=[
+                Label("Importar e exportar dados", style=style.HEADING),
+                Divider(style=style.SEPARATOR),
+                self.import_actions.widget,
+                self.import_progress,
+                self.export_actions.widget,
+            ],
+        )
+
         self.sections = Box(
             style=Pack(direction="column"),
             children=[
                 self.company_info_section,
                 self.default_values_section,
                 self.backup_section,
+                self.import_section,
             ],
         )
         self.main_container = Box(style=style.PAGE_BODY, children=[self.sections])
@@ -256,7 +332,7 @@ class ConfigSection(BaseSection):
         )
 
     def upd_backup_on_transaction(self, widget: Switch):
-        prefs.BackupOnTransaction.set(widget.value)
+        data.set_backup_schedule(enabled=widget.value)
         input = self.transac_to_backup_amount
         blank = self.transac_to_backup_amount_blank
         if widget.value:
@@ -265,9 +341,7 @@ class ConfigSection(BaseSection):
             self.backup_on_transac_container.replace(input, blank)
 
     def upd_transactions_per_backup(self, widget: NumberInput):
-        value = int(widget.value)
-        prefs.TransactionsPerBackup.set(value)
-        prefs.TransactionsToBackup.set(value)
+        data.set_backup_schedule(transactions_per_backup=int(widget.value))
 
     def set_default_city(self, widget: TextInput):
         """Runs upon updating the 'Valores padrão: Cidade' field, writes the
@@ -351,3 +425,77 @@ class ConfigSection(BaseSection):
         if not file_path:
             return
         backup.load(file=file_path)
+
+    async def import_customers(self, widget: Button):
+        await self.import_csv(widget, data.tbl_clientes)
+
+    async def import_transactions(self, widget: Button):
+        await self.import_csv(widget, data.tbl_transacoes)
+
+    async def import_csv(self, widget: Button, table):
+        """Prompts the user to select a CSV file, and imports it's rows to `table`
+        while displaying the progress.
+        """
+        dialog = OpenFileDialog("Escolha um arquivo CSV", file_types=["csv", "txt"])
+        file_path = await dialog._show(window=widget.window)
+        if not file_path:
+            return
+        progress = {"value": 0.0}
+        self.import_progress.value = 0
+        task = asyncio.create_task(
+            asyncio.to_thread(
+                csvio.import_csv,
+                file_path,
+                table,
+                on_progress=lambda r: progress.update(value=r.progress),
+            )
+        )
+        while not task.done():
+            self.import_progress.value = progress["value"]
+            await asyncio.sleep(0.2)
+        self.import_progress.value = 1
+        try:
+            report = task.result()
+        except Exception as err:
+            dialog = ErrorDialog(
+                "Erro na importação de dados",
+                f"Erro inesperado ao importar arquivo:\n{err}.",
+            )
+            dialog._show(window=widget.window)
+            return
+        message = f"{report.n_written} linhas importadas."
+        if report.n_errors > 0:
+            bad_lines = "\n".join(
+                f"Linha {line}: {reason}" for line, reason in report.errors[:10]
+            )
+            message = f"{message}\n{report.n_errors} linhas ignoradas:\n\n{bad_lines}"
+        dialog = InfoDialog("Importação concluída", message)
+        dialog._show(window=widget.window)
+
+    async def export_csv(self, widget: Button):
+        """Prompts the user for where to save the selected table or data source, and
+        writes it as a CSV file.
+        """
+        name = self.export_selection.value
+        dialog = SaveFileDialog(
+            "Salvar arquivo CSV",
+            suggested_filename=f"{name}.csv",
+            file_types=["csv"],
+        )
+        file_path = await dialog._show(window=widget.window)
+        if not file_path:
+            return
+        try:
+            source = self.EXPORTS[name]()
+            n_rows = await asyncio.to_thread(csvio.export_csv, source, file_path)
+        except Exception as err:
+            dialog = ErrorDialog(
+                "Erro na exportação de dados",
+                f"Erro inesperado ao exportar arquivo:\n{err}.",
+            )
+            dialog._show(window=widget.window)
+        else:
+            dialog = InfoDialog(
+                "Exportação concluída", f"{n_rows} linhas salvas em:\n{file_path}"
+            )
+            dialog._show(window=widget.window)
@@ -16,6 +16,7 @@ from toga.widgets.button import Button
 from toga.widgets.divider import Divider
 from toga.widgets.selection import Selection
 from toga.widgets.textinput import TextInput
+from toga.widgets.multilinetextinput import MultilineTextInput
 from toga.widgets.scrollcontainer import ScrollContainer
 from toga.widgets.optioncontainer import OptionContainer
 
@@ -113,7 +114,107 @@ class SubsectionAddTransac:
             self.confirm_button.enabled = False
 
 
+class SubsectionAddManyTransac:
+    def __init__(
+        self,
+        selected_customer: data.tbl_clientes,
+        on_insert: Callable[[], None] | None = None,
+    ):
+        self.SELECTED_CUSTOMER = selected_customer
+        self.on_insert = on_insert
+
+        self.help_label = Label(
+            "Uma transação por linha, no formato DD/MM/AAAA;Valor.\n"
+            "Linhas apenas com o valor são registradas com a data de hoje.",
+            style=style.input_annotation(),
+        )
+        """Label explaining the format of the lines inserted by the user."""
+
+        self.lines_input = MultilineTextInput(
+            style=Pack(flex=1, width=const.FORM_WIDTH - 20, font_size=const.FONT_SIZE),
+            placeholder="31/12/2024;10,50\n-5,00",
+            on_change=self.update_status_label,
+        )
+        """Text input that receives many transactions of the selected customer, one
+        per line.
+        """
+        # This input shall be enabled after checking if there are any
+        # customers registered
+        self.lines_input.enabled = False
+
+        self.status_label = Label("", style=style.input_annotation())
+        """Label that displays the number of transactions typed by the user, or the
+        reason they are invalid.
+        """
+
+        self.confirm_button = Button(
+            "Inserir",
+            style=style.CONTEXT_BUTTON,
+            enabled=False,
+            on_press=self.insert_transactions,
+        )
+        """Button to write all transactions inserted by the user to the database, in a
+        single operation.
+        """
+
+        self.full_contents = Box(
+            style=style.FILLING_VERTICAL_BOX,
+            children=[
+                self.help_label,
+                self.lines_input,
+                self.status_label,
+                self.confirm_button,
+            ],
+        )
+        if sys.platform == "win32":
+            self.full_contents.style.background_color = "#F9F9F9"
+
+    def insert_transactions(self, widget: Button):
+        """Register all transactions typed by the user to the database at once."""
+        batch = fmt.StringToTransactions(user_input=self.lines_input.value)
+        if not batch.is_valid():
+            return
+        timestamp = dt.datetime.now()
+        n_written = data.tbl_transacoes.write_many(
+            [
+                {
+                    "IdCliente": self.SELECTED_CUSTOMER.Id,
+                    "CarimboTempo": timestamp,
+                    "DataTransac": transac_date,
+                    "Valor": value,
+                }
+                for transac_date, value in batch.value
+            ]
+        )
+        customer_name = self.SELECTED_CUSTOMER.NomeCompleto
+        print(f"Added {n_written} transactions to {customer_name}")
+        self.confirm_button.enabled = False
+        self.lines_input.value = ""
+        if self.on_insert is not None:
+            self.on_insert()
+
+    def update_status_label(self, widget):
+        """Updates the `SubsectionAddManyTransac.status_label` to reflect the lines
+        typed by the user.
+        """
+        batch = fmt.StringToTransactions(user_input=widget.value)
+        if len(batch.lines) == 0:
+            self.status_label.text = ""
+            self.confirm_button.enabled = False
+        elif batch.is_valid():
+            self.status_label.text = f"{len(batch.lines)} transações"
+            # Enables button if a valid customer is selected
+            if self.SELECTED_CUSTOMER.required_fields_are_filled():
+                self.confirm_button.enabled = True
+        else:
+            self.status_label.text = batch.invalid_reason
+            self.confirm_button.enabled = False
+
+
 class SubsectionTransacHistory:
+    WINDOW_SIZE = 50
+    """Number of transactions loaded each time the user asks for more."""
+
     def __init__(
         self,
         selected_customer: data.tbl_clientes,
@@ -121,16 +222,19 @@ class SubsectionTransacHistory:
     ):
         self.SELECTED_CUSTOMER = selected_customer
         self.on_delete = on_delete
+        self.has_more = False
 
         self.table = Table(
             style=Pack(flex=1, font_size=const.FONT_SIZE, width=const.FORM_WIDTH),
-            data=self.SELECTED_CUSTOMER.Transacs,
-            columns=["Data", "Valor (R$)"],
-            accessors=("data", "valor"),
+            data=self.fetch_window(),
+            columns=["Data", "Valor (R$)", "Saldo (R$)"],
+            accessors=("data", "valor", "saldo"),
             on_select=self.select_transac,
         )
-        """Table containing all transactions of the currently selected customer."""
-        style.set_col_alignments(self.table, ["l", "r"])
+        """Table containing all transactions of the currently selected customer, with
+        the balance after each one.
+        """
+        style.set_col_alignments(self.table, ["l", "r", "r"])
 
         self.remove_button = Button(
             "Remover selecionado", enabled=False, on_press=self.remove_transac
@@ -147,8 +251,18 @@ class SubsectionTransacHistory:
         and current owed amount. This feature is aimed for thermal printers.
         """
 
+        self.load_more_button = Button(
+            "Carregar mais",
+            style=Pack(margin_left=10),
+            enabled=self.has_more,
+            on_press=self.load_more,
+        )
+        """Button to append the next older transactions to `table`, enabled while
+        there are more transactions to show.
+        """
+
         self.options_container: Box = widgets.elems.form_options(
-            buttons=[self.remove_button, self.export_button],
+            buttons=[self.remove_button, self.export_button, self.load_more_button],
         )
         self.options_container.style.margin = (10, 0, 5, 0)
 
@@ -160,6 +274,32 @@ class SubsectionTransacHistory:
             self.options_container.style.background_color = "#F9F9F9"
             self.full_contents.style.background_color = "#F9F9F9"
 
+    def fetch_window(self, before_id: int | None = None) -> list[dict]:
+        """Fetches the next `WINDOW_SIZE` transactions of the selected customer,
+        starting after `before_id`, and updates `has_more`.
+        """
+        rows = self.SELECTED_CUSTOMER.transactions(
+            limit=self.WINDOW_SIZE + 1, before_id=before_id
+        )
+        self.has_more = len(rows) > self.WINDOW_SIZE
+        return rows[: self.WINDOW_SIZE]
+
+    def reload(self):
+        """Shows only the most recent transactions of the selected customer."""
+        # clear table before filling to avoid glitches from winforms
+        self.table.data = []
+        self.table.data = self.fetch_window()
+        self.load_more_button.enabled = self.has_more
+
+    def load_more(self, widget: Button):
+        """Appends the next window of older transactions to the table."""
+        if len(self.table.data) == 0:
+            return
+        last_id = self.table.data[-1].id
+        for row in self.fetch_window(before_id=last_id):
+            self.table.data.append(row)
+        widget.enabled = self.has_more
+
     def select_transac(self, widget):
         self.remove_button.enabled = True
         if widget.selection is None:
@@ -208,9 +348,7 @@ class SubsectionTransacHistory:
                 transac.delete()
                 if self.on_delete is not None:
                     self.on_delete()
-                # clear table before filling to avoid glitches from winforms
-                self.table.data = []
-                self.table.data = self.SELECTED_CUSTOMER.Transacs
+                self.reload()
                 print(
                     f"Removed {transac_id=} from {self.SELECTED_CUSTOMER.NomeCompleto}"
                 )
@@ -294,7 +432,9 @@ class SectionCustomerInfo:
 
 class MainSection(BaseSection):
     SELECTED_CUSTOMER = data.tbl_clientes()
-    CUSTOMER_LIST = data.CustomerListSource()
+    CUSTOMER_LIST = data.CustomerListSource(
+        pagination_mode="keyset", prefetch_pages=True
+    )
 
     def __init__(self, app: App):
         super().__init__(app)
@@ -304,6 +444,11 @@ class MainSection(BaseSection):
             on_insert=self._upd_selected_info,
         )
 
+        self.subsection_add_many_transac = SubsectionAddManyTransac(
+            selected_customer=self.SELECTED_CUSTOMER,
+            on_insert=self._upd_selected_info,
+        )
+
         self.subsection_transac_history = SubsectionTransacHistory(
             selected_customer=self.SELECTED_CUSTOMER,
             on_delete=self._upd_selected_info,
@@ -365,6 +510,10 @@ class MainSection(BaseSection):
             ),
             content=[
                 ("Nova transação", self.subsection_add_transac.full_contents),
+                (
+                    "Várias transações",
+                    self.subsection_add_many_transac.full_contents,
+                ),
                 (
                     "Histórico",
                     self.subsection_transac_history.full_contents,
@@ -426,6 +575,7 @@ class MainSection(BaseSection):
     def select_customer(self, widget: Selection):
         if widget.selection is None:
             self.subsection_add_transac.amount_input.enabled = False
+            self.subsection_add_many_transac.lines_input.enabled = False
             self.subsection_transac_history.export_button.enabled = False
             self.customer_options_button.enabled = False
             return
@@ -433,6 +583,7 @@ class MainSection(BaseSection):
         self.SELECTED_CUSTOMER.read(row_id=widget.selection.id)
         self._upd_selected_info()
         self.subsection_add_transac.amount_input.enabled = True
+        self.subsection_add_many_transac.lines_input.enabled = True
         self.subsection_transac_history.export_button.enabled = True
         self.customer_options_button.enabled = True
 
@@ -443,7 +594,7 @@ class MainSection(BaseSection):
             f"Local: {self.SELECTED_CUSTOMER.Local}\n"
             f"Saldo devedor: R$ {self.SELECTED_CUSTOMER.Saldo}"
         )
-        self.subsection_transac_history.table.data = self.SELECTED_CUSTOMER.Transacs
+        self.subsection_transac_history.reload()
         self.subsection_customer_info.form.clear()
         self.subsection_customer_info.form.add_table_fields(self.SELECTED_CUSTOMER)
 
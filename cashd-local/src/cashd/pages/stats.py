@@ -9,6 +9,7 @@ from toga.style.pack import COLUMN, ROW
 from toga.widgets.box import Box
 from toga.widgets.scrollcontainer import ScrollContainer
 from toga.widgets.selection import Selection
+from toga.widgets.numberinput import NumberInput
 from toga.widgets.table import Table
 from toga.widgets.base import Widget
 
@@ -60,8 +61,22 @@ class StatisticsSection(BaseSection):
         - Should be disabled when not applicable.
         """
 
+        self.time_periods_input = NumberInput(
+            style=style.user_input(NumberInput),
+            value=8,
+            min=1,
+            step=1,
+            on_change=self.update_data,
+            enabled=False,
+        )
+        """Number of the latest months, weeks or days displayed, the whole history is
+        displayed when empty. Should be disabled when not applicable.
+        """
+
         self.transaction_history_table = PaginatedTable(
-            datasource=data.LastTransactionsSource(),
+            datasource=data.LastTransactionsSource(
+                pagination_mode="keyset", prefetch_pages=True
+            ),
             style=Pack(flex=1, font_size=const.FONT_SIZE, width=const.CONTENT_WIDTH),
             columns=["Data", "Cliente", "Valor"],
         )
@@ -73,7 +88,7 @@ class StatisticsSection(BaseSection):
         self.highest_amounts_table = PaginatedTable(
             style=Pack(flex=1, font_size=const.FONT_SIZE, width=const.CONTENT_WIDTH),
             columns=["Cliente", "Saldo atual"],
-            datasource=data.HighestAmountsSource(),
+            datasource=data.HighestAmountsSource(prefetch_pages=True),
         )
         """Table displaying customers and their respective owed amount, highest first."""
         style.set_col_alignments(self.highest_amounts_table.data_widget, ["l", "r"])
@@ -81,7 +96,7 @@ class StatisticsSection(BaseSection):
         self.inactive_customers_table = PaginatedTable(
             style=style.TABLE_OF_DATA,
             columns=["Cliente", "Última transação", "Saldo atual"],
-            datasource=data.InactiveCustomersSource(),
+            datasource=data.InactiveCustomersSource(prefetch_pages=True),
         )
         """Table displaying customers and their last transaction date, oldest first."""
         style.set_col_alignments(
@@ -91,7 +106,7 @@ class StatisticsSection(BaseSection):
         self.transac_balance_table = PaginatedTable(
             style=Pack(flex=1, font_size=const.FONT_SIZE),
             columns=["Data", "Compras", "Abatimentos", "Saldo"],
-            datasource=data.TransactionBalanceSource(),
+            datasource=data.TransactionBalanceSource(prefetch_pages=True),
         )
         """Table displaying income vs outcome result by date (may be grouped),
         most recent first.
@@ -103,7 +118,7 @@ class StatisticsSection(BaseSection):
         self.aggregated_amount_table = PaginatedTable(
             style=Pack(flex=1, font_size=const.FONT_SIZE),
             columns=["Data", "Compras", "Abatimentos", "Saldo acumulado"],
-            datasource=data.AggregatedAmountSource(),
+            datasource=data.AggregatedAmountSource(prefetch_pages=True),
         )
         """Table displaying the accumulated income vs outcome result by date
         (may be grouped), most recent first.
@@ -118,6 +133,7 @@ class StatisticsSection(BaseSection):
             children=[
                 self.visualization_selection,
                 self.time_grouping_selection,
+                self.time_periods_input,
             ],
         )
         self.header = Box(style=style.VERTICAL_BOX, children=[self.controls_first_row])
@@ -136,8 +152,10 @@ class StatisticsSection(BaseSection):
         selected_visualization = self.visualization_selection.value
         if selected_visualization in ["Balanço", "Saldo acumulado total"]:
             self.time_grouping_selection.enabled = True
+            self.time_periods_input.enabled = True
         else:
             self.time_grouping_selection.enabled = False
+            self.time_periods_input.enabled = False
         self.change_visualization(selection=selected_visualization)
         self.update_data(widget)
 
@@ -173,7 +191,12 @@ class StatisticsSection(BaseSection):
         tbl: PaginatedTable = tables.get(selected_view)
         date_freq = date_freqs.get(self.time_grouping_selection.value)
         tbl._datasource.update_date_format(date_freq)
-        print(f"Update displayed table: {selected_view=}, {date_freq=}")
+        n_periods = self.time_periods_input.value
+        if n_periods is None or n_periods < 1:
+            tbl._datasource.update_period()
+        else:
+            tbl._datasource.update_period(last_n=int(n_periods))
+        print(f"Update displayed table: {selected_view=}, {date_freq=}, {n_periods=}")
         tbl.refresh()
 
     def update_data_widgets(self):
@@ -228,7 +228,7 @@ class _DataInteractor:
     ):
         """Used by `_DataInteractor`'s children to define `self.data_widget`."""
         self.data_widget = Table(id=id, style=style, on_select=on_select, **kwargs)
-        self.data_widget.data = self._datasource.current_data
+        self.data_widget.data = self.displayed_data
 
     def _set_top_controls(self):
         """Used by `_DataInteractor`'s children to define the controls that should
@@ -275,7 +275,14 @@ class _DataInteractor:
         # fix winforms bug where the new data would not appear until the
         # widget is interacted with, by emptying it before assigning new data
         self.data_widget.data = []
-        self.data_widget.data = self._datasource.current_data
+        self.data_widget.data = self.displayed_data
+
+    @property
+    def displayed_data(self) -> list:
+        """Rows of the current page, with the amounts formatted as text."""
+        if len(getattr(self._datasource, "CURRENCY_COLNAMES", ())) == 0:
+            return self._datasource.current_data
+        return [tuple(row.values()) for row in self._datasource.formatted_data]
 
     def update_page_label(self):
         """Updates the pagination information near the pagination controls."""
@@ -10,12 +10,14 @@ if not sys.platform.startswith("linux"):
     from PIL import Image
 from multiprocessing import freeze_support
 from pathlib import Path
+from itertools import chain
 from fastapi import Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from nicegui import ui, app, background_tasks
-from cashd_core import prefs, backup
+from cashd_core import prefs, backup, csvio
+from cashd_core.data import run_in_db_thread
 from cashd import auth
 from cashd.const import (
     PROJECT_ROOT,
@@ -140,8 +142,9 @@ class AuthMiddleware(BaseHTTPMiddleware):
         """
         user, role = auth.User(), auth.Role()
         path = request.url.path
-        user.read(row_id=app.storage.user["userid"])
-        forbidden_routes = user.forbidden_pages() + list(ADMIN_ROUTES)
+        await run_in_db_thread(user.read, row_id=app.storage.user["userid"])
+        forbidden_pages = await run_in_db_thread(user.forbidden_pages)
+        forbidden_routes = forbidden_pages + list(ADMIN_ROUTES)
         if path not in forbidden_routes:
             return await call_next(path)
         elif "/" not in forbidden_routes:
@@ -170,6 +173,22 @@ def config_page():
     return config.page(ui=ui, app=app)
 
 
+@app.get("/export/{name}.csv")
+def export_csv(name: str):
+    """Streams a table or data source as a CSV file, written as it is downloaded."""
+    try:
+        source = config.export_source(name)
+    except KeyError:
+        return Response(status_code=404)
+    # byte order mark first, so Excel recognizes the encoding
+    content = chain(["\ufeff"], csvio.iter_csv(source))
+    return StreamingResponse(
+        content,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{name}.csv"'},
+    )
+
+
 @ui.page("/login")
 def login_page():
     if app.storage.user.get("authenticated"):
@@ -2,7 +2,6 @@ from pathlib import Path
 from typing import Any, List
 from argon2 import PasswordHasher
 from sqlalchemy import (
-    create_engine,
     Engine,
     Integer,
     String,
@@ -22,10 +21,9 @@ from sqlalchemy.orm import (
     Mapped,
 )
 
-from cashd_core.data import _DataSource
+from cashd_core.data import _DataSource, LazyEngine
 from cashd_core.const import DATA_DIR
-
-DB_ENGINE = create_engine(f"sqlite:///{Path(DATA_DIR, 'auth.db')}", echo=False)
+from cashd_core import migrations
 
 
 class RequiredText(types.TypeDecorator):
@@ -58,7 +56,7 @@ class AuthTable(DeclarativeBase):
             if colname != "Id"
         }
 
-    def read(self, row_id: int, engine: Engine = DB_ENGINE):
+    def read(self, row_id: int, engine: Engine | None = None):
         """Fetches one row of data from the database and loads into this instance.
 
         :param row_id: Primary key integer value to look for in the table.
@@ -68,7 +66,7 @@ class AuthTable(DeclarativeBase):
         """
         cls = type(self)
         stmt = select(cls).where(cls.Id == row_id)
-        with Session(bind=engine) as ses:
+        with Session(bind=get_engine(engine)) as ses:
             res = ses.execute(stmt).first()
             if res is None:
                 raise ValueError(f"{row_id=} not present in '{self.__tablename__}.Id'.")
@@ -77,13 +75,13 @@ class AuthTable(DeclarativeBase):
                 value = getattr(row, col.name, None)
                 setattr(self, col.name, value)
 
-    def write(self, engine: Engine = DB_ENGINE):
+    def write(self, engine: Engine | None = None):
         """Validates and adds a new row in the database with it's own data.
 
         :param engine: `sqlalchemy.Engine` reflecting the database that will be read.
         """
         cls = type(self)
-        with Session(bind=engine) as ses:
+        with Session(bind=get_engine(engine)) as ses:
             stmt = insert(cls).values(**self.data)
             ses.execute(stmt)
             ses.commit()
@@ -91,7 +89,7 @@ class AuthTable(DeclarativeBase):
     def exists(
         self,
         column_names: list[str] | None = None,
-        engine: Engine = DB_ENGINE,
+        engine: Engine | None = None,
     ) -> bool:
         """Checks if the data in this instance is already present in the database.
 
@@ -103,7 +101,7 @@ class AuthTable(DeclarativeBase):
           in the database, or `False` if any checked value is `None` or not set.
         """
         cls = type(self)
-        with Session(bind=engine) as ses:
+        with Session(bind=get_engine(engine)) as ses:
             stmt = select(cls)
             for colname, val in self.data.items():
                 if (column_names is not None) and (colname not in column_names):
@@ -122,7 +120,7 @@ class User(AuthTable):
     Username = Column("Username", RequiredText, nullable=False, unique=True)
     HashStr = Column("HashStr", RequiredText, nullable=False)
 
-    def read_user(self, username: str, engine: Engine = DB_ENGINE):
+    def read_user(self, username: str, engine: Engine | None = None):
         """Fetches one row of data from the database and loads into this instance.
 
         :param username: Username to be looked for in the database.
@@ -132,7 +130,7 @@ class User(AuthTable):
         :raises sqlalchemy.exc.StatementError: If Username does not exist or isn't set.
         """
         stmt = select(User).where(User.Username == username)
-        with Session(bind=engine) as ses:
+        with Session(bind=get_engine(engine)) as ses:
             res = ses.execute(stmt).first()
             if res is None:
                 raise ValueError(f"'{username}' not present in the database")
@@ -141,12 +139,12 @@ class User(AuthTable):
                 value = getattr(row, col.name, None)
                 setattr(self, col.name, value)
 
-    def role_name(self, engine: Engine = DB_ENGINE):
+    def role_name(self, engine: Engine | None = None):
         role = Role()
         role.read(row_id=self.RoleId, engine=engine)
         return role.RoleName
 
-    def update_role(self, role_id: int, engine: Engine = DB_ENGINE):
+    def update_role(self, role_id: int, engine: Engine | None = None):
         """Updates this user's role.
 
         :param role_id: ID number of this user's new role.
@@ -160,11 +158,11 @@ class User(AuthTable):
         if type(self.Id) is not int:
             raise AttributeError("This object doesn't reflect a user in the database.")
         stmt = update(User).where(User.Id == self.Id).values(RoleId=role_id)
-        with Session(bind=engine) as ses:
+        with Session(bind=get_engine(engine)) as ses:
             ses.execute(stmt)
             ses.commit()
 
-    def update_password(self, password: str, engine: Engine = DB_ENGINE):
+    def update_password(self, password: str, engine: Engine | None = None):
         """Updates an existing user's password.
 
         :param password: The new password.
@@ -177,11 +175,11 @@ class User(AuthTable):
         ph = PasswordHasher()
         hashed = ph.hash(password)
         stmt = update(User).where(User.Id == self.Id).values(HashStr=hashed)
-        with Session(bind=engine) as ses:
+        with Session(bind=get_engine(engine)) as ses:
             ses.execute(stmt)
             ses.commit()
 
-    def forbidden_pages(self, engine: Engine = DB_ENGINE) -> list[str]:
+    def forbidden_pages(self, engine: Engine | None = None) -> list[str]:
         role_id = getattr(self, "RoleId", None)
         if role_id is None:
             return []
@@ -208,8 +206,10 @@ class Role(AuthTable):
         return f"<AuthTable:Role {RoleName=} {ForbiddenPages=}>"
 
 
-AuthTable.metadata.create_all(DB_ENGINE)
-
+MIGRATIONS: list[migrations.Migration] = []
+"""Schema changes applied to existing authentication databases, see
+`cashd_core.migrations`.
+"""
 
 DEFAULT_ROLES = (
     Role(RoleName="Supervisor", ForbiddenPages="/config"),
@@ -217,12 +217,41 @@ DEFAULT_ROLES = (
     Role(RoleName="Assistente", ForbiddenPages="/customer;/config"),
     Role(RoleName="Desligado", ForbiddenPages="/;/customer;/stats;/config"),
 )
-for role in DEFAULT_ROLES:
-    if not role.exists():
-        role.write()
 
 
-def valid_role_id(role_id: int, engine: Engine = DB_ENGINE) -> bool:
+def _setup_database(engine: Engine):
+    """Creates or migrates the authentication database, and adds the missing
+    `DEFAULT_ROLES`.
+    """
+    migrations.init_database(engine, AuthTable.metadata, MIGRATIONS)
+    for role in DEFAULT_ROLES:
+        if not role.exists(engine=engine):
+            role.write(engine=engine)
+
+
+_DATABASE = LazyEngine(Path(DATA_DIR, "auth.db"), setup=_setup_database)
+
+
+def get_engine(engine: Engine | None = None) -> Engine:
+    """Returns `engine` itself if provided, or the engine pointing to the
+    authentication database otherwise. The database is set up on the first call.
+    """
+    return _DATABASE.get(engine)
+
+
+def set_engine(target: Engine | str | Path | None = None):
+    """Points `get_engine` to another database, see `cashd_core.data.LazyEngine.set`."""
+    _DATABASE.set(target)
+
+
+def __getattr__(name: str):
+    # `DB_ENGINE` is created on first use instead of on import
+    if name == "DB_ENGINE":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def valid_role_id(role_id: int, engine: Engine | None = None) -> bool:
     """Check if this instance's `User.RoleId` exists in the database.
 
     :param engine: `sqlalchemy.Engine` reflecting the database that will be read.
@@ -238,7 +267,7 @@ def valid_role_id(role_id: int, engine: Engine = DB_ENGINE) -> bool:
         return True
 
 
-def verify_login(username: str, password: str, engine: Engine = DB_ENGINE) -> User:
+def verify_login(username: str, password: str, engine: Engine | None = None) -> User:
     """Verify if the username+password combination is valid.
 
     :param username: Public username provided by the user.
@@ -258,7 +287,7 @@ def verify_login(username: str, password: str, engine: Engine = DB_ENGINE) -> Us
 
 
 def store_login(
-    role_id: int, username: str, password: str, engine: Engine = DB_ENGINE
+    role_id: int, username: str, password: str, engine: Engine | None = None
 ) -> User:
     """Writes a new user to the database.
 
@@ -282,7 +311,9 @@ def store_login(
 
 
 class UserRoleSource(_DataSource):
-    def __init__(self, engine: Engine = DB_ENGINE):
+    DATABASE = _DATABASE
+
+    def __init__(self, engine: Engine | None = None):
         stmt = (
             select(
                 User.Id.label("Id"),
@@ -302,7 +333,9 @@ class UserRoleSource(_DataSource):
 
 
 class RoleSource(_DataSource):
-    def __init__(self, engine: Engine = DB_ENGINE):
+    DATABASE = _DATABASE
+
+    def __init__(self, engine: Engine | None = None):
         stmt = select(
             Role.Id.label("Id"),
             Role.RoleName.label("RoleName"),
@@ -10,7 +10,15 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 PORT = 4344
 HOST_IPS = ["127.0.0.1", "localhost"]
 UNRESTRICTED_ROUTES = {"/assets", "/login"}
-ADMIN_ROUTES = {"/config", "/user"}
+EXPORT_NAMES = {
+    "clientes": "Clientes",
+    "transacoes": "Transações",
+    "maiores-saldos": "Maiores saldos",
+    "clientes-inativos": "Clientes inativos",
+    "balanco-mensal": "Balanço mensal",
+}
+"""Names of the CSV files served by '/export/{name}.csv', and their display names."""
+ADMIN_ROUTES = {"/config", "/user"} | {f"/export/{n}.csv" for n in EXPORT_NAMES}
 EXECUTABLE_DIR = Path(sys.executable).parent
 PYTHON_PATH = (
     EXECUTABLE_DIR / "pythonw.exe"
@@ -7,11 +7,14 @@ from typing import Callable
 from importlib.metadata import version
 from cashd_core import backup
 from cashd_core import prefs
+from cashd_core import data
+from cashd_core import csvio
 from cashd_core.prefs import settings
 from cashd_core.const import ESTADOS, DDD
 from cashd.const import EXECUTABLE_PATH, DEAMON_PATH, PYTHON_PATH, PROJECT_ROOT
+from cashd.const import EXPORT_NAMES
 from cashd.widgets.parts import DefaultHeader, notify_error, notify_success
-from cashd.widgets.dialogs import SelectDirDialog, SelectFileDialog
+from cashd.widgets.dialogs import MessageDialog, SelectDirDialog, SelectFileDialog
 
 
 def h1(ui, title: str):
@@ -25,6 +28,29 @@ def h2(ui, title: str):
         ui.markdown(f"## {title}").classes("font-bold mt-4 mb-0").classes("select-none")
 
 
+def export_source(name: str) -> data._DataSource | type[data.dec_base]:
+    """Table or data source exported as '/export/{name}.csv'.
+
+    :raises KeyError: If `name` is not one of `cashd.const.EXPORT_NAMES`.
+    """
+    match name:
+        case "clientes":
+            return data.tbl_clientes
+        case "transacoes":
+            return data.tbl_transacoes
+        case "maiores-saldos":
+            return data.HighestAmountsSource(pagination_mode="keyset", count_rows=False)
+        case "clientes-inativos":
+            return data.InactiveCustomersSource(
+                pagination_mode="keyset", count_rows=False
+            )
+        case "balanco-mensal":
+            return data.TransactionBalanceSource(
+                pagination_mode="keyset", count_rows=False
+            )
+    raise KeyError(f"Nenhuma exportação com nome '{name}'")
+
+
 def described_button(
     ui,
     label: str,
@@ -177,7 +203,9 @@ class page:
             self.auto_backup = ui.switch(
                 text="Backup ao registrar transações",
                 value=prefs.BackupOnTransaction.get(),
-                on_change=lambda: prefs.BackupOnTransaction.set(self.auto_backup.value),
+                on_change=lambda: data.set_backup_schedule(
+                    enabled=self.auto_backup.value
+                ),
             ).classes("mt-5")
             self.auto_backup_amount = ui.number(
                 label="Qtd. de transações",
@@ -209,6 +237,48 @@ class page:
                     icon="save",
                     on_click=self.run_backup,
                 )
+                described_button(
+                    ui,
+                    label="Verificar saldos",
+                    description="Compara os saldos dos clientes com as transações.",
+                    icon="fact_check",
+                    on_click=self.check_customer_summary,
+                )
+
+            h1(ui, "Importar dados")
+            ui.label(
+                "Arquivos CSV exportados de planilhas, com os nomes das colunas na "
+                "primeira linha. Linhas inválidas são ignoradas e listadas ao final."
+            ).classes("text-xs text-gray-500 w-100 md:w-full")
+            with ui.grid().classes("md:grid-cols-2"):
+                described_button(
+                    ui,
+                    label="Importar clientes",
+                    description="Nome, Sobrenome, Telefone, Cidade, Estado...",
+                    icon="group_add",
+                    on_click=lambda: self.import_csv(data.tbl_clientes),
+                )
+                described_button(
+                    ui,
+                    label="Importar transações",
+                    description="IdCliente, DataTransac e Valor em reais.",
+                    icon="playlist_add",
+                    on_click=lambda: self.import_csv(data.tbl_transacoes),
+                )
+            self.import_progress = ui.linear_progress(value=0, show_value=False)
+            self.import_progress.classes("w-100 md:w-full").set_visibility(False)
+
+            h1(ui, "Exportar dados")
+            ui.label(
+                "Arquivos CSV com separador ';', que podem ser abertos em planilhas."
+            ).classes("text-xs text-gray-500 w-100 md:w-full")
+            with ui.row():
+                for name, label in EXPORT_NAMES.items():
+                    ui.button(
+                        label,
+                        icon="file_download",
+                        on_click=lambda n=name: ui.download(f"/export/{n}.csv"),
+                    ).props("flat")
 
             h1(ui, "Sobre")
             h2(ui, "Software")
@@ -265,7 +335,7 @@ class page:
         val = int(self.auto_backup_amount.value)
         val = max(5, min(val, 60))  # set value within range 5~60
         try:
-            prefs.TransactionsPerBackup.set(val)
+            data.set_backup_schedule(transactions_per_backup=val)
         except Exception:
             notify_error(
                 self.ui,
@@ -299,6 +369,63 @@ class page:
         else:
             notify_success(self.ui, "Backup realizado com sucesso")
 
+    def check_customer_summary(self):
+        try:
+            mismatched = data.check_customer_summary()
+            if mismatched:
+                data.rebuild_customer_summary()
+        except Exception as err:
+            notify_error(self.ui, "Erro ao verificar saldos, verifique os logs")
+            raise err
+        else:
+            if mismatched:
+                notify_success(
+                    self.ui, f"Saldos de {len(mismatched)} clientes foram corrigidos"
+                )
+            else:
+                notify_success(self.ui, "Todos os saldos estão corretos")
+
+    async def import_csv(self, table):
+        filepath = await self.file_dialog.show()
+        if not filepath:
+            return
+        progress = {"value": 0.0}
+
+        def upd_progress():
+            self.import_progress.set_value(progress["value"])
+
+        self.import_progress.set_value(0)
+        self.import_progress.set_visibility(True)
+        timer = self.ui.timer(0.25, upd_progress)
+        try:
+            report = await asyncio.to_thread(
+                csvio.import_csv,
+                filepath,
+                table,
+                on_progress=lambda r: progress.update(value=r.progress),
+            )
+        except Exception as err:
+            notify_error(self.ui, "Erro ao importar arquivo, verifique os logs")
+            raise err
+        else:
+            message = f"{report.n_written} linhas importadas"
+            if report.n_errors > 0:
+                bad_lines = "\n".join(
+                    f"Linha {line}: {reason}" for line, reason in report.errors[:10]
+                )
+                message = f"{message}, {report.n_errors} ignoradas:\n\n{bad_lines}"
+            dialog = MessageDialog(
+                self.ui,
+                self.app,
+                title="Importação concluída",
+                message=message,
+                msg_type="success" if report.n_errors == 0 else "info",
+            )
+            await dialog.show()
+        finally:
+            timer.cancel()
+            self.import_progress.set_visibility(False)
+
     async def restore_backup(self):
         filepath = await self.file_dialog.show()
         if not filepath:
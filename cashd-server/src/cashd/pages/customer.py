@@ -52,7 +52,7 @@ class page:
                 )
         self.reset()
 
-    def add_customer(self):
+    async def add_customer(self):
         try:
             customer = tbl_clientes(
                 PrimeiroNome=self.firstname.value,
@@ -64,7 +64,7 @@ class page:
                 Cidade=self.city.value,
                 Estado=self.state.value,
             )
-            customer.write()
+            await customer.write_async()
         except Exception as err:
             notify_error(
                 self.ui,
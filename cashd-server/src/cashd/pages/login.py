@@ -1,6 +1,7 @@
 from argon2.exceptions import VerifyMismatchError
 from sqlalchemy.exc import StatementError
 from nicegui.events import KeyEventArguments
+from cashd_core.data import run_in_db_thread
 from cashd.widgets.parts import default_frontmatter, notify_error
 from cashd.const import now
 from cashd import auth
@@ -31,12 +32,12 @@ class page:
             self.password.on("keydown.enter", self.login)
             ui.button("Entrar", on_click=self.login).classes("self-end")
 
-    def login(self):
+    async def login(self):
         usr, pwd = self.user.value, self.password.value
         try:
-            user = auth.verify_login(username=usr, password=pwd)
+            user = await run_in_db_thread(auth.verify_login, username=usr, password=pwd)
             role = auth.Role()
-            role.read(row_id=user.RoleId)
+            await run_in_db_thread(role.read, row_id=user.RoleId)
             if role.RoleName == "Desligado":
                 notify_error(self.ui, "Este usuário não pode acessar o Cashd")
                 return
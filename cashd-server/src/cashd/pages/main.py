@@ -1,18 +1,33 @@
 from datetime import date, datetime
 from typing import Any
 
-from cashd_core.fmt import StringToCurrency
+from cashd_core.fmt import StringToCurrency, format_cents
 from cashd_core.const import ESTADOS
-from cashd_core.data import CustomerListSource, tbl_clientes, tbl_transacoes
+from cashd_core.data import (
+    CustomerListSource,
+    LedgerChange,
+    tbl_clientes,
+    tbl_transacoes,
+    run_in_db_thread,
+)
 from cashd_core.pdf.model import invoice
-from cashd.widgets.parts import DefaultHeader, notify_error, notify_success
+from cashd.widgets.parts import (
+    DefaultHeader,
+    follow_ledger_changes,
+    notify_error,
+    notify_success,
+)
 from cashd.widgets.custom import DetailedList
-from cashd.widgets.dialogs import DeleteTransactionDialog, MessageDialog
+from cashd.widgets.dialogs import (
+    BatchTransactionDialog,
+    DeleteTransactionDialog,
+    MessageDialog,
+)
 from cashd.const import now, is_host, safe_download
 
 
 class subpage_transac:
-    def __init__(self, ui, on_add=None):
+    def __init__(self, ui, on_add=None, on_add_many=None):
         with ui.column(align_items="start"):
             self.date_input = ui.date_input(
                 "Data", value=date.today().strftime("%d/%m/%Y")
@@ -24,7 +39,12 @@ class subpage_transac:
             self.value_input.bind_label_from(
                 self.value_input, "value", self.upd_value_input_label
             )
-            self.buton = ui.button("Inserir", on_click=on_add)
+            with ui.row().classes("w-full no-wrap"):
+                self.buton = ui.button("Inserir", on_click=on_add)
+                self.batch_button = ui.button(
+                    "Várias", icon="playlist_add", on_click=on_add_many
+                )
+                self.batch_button.props("flat")
 
     @property
     def date(self) -> date:
@@ -44,23 +64,32 @@ class subpage_transac:
 
 
 class subpage_history:
+    WINDOW_SIZE = 50
+    """Number of transactions loaded each time the user scrolls to the end."""
+
     def __init__(self, ui, app, customer: tbl_clientes, on_delete=None):
         self.ui, self.app, self.customer = ui, app, customer
+        self.has_more = False
         self.delete_transaction_dialog = DeleteTransactionDialog(ui, app)
         cols = [
             {"name": "data", "label": "Data", "field": "data"},
             {"name": "valor", "label": "Valor (R$)", "field": "valor"},
+            {"name": "saldo", "label": "Saldo (R$)", "field": "saldo"},
         ]
         if on_delete is not None:
             cols = [{"name": "action", "label": ""}] + cols
 
         with ui.column().classes("w-60 md:w-90"):
-            self.table = ui.table(
-                row_key="id",
-                columns=cols,
-                rows=list(customer.Transacs),
+            # rows are fetched by `change_customer`, without blocking the event loop
+            self.table = ui.table(row_key="id", columns=cols, rows=[])
+            self.table.props(
+                "dense virtual-scroll no-data-label='Nenhuma transação registrada'"
+            )
+            self.table.on(
+                "virtual-scroll",
+                js_handler="(e) => emit(e.to)",
+                handler=lambda e: self.load_more(last_visible=e.args),
             )
-            self.table.props("dense no-data-label='Nenhuma transação registrada'")
             self.table.classes("self-center w-70 md:w-90")
             self.table.style("max-height: calc(100svh - 300px);")
             with self.table.add_slot("top-right"):
@@ -81,9 +110,76 @@ class subpage_history:
                             handler=lambda e: on_delete(e.args),
                         )
 
-    def change_customer(self, customer: tbl_clientes):
+    def fetch_window(self, before_id: int | None = None) -> list[dict]:
+        """Fetches the next `WINDOW_SIZE` transactions of the customer, starting
+        after `before_id`, and updates `has_more`.
+        """
+        rows = self.customer.transactions(
+            limit=self.WINDOW_SIZE + 1, before_id=before_id
+        )
+        self.has_more = len(rows) > self.WINDOW_SIZE
+        return rows[: self.WINDOW_SIZE]
+
+    async def fetch_window_async(self, before_id: int | None = None) -> list[dict]:
+        """Same as `fetch_window`, without blocking the event loop."""
+        return await run_in_db_thread(self.fetch_window, before_id)
+
+    async def load_more(self, last_visible: int | None = None):
+        """Appends the next window of transactions to the table, when the user
+        scrolls near it's end.
+        """
+        rows = self.table.rows
+        if not self.has_more or len(rows) == 0:
+            return
+        if (last_visible is not None) and (last_visible < len(rows) - 10):
+            return
+        self.table.add_rows(await self.fetch_window_async(before_id=rows[-1]["id"]))
+
+    async def apply_change(self, change: LedgerChange):
+        """Updates the rows displayed after a change in the current customer's ledger,
+        made by any client, fetching from the database only when a batch of
+        transactions was added or the deleted one is not displayed.
+        """
+        if change.customer_id != self.customer.Id:
+            return
+        rows = self.table.rows
+        match change.kind:
+            case "transaction_added" if change.transaction_id is None:
+                self.table.rows = await self.fetch_window_async()
+            case "transaction_added":
+                if any(r["id"] == change.transaction_id for r in rows):
+                    return
+                valor, saldo = format_cents([change.delta, change.balance])
+                row = {
+                    "id": change.transaction_id,
+                    "data": change.transaction_date,
+                    "valor": valor,
+                    "saldo": saldo,
+                    "saldo_cents": change.balance,
+                }
+                self.table.rows = [row] + rows
+            case "transaction_deleted":
+                if not any(r["id"] == change.transaction_id for r in rows):
+                    # already removed, or older than the rows displayed
+                    self.table.rows = await self.fetch_window_async()
+                    return
+                # balances after the deleted transaction lose it's amount
+                new_rows = []
+                for r in rows:
+                    if r["id"] == change.transaction_id:
+                        continue
+                    if r["id"] > change.transaction_id:
+                        cents = r["saldo_cents"] + change.delta
+                        r = r | {
+                            "saldo": format_cents([cents])[0],
+                            "saldo_cents": cents,
+                        }
+                    new_rows.append(r)
+                self.table.rows = new_rows
+
+    async def change_customer(self, customer: tbl_clientes):
         self.customer = customer
-        self.table.rows = list(customer.Transacs)
+        self.table.rows = await self.fetch_window_async()
         if customer.Id is None:
             self.export_button.disable()
         else:
@@ -194,8 +290,6 @@ class CustomerInfo:
 
 
 class page:
-    CUSTOMERS_SOURCE = CustomerListSource()
-
     @property
     def selected_customer(self) -> tbl_clientes:
         customer_id = self.app.storage.client.get("selected_customer", None)
@@ -208,8 +302,18 @@ class page:
     def selected_customer(self, value: tbl_clientes):
         self.app.storage.client["selected_customer"] = value.Id
 
+    async def read_selected_customer(self) -> tbl_clientes:
+        """Same as `selected_customer`, without blocking the event loop."""
+        customer_id = self.app.storage.client.get("selected_customer", None)
+        customer = tbl_clientes()
+        if customer_id is not None:
+            await customer.read_async(row_id=customer_id)
+        return customer
+
     def __init__(self, ui, app):
         self.ui, self.app = ui, app
+        # created by `load`, that runs once the page is connected
+        self.CUSTOMERS_SOURCE: CustomerListSource | None = None
         DefaultHeader(ui, app, selected_entry="Transações")
         print(f"{now()} Drawing '/' page for {app.storage.browser['id']}")
         with ui.column().classes("w-full gap-0"):
@@ -217,9 +321,22 @@ class page:
             with ui.grid().classes("w-full h-full md:grid-cols-2"):
                 self.l_section = self.left_section()
                 self.r_section = self.right_section()
-        # Ensure the customer_list resets to initial state whenever this page loads
-        self.CUSTOMERS_SOURCE.search_text = ""
-        self.customer_list.items_list.refresh(no_callback=True)
+        follow_ledger_changes(ui, self.apply_change)
+        ui.timer(0, self.load, once=True)
+
+    async def load(self):
+        """Fetches the customers and the selected customer's data, drawn empty by
+        `__init__`, without blocking the event loop.
+        """
+        # each client pages and searches through it's own source, the results of the
+        # queries are shared between them, see `cashd_core.data.result_cache`
+        self.CUSTOMERS_SOURCE = await run_in_db_thread(
+            CustomerListSource, pagination_mode="keyset", prefetch_pages=True
+        )
+        await self.customer_list.change_source(self.CUSTOMERS_SOURCE, no_callback=True)
+        customer = await self.read_selected_customer()
+        self.info.load(customer)
+        await self.history.change_customer(customer)
 
     def top_section(self):
         ui = self.ui
@@ -279,19 +396,24 @@ class page:
                 )
             with ui.tab_panels(self.tabs, value=transac):
                 with ui.tab_panel(transac):
-                    self.transac = subpage_transac(ui, on_add=self.add_transaction)
+                    self.transac = subpage_transac(
+                        ui,
+                        on_add=self.add_transaction,
+                        on_add_many=self.add_many_transactions,
+                    )
+                    self.batch_dialog = BatchTransactionDialog(ui, self.app)
                     self.transac.value_input.on("keydown.enter", self.add_transaction)
                 with ui.tab_panel(history):
                     self.history = subpage_history(
                         ui,
                         self.app,
-                        customer=self.selected_customer,
+                        customer=tbl_clientes(),
                         on_delete=self.del_transaction,
                     )
                 with ui.tab_panel(info):
                     self.info = subpage_info(
                         ui,
-                        customer=self.selected_customer,
+                        customer=tbl_clientes(),
                         on_update=self.update_selected_customer,
                     )
         return right_section
@@ -310,7 +432,7 @@ class page:
                 self.r_section.classes("!hidden md:!flex")
                 self.l_section.classes(remove="!hidden md:!flex")
 
-    def load_selected_customer(
+    async def load_selected_customer(
         self, data: dict[str, Any] | None, update_list: bool = False
     ):
         customer = tbl_clientes()
@@ -319,29 +441,48 @@ class page:
         if (customer_list is not None) and (data is not None):
             customer_id: int | None = data.get("Id", None)
             if customer_id is not None:
-                customer.read(row_id=customer_id)
+                await customer.read_async(row_id=customer_id)
             self.selected_customer = customer
             browserid = self.app.storage.browser["id"]
             if update_list:
-                customer_list.items_list.refresh(no_callback=True)
+                await customer_list.refresh(no_callback=True)
 
         if getattr(self, "tabs", None) is not None:
             self.tabs.set_value("Nova transação")
         # Update selected user indicator
+        debt = await run_in_db_thread(lambda: customer.Saldo)
         self.selected_customer_name.set_value(customer.NomeCompleto)
         self.selected_customer_place.set_value(customer.Local)
-        self.selected_customer_debt.set_value(f"R$ {customer.Saldo}")
+        self.selected_customer_debt.set_value(f"R$ {debt}")
         # Update transaction history
         if getattr(self, "history", None) is not None:
-            self.history.change_customer(self.selected_customer)
+            await self.history.change_customer(await self.read_selected_customer())
 
-    def handle_tab_change(self, payload):
+    async def apply_change(self, change: LedgerChange):
+        """Keeps the page in sync with changes made by this or any other client."""
+        if (change.kind == "customer_updated") and (self.CUSTOMERS_SOURCE is not None):
+            row = await run_in_db_thread(
+                self.CUSTOMERS_SOURCE.customer_row, change.customer_id
+            )
+            if row is not None:
+                self.customer_list.update_item(change.customer_id, row._asdict())
+        customer_id = self.app.storage.client.get("selected_customer", None)
+        if change.customer_id != customer_id:
+            return
+        if change.kind == "customer_updated":
+            customer = await self.read_selected_customer()
+            self.selected_customer_name.set_value(customer.NomeCompleto)
+            self.selected_customer_place.set_value(customer.Local)
+        self.selected_customer_debt.set_value(f"R$ {format_cents([change.balance])[0]}")
+        await self.history.apply_change(change)
+
+    async def handle_tab_change(self, payload):
         match payload.value:
             case "Informações":
-                self.info.load(self.selected_customer)
+                self.info.load(await self.read_selected_customer())
 
-    def update_selected_customer(self):
-        customer = self.selected_customer
+    async def update_selected_customer(self):
+        customer = await self.read_selected_customer()
         print(customer)
         try:
             customer.PrimeiroNome = self.info.firstname.value
@@ -352,7 +493,7 @@ class page:
             customer.Bairro = self.info.district.value
             customer.Cidade = self.info.city.value
             customer.Estado = self.info.state.value
-            customer.update()
+            await customer.update_async()
         except Exception as err:
             notify_error(
                 self.ui, "Erro ao alterar dados do cliente, verifique os logs."
@@ -363,27 +504,28 @@ class page:
                 self.ui, f"Dados de {customer.NomeCompleto} alterados com sucesso"
             )
         finally:
-            self.load_selected_customer(
+            await self.load_selected_customer(
                 data=self.customer_list.selected_data, update_list=True
             )
 
-    def add_transaction(self):
+    async def add_transaction(self):
         date = self.transac.date
         value = StringToCurrency(self.transac.value_input.value)
         if not value.is_valid():
             notify_error(self.ui, value.invalid_reason)
             return
-        if self.selected_customer.Id is None:
+        customer_id = self.app.storage.client.get("selected_customer", None)
+        if customer_id is None:
             notify_error(self.ui, "Nenhum cliente selecionado.")
             return
         try:
             transaction = tbl_transacoes(
-                IdCliente=self.selected_customer.Id,
+                IdCliente=customer_id,
                 CarimboTempo=datetime.now(),
                 DataTransac=date,
                 Valor=value.value,
             )
-            transaction.write()
+            await transaction.write_async()
         except Exception as err:
             notify_error(self.ui, "Erro inesperado, verifique o arquivo de log.")
             raise err
@@ -393,10 +535,18 @@ class page:
             self.transac.date = date.today()
             print(f"{now()} {self.app.storage.browser['id']} added a {transaction=}")
         finally:
-            self.load_selected_customer(data=self.customer_list.selected_data)
+            await self.load_selected_customer(data=self.customer_list.selected_data)
+
+    async def add_many_transactions(self):
+        customer = await self.read_selected_customer()
+        if customer.Id is None:
+            notify_error(self.ui, "Nenhum cliente selecionado.")
+            return
+        await self.batch_dialog.show(customer)
+        await self.load_selected_customer(data=self.customer_list.selected_data)
 
     async def del_transaction(self, transac_id: int):
         transaction = tbl_transacoes()
-        transaction.read(row_id=transac_id)
+        await transaction.read_async(row_id=transac_id)
         await self.history.delete_transaction_dialog.show(transaction)
-        self.load_selected_customer(data=self.customer_list.selected_data)
+        await self.load_selected_customer(data=self.customer_list.selected_data)
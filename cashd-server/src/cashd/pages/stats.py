@@ -6,20 +6,13 @@ from cashd_core.data import (
     HighestAmountsSource,
     InactiveCustomersSource,
 )
+from cashd_core.fmt import format_cents_columns
 from cashd.widgets.parts import DefaultHeader
 from cashd import auth
 from cashd.const import now
 import plotly.graph_objects as go
 from nicegui import ui
 
-CURRENCY_COLNAMES = [
-    "Valor",
-    "OwedAmount",
-    "Sums",
-    "Deductions",
-    "Balance",
-    "AcumBalance",
-]
 DATE_COLNAMES = ["Data", "LastTransac"]
 DISPLAY_NAMES = {
     "Valor": "Valor (R$)",
@@ -36,10 +29,16 @@ DISPLAY_NAMES = {
 class Table:
     @property
     def data(self) -> list[dict[str, str]]:
-        colnames: list[str] = self.source.SELECT_STMT.selected_columns.keys()
+        """Rows of the current page with the raw values, used to sort them, and the
+        formatted ones under "display".
+        """
+        return self._table_rows(self.source.current_data)
+
+    def _table_rows(self, current_data: list) -> list[dict[str, str]]:
+        rows = [row._asdict() for row in current_data]
+        formatted = format_cents_columns(rows, self.source.CURRENCY_COLNAMES)
         return [
-            {col: getattr(row, col) for col in colnames}
-            for row in self.source.current_data
+            {**row, "display": display_row} for row, display_row in zip(rows, formatted)
         ]
 
     @property
@@ -49,14 +48,13 @@ class Table:
         for name in colnames:
             label = DISPLAY_NAMES.get(name, name)
             key = name.lower()
-            if name in CURRENCY_COLNAMES:
-                columns.append(
-                    {"name": key, "label": label, "field": name, "align": "right"}
-                )
+            column = {"name": key, "label": label, "field": name, "sortable": True}
+            if name in self.source.CURRENCY_COLNAMES:
+                column["align"] = "right"
+                column[":format"] = f"(val, row) => row.display.{name}"
             else:
-                columns.append(
-                    {"name": key, "label": label, "field": name, "align": "left"}
-                )
+                column["align"] = "left"
+            columns.append(column)
         return columns
 
     @property
@@ -66,22 +64,23 @@ class Table:
             f"até {self.source.max_idx}"
         )
 
-    def refresh(self):
+    async def refresh(self):
+        current_data = await self.source.current_data_async()
         self.table.columns = self.columns
-        self.table.rows = self.data
+        self.table.rows = self._table_rows(current_data)
         self.pagination_label.set_text(self.pagination_text)
 
-    def next_page(self):
-        self.source.fetch_next_page()
-        self.refresh()
+    async def next_page(self):
+        await self.source.fetch_next_page_async()
+        await self.refresh()
 
-    def previous_page(self):
-        self.source.fetch_previous_page()
-        self.refresh()
+    async def previous_page(self):
+        await self.source.fetch_previous_page_async()
+        await self.refresh()
 
-    def change_source(self, source: _DataSource):
+    async def change_source(self, source: _DataSource):
         self.source = source
-        self.refresh()
+        await self.refresh()
 
     def __init__(self, ui, source: _DataSource):
         self.source = source
@@ -115,12 +114,6 @@ def example_plot(ui):
 
 
 class page:
-    LAST_TRANSACTIONS_SOURCE = LastTransactionsSource()
-    TRANSACTION_BALANCE_SOURCE = TransactionBalanceSource()
-    AGGREGATED_AMOUNT_SOURCE = AggregatedAmountSource()
-    HIGHEST_AMOUNTS_SOURCE = HighestAmountsSource()
-    INACTIVE_CUSTOMER_SOURCE = InactiveCustomersSource()
-    current_source = LAST_TRANSACTIONS_SOURCE
     STATS_OPTIONS = [
         "Últimas transações",
         "Maiores saldos devedores",
@@ -131,6 +124,16 @@ class page:
 
     def __init__(self, ui, app):
         self.ui, self.app = ui, app
+        # each client pages through it's own sources, the results of the queries are
+        # shared between them, see `cashd_core.data.result_cache`
+        self.LAST_TRANSACTIONS_SOURCE = LastTransactionsSource(
+            pagination_mode="keyset", prefetch_pages=True
+        )
+        self.TRANSACTION_BALANCE_SOURCE = TransactionBalanceSource(prefetch_pages=True)
+        self.AGGREGATED_AMOUNT_SOURCE = AggregatedAmountSource(prefetch_pages=True)
+        self.HIGHEST_AMOUNTS_SOURCE = HighestAmountsSource(prefetch_pages=True)
+        self.INACTIVE_CUSTOMER_SOURCE = InactiveCustomersSource(prefetch_pages=True)
+        self.current_source = self.LAST_TRANSACTIONS_SOURCE
         DefaultHeader(ui, app, selected_entry="Estatísticas")
         print(f"{now()} Drawing '/stats' page for {app.storage.browser['id']}")
         self.controls_block(ui)
@@ -168,16 +171,23 @@ class page:
                     "value",
                     backward=lambda v: v in ["Balanço", "Balanço acumulado"],
                 )
-                # self.freq_amount = (
-                #     ui.number(label="Meses", value=8, min=3, precision=0, format="%.0f")
-                #     .props("outlined dense")
-                #     .classes("w-18")
-                # )
-                # self.freq_amount.bind_visibility_from(
-                #     self.stat_selector,
-                #     "value",
-                #     backward=lambda v: v in ["Balanço", "Balanço acumulado"],
-                # )
+                self.freq_amount = (
+                    ui.number(
+                        label="Meses",
+                        value=8,
+                        min=1,
+                        precision=0,
+                        format="%.0f",
+                        on_change=self.update_freq_amount,
+                    )
+                    .props("outlined dense")
+                    .classes("w-18")
+                )
+                self.freq_amount.bind_visibility_from(
+                    self.stat_selector,
+                    "value",
+                    backward=lambda v: v in ["Balanço", "Balanço acumulado"],
+                )
             # ui.button(icon="refresh", on_click=self.current_stat)
         return controls_block
 
@@ -199,17 +209,34 @@ class page:
     def change_displayed_freq(self):
         self.rename_freq_amount()
 
-    # def rename_freq_amount(self):
-    #     match self.freq_selector.value:
-    #         case "Diário":
-    #             self.freq_amount.label = "Dias"
-    #         case "Semanal":
-    #             self.freq_amount.label = "Semanas"
-    #         case _:
-    #             self.freq_amount.label = "Meses"
-    #     self.freq_amount.update()
-
-    def update_view(self):
+    def rename_freq_amount(self):
+        match self.freq_selector.value:
+            case "Diário":
+                self.freq_amount.label = "Dias"
+            case "Semanal":
+                self.freq_amount.label = "Semanas"
+            case _:
+                self.freq_amount.label = "Meses"
+        self.freq_amount.update()
+
+    async def apply_period(self):
+        """Sets the frequency and number of periods selected to the current source,
+        when it groups transactions by date.
+        """
+        match self.freq_selector.value:
+            case "Diário":
+                await self.current_source.update_date_format_async("d")
+            case "Semanal":
+                await self.current_source.update_date_format_async("w")
+            case _:
+                await self.current_source.update_date_format_async("m")
+        n_periods = self.freq_amount.value
+        if n_periods is None or n_periods < 1:
+            await self.current_source.update_period_async()
+        else:
+            await self.current_source.update_period_async(last_n=int(n_periods))
+
+    async def update_view(self):
         match self.stat_selector.value:
             case "Clientes inativos":
                 self.current_source = self.INACTIVE_CUSTOMER_SOURCE
@@ -221,22 +248,22 @@ class page:
                 self.current_source = self.TRANSACTION_BALANCE_SOURCE
             case _:
                 self.current_source = self.LAST_TRANSACTIONS_SOURCE
-        self.View.change_source(self.current_source)
+        await self.apply_period()
+        await self.View.change_source(self.current_source)
 
-    def update_freq(self):
-        match self.freq_selector.value:
-            case "Diário":
-                self.current_source.update_date_format("d")
-            case "Semanal":
-                self.current_source.update_date_format("w")
-            case _:
-                self.current_source.update_date_format("m")
-        self.View.refresh()
+    async def update_freq(self):
+        self.change_displayed_freq()
+        await self.apply_period()
+        await self.View.refresh()
+
+    async def update_freq_amount(self):
+        await self.apply_period()
+        await self.View.refresh()
 
-    def next_page(self):
-        self.current_source.fetch_next_page()
-        self.update_view()
+    async def next_page(self):
+        await self.current_source.fetch_next_page_async()
+        await self.update_view()
 
-    def previous_page(self):
-        self.current_source.fetch_previous_page()
-        self.update_view()
+    async def previous_page(self):
+        await self.current_source.fetch_previous_page_async()
+        await self.update_view()
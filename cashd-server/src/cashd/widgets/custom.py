@@ -1,18 +1,32 @@
-from typing import Any
-from nicegui import ui
+from typing import Any, Awaitable
+from nicegui import ui, background_tasks
 from cashd_core.data import _DataSource
+from cashd.widgets.parts import in_client
 
 
 class DetailedList:
-    def __init__(self, ui, datasource: _DataSource, keys: list[str], on_select=None):
+    def __init__(
+        self,
+        ui,
+        datasource: _DataSource | None,
+        keys: list[str],
+        on_select=None,
+    ):
+        """List of the rows in `datasource`, with a search bar and pagination buttons.
+        Nothing is displayed while `datasource` is `None`, until `change_source`.
+        """
         self.title_key, self.subtitle_key = keys[:2]
         self.SOURCE = datasource
         self.ui = ui
+        self.client = ui.context.client
         self.on_select = on_select
         self.selected_item = None
         self.selected_data = None
         self.displayed_items = []
         self.displayed_data = []
+        self.displayed_labels = []
+        # rows fetched by `refresh`, rendered instead of querying the source again
+        self._page_data: list[dict[str, Any]] | None = None
         self.search_bar = ui.input(label="Pesquisa", on_change=self._change_search)
         self.search_bar.props("outlined dense").classes("w-full mt-4")
         self.selection = self._selection(ui)
@@ -20,10 +34,16 @@ class DetailedList:
 
     @property
     def current_data(self) -> list[dict[str, Any]]:
+        if self._page_data is not None:
+            return self._page_data
+        if self.SOURCE is None:
+            return []
         return [r._asdict() for r in self.SOURCE.current_data]
 
     @property
     def pagination_text(self) -> str:
+        if self.SOURCE is None:
+            return ""
         min_idx, max_idx = self.SOURCE.min_idx + 1, self.SOURCE.max_idx
         if self.SOURCE.nrows == 0:
             return "0 itens"
@@ -35,7 +55,8 @@ class DetailedList:
                 "w-full border border-gray-300 rounded-borders no-margin-scroll"
             )
             scroll.style("min-height: 260px; height: calc(100svh - 320px);")
-            self.items_list()
+            # nothing can be selected before there is a source
+            self.items_list(no_callback=self.SOURCE is None)
 
     def _pagination(self, ui):
         with ui.scroll_area().classes("h-[2rem] no-margin-scroll w-full items-end"):
@@ -63,6 +84,7 @@ class DetailedList:
         # selection_list = getattr(self, "selection_list", self.ui.list())
         self.displayed_items = []
         self.displayed_data = []
+        self.displayed_labels = []
         with self.ui.list() as selection_list:
             selection_list.props("separator dense")
             selection_list.classes("w-full p-0 m-0 select-none")
@@ -73,12 +95,13 @@ class DetailedList:
                     self.displayed_data.append(data)
                     self.displayed_items.append(item)
                     with self.ui.item_section():
-                        self.ui.item_label(data[self.title_key]).classes(
+                        title = self.ui.item_label(data[self.title_key]).classes(
                             "font-medium mt-1"
                         )
-                        self.ui.item_label(data[self.subtitle_key]).classes(
+                        subtitle = self.ui.item_label(data[self.subtitle_key]).classes(
                             "text-xs mb-1"
                         )
+                        self.displayed_labels.append((title, subtitle))
         self._select_item(self.selected_data, no_callback)
 
     def _select_item(self, data: dict[str, Any], no_callback: bool = False):
@@ -93,21 +116,63 @@ class DetailedList:
             item = self.displayed_items[idx]
             item.style("background-color: #478eff; color: white")
         if self.on_select and not no_callback:
-            self.on_select(self.selected_data)
+            result = self.on_select(self.selected_data)
+            if isinstance(result, Awaitable):
+                background_tasks.create(in_client(self.client, result))
 
-    def _next_page(self):
-        """When available, renders the next page of data."""
-        self.SOURCE.fetch_next_page()
-        self.items_list.refresh()
+    def update_item(self, item_id: int, data: dict[str, Any] | None):
+        """Replaces the displayed item whose "Id" is `item_id` by `data`, without
+        rendering the whole list again. Does nothing if it is not displayed.
+        """
+        ids = [d.get("Id", None) for d in self.displayed_data]
+        if (data is None) or (item_id not in ids):
+            return
+        idx = ids.index(item_id)
+        if self.selected_data == self.displayed_data[idx]:
+            self.selected_data = data
+        self.displayed_data[idx] = data
+        title, subtitle = self.displayed_labels[idx]
+        title.set_text(data[self.title_key])
+        subtitle.set_text(data[self.subtitle_key])
+
+    async def refresh(self, no_callback: bool = False):
+        """Renders the current page of data, fetched without blocking the event loop."""
+        if self.SOURCE is None:
+            return
+        rows = await self.SOURCE.current_data_async()
+        self._page_data = [r._asdict() for r in rows]
+        try:
+            self.items_list.refresh(no_callback=no_callback)
+        finally:
+            self._page_data = None
         self.pagination_label.text = self.pagination_text
 
-    def _previous_page(self):
+    async def change_source(self, source: _DataSource, no_callback: bool = False):
+        """Renders the data of `source` instead, searched with the text already typed
+        in the search bar.
+        """
+        self.SOURCE = source
+        if self.search_bar.value:
+            await self.SOURCE.set_search_text_async(self.search_bar.value)
+        await self.refresh(no_callback=no_callback)
+
+    async def _next_page(self):
+        """When available, renders the next page of data."""
+        if self.SOURCE is None:
+            return
+        await self.SOURCE.fetch_next_page_async()
+        await self.refresh()
+
+    async def _previous_page(self):
         """When available, renders the previous page of data."""
-        self.SOURCE.fetch_previous_page()
-        self.items_list.refresh()
-        self.pagination_label.text = self.pagination_text
+        if self.SOURCE is None:
+            return
+        await self.SOURCE.fetch_previous_page_async()
+        await self.refresh()
 
-    def _change_search(self):
-        self.SOURCE.search_text = self.search_bar.value
-        self.items_list.refresh()
-        self.pagination_label.text = self.pagination_text
+    async def _change_search(self):
+        if self.SOURCE is None:
+            # applied by `change_source`
+            return
+        await self.SOURCE.set_search_text_async(self.search_bar.value)
+        await self.refresh()
@@ -1,4 +1,5 @@
 import time
+from datetime import datetime
 import asyncio
 from pathlib import Path
 from typing import Any, Literal
@@ -520,10 +521,10 @@ class DeleteTransactionDialog(CustomDialog):
         self.confirm_button.set_text("Confirmar")
         self.confirm_button.enable()
 
-    def delete_transaction(self):
+    async def delete_transaction(self):
         try:
             tr = self.transaction
-            tr.delete()
+            await tr.delete_async()
         except Exception as err:
             notify_error(
                 self.ui, "Erro inesperado ao excluir transação, verifique o log."
@@ -538,3 +539,56 @@ class DeleteTransactionDialog(CustomDialog):
     async def show(self, transaction: tbl_transacoes) -> Any:
         self.transaction = transaction
         await super().show()
+
+
+class BatchTransactionDialog(CustomDialog):
+    def _render_content(self, ui):
+        self.title = ui.label("Inserir várias transações").classes("text-xl")
+        ui.label(
+            "Uma transação por linha, no formato DD/MM/AAAA;Valor. Linhas apenas com "
+            "o valor são registradas com a data de hoje."
+        ).classes("text-xs")
+        self.lines_input = ui.textarea(placeholder="31/12/2024;10,50\n-5,00")
+        self.lines_input.props("outlined autogrow").classes("w-full font-mono")
+        with ui.row() as buttons_block:
+            buttons_block.classes("self-end justify-end")
+            ui.button("Cancelar", icon="close", on_click=self.cancel).props("flat")
+            ui.button("Inserir", icon="add", on_click=self.add_transactions)
+
+    def _initial_state(self):
+        self.title.set_text(f"Inserir várias transações: {self.customer.NomeCompleto}")
+
+    def _cleanup(self):
+        self.lines_input.set_value("")
+
+    async def add_transactions(self):
+        ui = self.ui
+        batch = fmt.StringToTransactions(self.lines_input.value)
+        if not batch.is_valid():
+            notify_error(ui, batch.invalid_reason)
+            return
+        timestamp = datetime.now()
+        rows = [
+            {
+                "IdCliente": self.customer.Id,
+                "CarimboTempo": timestamp,
+                "DataTransac": transac_date,
+                "Valor": value,
+            }
+            for transac_date, value in batch.value
+        ]
+        try:
+            n_written = await tbl_transacoes.write_many_async(rows)
+        except Exception as err:
+            notify_error(ui, "Erro inesperado, verifique o arquivo de log.")
+            raise err
+        else:
+            browserid = self.app.storage.browser["id"]
+            print(f"{now()} {browserid} added {n_written} transactions in batch")
+            notify_success(ui, f"{n_written} transações adicionadas com sucesso.")
+            self.dialog.submit(n_written)
+            self._cleanup()
+
+    async def show(self, customer: tbl_clientes) -> Any:
+        self.customer = customer
+        return await super().show()
@@ -1,3 +1,7 @@
+import asyncio
+from typing import Awaitable, Callable
+from nicegui import background_tasks
+from cashd_core.data import LedgerChange, ledger_changes
 from cashd import auth
 
 
@@ -9,6 +13,33 @@ def notify_success(ui, message: str):
     ui.notify(message, color="positive", icon="check", position="bottom-left")
 
 
+async def in_client(client, awaitable: Awaitable):
+    """Awaits `awaitable` inside of `client`, so background tasks can reach it's
+    elements and storage.
+    """
+    with client:
+        return await awaitable
+
+
+def follow_ledger_changes(ui, handler: Callable[[LedgerChange], Awaitable]):
+    """Runs `handler` on the event loop with each `LedgerChange` published until the
+    current client is deleted, wherever the change was made. Browsers reconnecting
+    to the same page, after a network drop, keep receiving the changes.
+    """
+    loop = asyncio.get_running_loop()
+    client = ui.context.client
+
+    def deliver(change: LedgerChange):
+        # changes are published by the thread that wrote them
+        loop.call_soon_threadsafe(
+            lambda: background_tasks.create(in_client(client, handler(change)))
+        )
+
+    unsubscribe = ledger_changes.subscribe(deliver)
+    # `on_disconnect` also runs when the browser is about to reconnect
+    client.on_delete(unsubscribe)
+
+
 class DefaultHeader:
     ICONS = {
         "transaction": {
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+from nicegui.testing import User
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+async def test_main_page_queries_off_the_event_loop(user: User):
+    """Test if the '/' page is drawn and loaded without querying the database on the
+    event loop.
+    """
+    loop_thread = threading.current_thread()
+    on_loop, off_loop = [], []
+
+    def record(conn, cursor, statement, *args):
+        if threading.current_thread() is loop_thread:
+            on_loop.append(statement)
+        else:
+            off_loop.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        client = await user.open("/")
+        # waits for `page.load`, that runs once the page is connected
+        await asyncio.sleep(0.5)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    client.delete()
+    assert on_loop == []
+    assert len(off_loop) > 0
@@ -0,0 +1,25 @@
+import asyncio
+from nicegui.testing import User
+from cashd_core.data import LedgerChange, ledger_changes
+
+
+async def test_ledger_changes_survive_reconnect(user: User):
+    """Test if a page keeps following the ledger changes when the browser reconnects,
+    and only stops once the client is deleted.
+    """
+    n_subscribers = len(ledger_changes._subscribers)
+    client = await user.open("/")
+    assert len(ledger_changes._subscribers) == n_subscribers + 1
+    # a network drop, followed by the browser reconnecting to the same page
+    socket_id, document_id = next(iter(client._socket_to_document_id.items()))
+    tab_id = client.tab_id
+    client.handle_disconnect(socket_id)
+    await client.handle_handshake(socket_id, tab_id, None, document_id, None)
+    assert len(ledger_changes._subscribers) == n_subscribers + 1
+    # changes are still handled by the page, errors would fail the test
+    ledger_changes.publish(
+        LedgerChange(kind="customer_updated", customer_id=-1, delta=0, balance=0)
+    )
+    await asyncio.sleep(0.2)
+    client.delete()
+    assert len(ledger_changes._subscribers) == n_subscribers